@@ -0,0 +1,165 @@
+"""
+Price alerts triggered when last price of tick crosses alert price.
+
+Alerts of each symbol are kept sorted by price, so a tick only bisects
+for alerts between previous and current last price, which costs
+O(log n + triggered) however many alerts are waiting.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from itertools import count
+from threading import Lock
+from typing import Dict, List
+
+from constant import AlertStatus
+from event import Event, EventEngine, EVENT_ALERT, EVENT_TICK
+from engine import BaseEngine, MainEngine
+from object import AlertData, SubscribeRequest, TickData
+from utility import extract_vt_symbol
+
+
+class AlertBook:
+    """
+    Alerts of one symbol sorted by price.
+    """
+
+    def __init__(self):
+        """"""
+        self.prices: List[float] = []
+        self.alerts: List[AlertData] = []
+        self.last_price: float = None
+
+    def add_alert(self, alert: AlertData):
+        """"""
+        i = bisect_right(self.prices, alert.price)
+        self.prices.insert(i, alert.price)
+        self.alerts.insert(i, alert)
+
+    def remove_alert(self, alert: AlertData) -> bool:
+        """"""
+        i = bisect_left(self.prices, alert.price)
+        while i < len(self.prices) and self.prices[i] == alert.price:
+            if self.alerts[i] is alert:
+                del self.prices[i]
+                del self.alerts[i]
+                return True
+            i += 1
+        return False
+
+    def update_price(self, price: float) -> List[AlertData]:
+        """
+        Remove and return alerts crossed by moving from last price to price.
+        Alert at last price is not triggered again, and alert at new price
+        is triggered.
+        """
+        last_price = self.last_price
+        self.last_price = price
+
+        if last_price is None or price == last_price:
+            return []
+
+        if price > last_price:
+            start = bisect_right(self.prices, last_price)
+            end = bisect_right(self.prices, price)
+        else:
+            start = bisect_left(self.prices, price)
+            end = bisect_left(self.prices, last_price)
+
+        if start == end:
+            return []
+
+        triggered = self.alerts[start:end]
+        del self.prices[start:end]
+        del self.alerts[start:end]
+        return triggered
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.prices)
+
+
+class AlertEngine(BaseEngine):
+    """
+    Keep price alerts and put alert event when they are added, triggered
+    or cancelled. Alerts can be added from any thread.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(AlertEngine, self).__init__(main_engine, event_engine, "Alert")
+
+        self.books: Dict[str, AlertBook] = {}
+        self.alerts: Dict[str, AlertData] = {}
+        self.alert_count = count(1)
+        self.lock = Lock()
+
+    def add_alert(self, vt_symbol: str, price: float, msg: str = "") -> str:
+        """
+        Add alert and subscribe its symbol, alertid is returned.
+        """
+        symbol, exchange = extract_vt_symbol(vt_symbol)
+        alertid = str(next(self.alert_count))
+        alert = AlertData(alertid, symbol, exchange, price, msg)
+
+        with self.lock:
+            book = self.books.get(vt_symbol, None)
+            if not book:
+                book = AlertBook()
+                self.books[vt_symbol] = book
+                self.event_engine.register(EVENT_TICK + vt_symbol, self.process_tick_event)
+
+            book.add_alert(alert)
+            self.alerts[alertid] = alert
+
+        self.main_engine.subscribe(SubscribeRequest(symbol, exchange))
+        self.event_engine.put(Event(EVENT_ALERT, alert))
+        return alertid
+
+    def cancel_alert(self, alertid: str) -> bool:
+        """"""
+        with self.lock:
+            alert = self.alerts.pop(alertid, None)
+            if not alert:
+                return False
+            self.books[alert.vt_symbol].remove_alert(alert)
+
+        alert.status = AlertStatus.CANCELLED
+        alert.time = datetime.now()
+        self.event_engine.put(Event(EVENT_ALERT, alert))
+        return True
+
+    def get_alert(self, alertid: str) -> AlertData:
+        """"""
+        return self.alerts.get(alertid, None)
+
+    def get_all_alerts(self) -> List[AlertData]:
+        """
+        Get alerts not triggered or cancelled yet.
+        """
+        return list(self.alerts.values())
+
+    def process_tick_event(self, event: Event):
+        """"""
+        tick: TickData = event.data
+
+        with self.lock:
+            triggered = self.books[tick.vt_symbol].update_price(tick.last_price)
+            for alert in triggered:
+                self.alerts.pop(alert.alertid, None)
+
+        for alert in triggered:
+            alert.status = AlertStatus.TRIGGERED
+            alert.last_price = tick.last_price
+            alert.time = tick.datetime
+
+            self.event_engine.put(Event(EVENT_ALERT, alert))
+            self.main_engine.write_log(
+                f"{alert.vt_symbol} crossed {alert.price} at {tick.last_price} {alert.msg}",
+                "Alert"
+            )
+
+    def close(self):
+        """"""
+        for vt_symbol in self.books.keys():
+            self.event_engine.unregister(EVENT_TICK + vt_symbol, self.process_tick_event)
@@ -0,0 +1,562 @@
+"""
+Execution algos slicing parent orders into child orders.
+
+All algos share one timer wheel driven by timer event, so scheduling an
+algo is O(1) and each timer event only visits algos due at that second.
+Tick event only saves latest tick of the symbol, so tick processing cost
+does not grow with number of algos. Child orders of all algos due at the
+same time are sent as one batch.
+"""
+
+from itertools import count
+from threading import Lock
+from typing import Dict, List, Optional, Set
+
+from constant import Direction, OrderType, Status
+from event import Event, EventEngine, EVENT_ORDER, EVENT_TICK, EVENT_TIMER, EVENT_TRADE
+from engine import BaseEngine, MainEngine
+from object import OrderData, OrderRequest, SubscribeRequest, TickData, TradeData
+from setting import SETTINGS
+from utility import extract_vt_symbol, round_to
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel with one slot per timer event. Delay longer than
+    wheel size is kept with number of remaining rounds.
+    """
+
+    def __init__(self, size: int = 60):
+        """"""
+        self.size = size
+        self.slots: List[List[list]] = [[] for _ in range(size)]
+        self.cursor = 0
+
+    def schedule(self, item, delay: int):
+        """
+        Schedule item to be due after delay (at least 1) timer events.
+        """
+        delay = max(delay, 1)
+        rounds, offset = divmod(delay - 1, self.size)
+        slot = (self.cursor + 1 + offset) % self.size
+        self.slots[slot].append([rounds, item])
+
+    def advance(self) -> list:
+        """
+        Move to next slot and return items due.
+        """
+        self.cursor = (self.cursor + 1) % self.size
+        slot = self.slots[self.cursor]
+        if not slot:
+            return []
+
+        due = []
+        remaining = []
+        for entry in slot:
+            if entry[0]:
+                entry[0] -= 1
+                remaining.append(entry)
+            else:
+                due.append(entry[1])
+
+        self.slots[self.cursor] = remaining
+        return due
+
+
+class AlgoTemplate:
+    """
+    Base class of execution algos, which buy or sell volume of vt_symbol
+    with price no worse than price.
+    """
+
+    display_name = ""
+    default_setting = {}
+
+    def __init__(self, algo_engine: "AlgoEngine", algoid: str, setting: dict):
+        """"""
+        self.algo_engine = algo_engine
+        self.algoid = algoid
+
+        self.vt_symbol: str = setting["vt_symbol"]
+        self.direction = Direction(setting["direction"])
+        self.price: float = setting["price"]
+        self.volume: float = setting["volume"]
+
+        self.traded: float = 0
+        self.active = False
+        self.active_orders: Dict[str, OrderData] = {}
+
+        # Child orders whose fills may still come: vt_orderid: [volume,
+        # traded, finished]. When order is finished, volume becomes its
+        # traded volume, as trades can come after the order update.
+        self.child_orders: Dict[str, list] = {}
+        # Volume of child orders queued in engine but not sent yet.
+        self.pending_volume: float = 0
+
+    def start(self):
+        """"""
+        self.active = True
+        self.on_start()
+
+    def stop(self):
+        """
+        Stop algo and cancel all its active orders.
+        """
+        if not self.active:
+            return
+
+        self.active = False
+        self.cancel_all()
+        self.on_stop()
+        self.algo_engine.on_algo_stopped(self)
+
+    def add_child_order(self, vt_orderid: str, volume: float):
+        """"""
+        self.child_orders[vt_orderid] = [volume, 0, False]
+
+    def update_order(self, order: OrderData):
+        """"""
+        if order.is_active():
+            self.active_orders[order.vt_orderid] = order
+        else:
+            self.active_orders.pop(order.vt_orderid, None)
+
+            child = self.child_orders.get(order.vt_orderid, None)
+            if child:
+                child[0] = order.traded
+                child[2] = True
+                self.check_child_order(order.vt_orderid)
+
+        self.on_order(order)
+
+    def update_trade(self, trade: TradeData):
+        """"""
+        child = self.child_orders.get(trade.vt_orderid, None)
+        if child:
+            child[1] += trade.volume
+            self.check_child_order(trade.vt_orderid)
+
+        self.traded += trade.volume
+        self.on_trade(trade)
+
+        if self.get_left_volume() <= 0:
+            self.write_log("finished")
+            self.stop()
+
+    def check_child_order(self, vt_orderid: str):
+        """
+        Remove child order when it is finished and all its trades are
+        received.
+        """
+        volume, traded, finished = self.child_orders[vt_orderid]
+        if finished and traded >= volume:
+            del self.child_orders[vt_orderid]
+            self.algo_engine.remove_order(vt_orderid)
+
+    def get_left_volume(self) -> float:
+        """"""
+        return self.volume - self.traded
+
+    def get_inflight_volume(self) -> float:
+        """
+        Volume of child orders sent or queued which may still be filled.
+        """
+        return self.pending_volume + sum(
+            volume - traded for volume, traded, _ in self.child_orders.values()
+        )
+
+    def get_sendable_volume(self) -> float:
+        """
+        Volume which can be sent without risk of overfilling.
+        """
+        return self.volume - self.traded - self.get_inflight_volume()
+
+    def on_start(self):
+        """"""
+        pass
+
+    def on_stop(self):
+        """"""
+        pass
+
+    def on_timer(self):
+        """
+        Callback when algo is due on timer wheel.
+        """
+        pass
+
+    def on_order(self, order: OrderData):
+        """"""
+        pass
+
+    def on_trade(self, trade: TradeData):
+        """"""
+        pass
+
+    def schedule(self, delay: int):
+        """
+        Call on_timer after delay seconds.
+        """
+        self.algo_engine.schedule(self, delay)
+
+    def get_tick(self) -> Optional[TickData]:
+        """"""
+        return self.algo_engine.get_tick(self.vt_symbol)
+
+    def send_order(self, price: float, volume: float):
+        """
+        Child order is sent in batch with orders of other algos.
+        """
+        if self.active and volume > 0:
+            self.algo_engine.send_order(self, self.direction, price, volume)
+
+    def cancel_all(self):
+        """"""
+        if self.active_orders:
+            self.algo_engine.cancel_orders(list(self.active_orders.values()))
+
+    def write_log(self, msg: str):
+        """"""
+        self.algo_engine.write_log(msg, self)
+
+
+class TwapAlgo(AlgoTemplate):
+    """
+    Send equal child volume every interval seconds within time seconds,
+    at best price if not worse than limit price.
+    """
+
+    display_name = "TWAP"
+    default_setting = {"time": 600, "interval": 60}
+
+    def __init__(self, algo_engine: "AlgoEngine", algoid: str, setting: dict):
+        """"""
+        super(TwapAlgo, self).__init__(algo_engine, algoid, setting)
+
+        self.time: int = setting.get("time", self.default_setting["time"])
+        self.interval: int = setting.get("interval", self.default_setting["interval"])
+
+        self.slice_count = max(self.time // self.interval, 1)
+        self.slice_volume = self.volume / self.slice_count
+        self.slice_index = 0
+
+    def on_start(self):
+        """"""
+        self.schedule(1)
+
+    def on_timer(self):
+        """"""
+        self.cancel_all()
+
+        self.slice_index += 1
+        if self.slice_index > self.slice_count:
+            self.write_log(f"time is up, traded {self.traded} of {self.volume}")
+            self.stop()
+            return
+
+        # Volume not filled in previous slices is added into this one.
+        # Cancelled orders may still be filled, so their volume is only
+        # sent again in a later slice after they are finished.
+        target = min(self.slice_volume * self.slice_index, self.volume)
+        self.send_slice(target - self.traded - self.get_inflight_volume())
+
+        self.schedule(self.interval)
+
+    def send_slice(self, volume: float):
+        """"""
+        tick = self.get_tick()
+        if not tick:
+            return
+
+        if self.direction == Direction.LONG:
+            if tick.ask_price_1 and tick.ask_price_1 <= self.price:
+                self.send_order(tick.ask_price_1, volume)
+        else:
+            if tick.bid_price_1 and tick.bid_price_1 >= self.price:
+                self.send_order(tick.bid_price_1, volume)
+
+
+class VwapAlgo(TwapAlgo):
+    """
+    Same as TWAP, but volume of each slice follows a volume profile,
+    e.g. intraday volume curve of the symbol.
+    """
+
+    display_name = "VWAP"
+    default_setting = {"time": 600, "interval": 60, "profile": []}
+
+    def __init__(self, algo_engine: "AlgoEngine", algoid: str, setting: dict):
+        """"""
+        super(VwapAlgo, self).__init__(algo_engine, algoid, setting)
+
+        profile = setting.get("profile", []) or [1] * self.slice_count
+        if len(profile) != self.slice_count:
+            raise ValueError(f"profile length should be {self.slice_count}")
+
+        # Cumulative target of each slice.
+        total = sum(profile)
+        self.targets = []
+        accumulated = 0
+        for weight in profile:
+            accumulated += weight
+            self.targets.append(self.volume * accumulated / total)
+
+    def on_timer(self):
+        """"""
+        self.cancel_all()
+
+        self.slice_index += 1
+        if self.slice_index > self.slice_count:
+            self.write_log(f"time is up, traded {self.traded} of {self.volume}")
+            self.stop()
+            return
+
+        self.send_slice(
+            self.targets[self.slice_index - 1] - self.traded - self.get_inflight_volume()
+        )
+
+        self.schedule(self.interval)
+
+
+class IcebergAlgo(AlgoTemplate):
+    """
+    Keep one child order of display volume at limit price, next one is
+    sent when previous one is finished and all its trades are received.
+    """
+
+    display_name = "Iceberg"
+    default_setting = {"display_volume": 100, "interval": 5}
+
+    def __init__(self, algo_engine: "AlgoEngine", algoid: str, setting: dict):
+        """"""
+        super(IcebergAlgo, self).__init__(algo_engine, algoid, setting)
+
+        self.display_volume: float = setting.get(
+            "display_volume", self.default_setting["display_volume"])
+        self.interval: int = setting.get("interval", self.default_setting["interval"])
+
+    def on_start(self):
+        """"""
+        self.send_next()
+        self.schedule(self.interval)
+
+    def on_order(self, order: OrderData):
+        """
+        Rejected child order is only sent again on timer, so that a
+        gateway rejecting all orders is not flooded.
+        """
+        if order.status != Status.REJECTED:
+            self.send_next()
+
+    def on_trade(self, trade: TradeData):
+        """"""
+        self.send_next()
+
+    def on_timer(self):
+        """"""
+        self.send_next()
+        self.schedule(self.interval)
+
+    def send_next(self):
+        """"""
+        if self.get_inflight_volume() > 0:
+            return
+
+        volume = min(self.display_volume, self.get_sendable_volume())
+        self.send_order(self.price, volume)
+
+
+ALGO_CLASSES = {
+    "TWAP": TwapAlgo,
+    "VWAP": VwapAlgo,
+    "Iceberg": IcebergAlgo,
+}
+
+
+class AlgoEngine(BaseEngine):
+    """
+    Run execution algos with a shared timer wheel. Algo callbacks are all
+    called in event thread.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(AlgoEngine, self).__init__(main_engine, event_engine, "Algo")
+
+        self.algos: Dict[str, AlgoTemplate] = {}
+        self.algo_count = count(1)
+        self.orderid_algo_map: Dict[str, AlgoTemplate] = {}
+
+        self.ticks: Dict[str, TickData] = {}
+        self.symbols: Set[str] = set()
+
+        self.wheel = TimerWheel(SETTINGS["algo.wheel_size"])
+
+        # Requests are collected while algos are called, and sent in batch.
+        self.pending_algos: List[AlgoTemplate] = []
+        self.pending_reqs: List[OrderRequest] = []
+
+        # Algos are started from other threads, e.g. GUI.
+        self.lock = Lock()
+        self.starting_algos: List[AlgoTemplate] = []
+
+        self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+        self.event_engine.register(EVENT_ORDER, self.process_order_event)
+        self.event_engine.register(EVENT_TRADE, self.process_trade_event)
+
+    def start_algo(self, template_name: str, setting: dict) -> str:
+        """
+        Create algo which is started on next timer event, algoid is returned.
+        """
+        algo_class = ALGO_CLASSES[template_name]
+        algoid = f"{template_name}.{next(self.algo_count)}"
+        algo = algo_class(self, algoid, setting)
+
+        with self.lock:
+            self.algos[algoid] = algo
+            self.starting_algos.append(algo)
+
+        vt_symbol = algo.vt_symbol
+        if vt_symbol not in self.symbols:
+            self.symbols.add(vt_symbol)
+            self.event_engine.register(EVENT_TICK + vt_symbol, self.process_tick_event)
+
+            symbol, exchange = extract_vt_symbol(vt_symbol)
+            self.main_engine.subscribe(SubscribeRequest(symbol, exchange))
+
+        return algoid
+
+    def stop_algo(self, algoid: str):
+        """
+        Stop algo on next timer event.
+        """
+        algo = self.algos.get(algoid, None)
+        if algo:
+            self.schedule(algo, 1, stop=True)
+
+    def stop_all(self):
+        """"""
+        for algoid in list(self.algos.keys()):
+            self.stop_algo(algoid)
+
+    def process_tick_event(self, event: Event):
+        """"""
+        tick = event.data
+        self.ticks[tick.vt_symbol] = tick
+
+    def process_timer_event(self, event: Event):
+        """"""
+        with self.lock:
+            starting_algos = self.starting_algos
+            self.starting_algos = []
+            due = self.wheel.advance()
+
+        for algo in starting_algos:
+            algo.start()
+
+        for algo, stop in due:
+            if not algo.active:
+                continue
+
+            if stop:
+                algo.stop()
+            else:
+                algo.on_timer()
+
+        self.flush()
+
+    def process_order_event(self, event: Event):
+        """"""
+        order = event.data
+        algo = self.orderid_algo_map.get(order.vt_orderid, None)
+        if algo:
+            algo.update_order(order)
+            self.flush()
+
+    def process_trade_event(self, event: Event):
+        """"""
+        trade = event.data
+        algo = self.orderid_algo_map.get(trade.vt_orderid, None)
+        if algo:
+            algo.update_trade(trade)
+            self.flush()
+
+    def schedule(self, algo: AlgoTemplate, delay: int, stop: bool = False):
+        """"""
+        with self.lock:
+            self.wheel.schedule((algo, stop), delay)
+
+    def get_tick(self, vt_symbol: str) -> Optional[TickData]:
+        """"""
+        return self.ticks.get(vt_symbol, None)
+
+    def send_order(self, algo: AlgoTemplate, direction: Direction, price: float, volume: float):
+        """"""
+        symbol, exchange = extract_vt_symbol(algo.vt_symbol)
+
+        contract = self.main_engine.get_contract(algo.vt_symbol)
+        if contract:
+            price = round_to(price, contract.pricetick)
+            volume = round_to(volume, contract.min_volume)
+            if volume <= 0:
+                return
+
+        algo.pending_volume += volume
+
+        req = OrderRequest(
+            symbol=symbol,
+            exchange=exchange,
+            direction=direction,
+            type=OrderType.LIMIT,
+            volume=volume,
+            price=price,
+        )
+        self.pending_algos.append(algo)
+        self.pending_reqs.append(req)
+
+    def cancel_orders(self, orders: List[OrderData]):
+        """"""
+        self.main_engine.cancel_orders([order.create_cancel_request() for order in orders])
+
+    def flush(self):
+        """
+        Send child orders collected from algos in one batch.
+        """
+        if not self.pending_reqs:
+            return
+
+        algos = self.pending_algos
+        reqs = self.pending_reqs
+        self.pending_algos = []
+        self.pending_reqs = []
+
+        vt_orderids = self.main_engine.send_orders(reqs)
+        for algo, req, vt_orderid in zip(algos, reqs, vt_orderids):
+            algo.pending_volume -= req.volume
+            if vt_orderid:
+                self.orderid_algo_map[vt_orderid] = algo
+                algo.add_child_order(vt_orderid, req.volume)
+
+    def remove_order(self, vt_orderid: str):
+        """
+        Child order is forgotten when finished and all trades received.
+        """
+        self.orderid_algo_map.pop(vt_orderid, None)
+
+    def on_algo_stopped(self, algo: AlgoTemplate):
+        """"""
+        with self.lock:
+            self.algos.pop(algo.algoid, None)
+
+    def write_log(self, msg: str, algo: AlgoTemplate = None):
+        """"""
+        source = algo.algoid if algo else "Algo"
+        self.main_engine.write_log(msg, source)
+
+    def close(self):
+        """"""
+        self.event_engine.unregister(EVENT_TIMER, self.process_timer_event)
+        self.event_engine.unregister(EVENT_ORDER, self.process_order_event)
+        self.event_engine.unregister(EVENT_TRADE, self.process_trade_event)
+        for vt_symbol in self.symbols:
+            self.event_engine.unregister(EVENT_TICK + vt_symbol, self.process_tick_event)
@@ -0,0 +1,364 @@
+"""
+Event-driven backtesting of strategies with the same data objects used
+in live trading.
+
+Ticks are replayed by a synchronous loop without event engine, and the
+clock of backtesting is the datetime of the tick being replayed, so the
+result of a run is fully deterministic.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from constant import Direction, OrderType, Status
+from object import OrderData, TickData, TradeData
+from strategy import StrategyTemplate
+from utility import BarGenerator, extract_vt_symbol
+
+
+class BacktestingEngine:
+    """
+    Replay tick data to a strategy and match its orders with ticks.
+    """
+
+    gateway_name = "BACKTESTING"
+
+    def __init__(self):
+        """"""
+        self.vt_symbols: List[str] = []
+        self.capital = 1_000_000
+        self.rate = 0
+        self.slippage = 0
+        self.size = 1
+        self.annual_days = 240
+
+        self.strategy_class = None
+        self.strategy = None
+        self.ticks: Iterable[TickData] = []
+
+        # Simulated clock
+        self.datetime: datetime = None
+
+        self.order_count = 0
+        self.trade_count = 0
+        self.active_orders: Dict[str, Dict[str, OrderData]] = defaultdict(dict)
+        self.orders: Dict[str, OrderData] = {}
+        self.trades: Dict[str, TradeData] = {}
+
+        self.bar_generators: Dict[str, BarGenerator] = {}
+        self.close_prices: Dict[str, Dict] = defaultdict(dict)
+        self.tick_count = 0
+
+        self.logs: List[str] = []
+
+    def set_parameters(
+        self,
+        vt_symbols: List[str],
+        capital: float = 1_000_000,
+        rate: float = 0,
+        slippage: float = 0,
+        size: float = 1,
+        annual_days: int = 240,
+    ):
+        """"""
+        self.vt_symbols = vt_symbols
+        self.capital = capital
+        self.rate = rate
+        self.slippage = slippage
+        self.size = size
+        self.annual_days = annual_days
+
+    def add_strategy(self, strategy_class: type, setting: dict = None):
+        """"""
+        self.strategy_class = strategy_class
+        self.strategy = strategy_class(
+            self, strategy_class.__name__, self.vt_symbols, setting or {}
+        )
+
+    def set_ticks(self, ticks: Iterable[TickData]):
+        """
+        Set recorded or generated ticks in time order to replay.
+        """
+        self.ticks = ticks
+
+    def run_backtesting(self):
+        """"""
+        strategy = self.strategy
+
+        # Bars are only generated if strategy uses them.
+        if type(strategy).on_bar is not StrategyTemplate.on_bar:
+            for vt_symbol in self.vt_symbols:
+                self.bar_generators[vt_symbol] = BarGenerator(strategy.on_bar)
+
+        strategy.init()
+        strategy.start()
+
+        bar_generators = self.bar_generators
+        close_prices = self.close_prices
+        active_orders = self.active_orders
+        on_tick = strategy.on_tick
+
+        for tick in self.ticks:
+            self.datetime = tick.datetime
+            vt_symbol = tick.vt_symbol
+
+            if active_orders[vt_symbol]:
+                self.cross_order(tick)
+
+            on_tick(tick)
+
+            bar_generator = bar_generators.get(vt_symbol, None)
+            if bar_generator:
+                bar_generator.update_tick(tick)
+
+            close_prices[vt_symbol][tick.datetime.date()] = tick.last_price
+            self.tick_count += 1
+
+        strategy.stop()
+
+    def cross_order(self, tick: TickData):
+        """
+        Fill active orders of tick's symbol whose price crosses best price.
+        """
+        orders = self.active_orders[tick.vt_symbol]
+
+        for orderid, order in list(orders.items()):
+            if order.direction == Direction.LONG:
+                if not tick.ask_price_1 or order.price < tick.ask_price_1:
+                    continue
+                price = min(order.price, tick.ask_price_1)
+            else:
+                if not tick.bid_price_1 or order.price > tick.bid_price_1:
+                    continue
+                price = max(order.price, tick.bid_price_1)
+
+            orders.pop(orderid)
+
+            order.traded = order.volume
+            order.status = Status.ALLTRADED
+            self.strategy.on_order(order)
+
+            self.trade_count += 1
+            trade = TradeData(
+                symbol=order.symbol,
+                exchange=order.exchange,
+                orderid=order.orderid,
+                tradeid=str(self.trade_count),
+                direction=order.direction,
+                price=price,
+                volume=order.volume,
+                time=self.datetime.strftime("%H:%M:%S"),
+                datetime=self.datetime,
+                gateway_name=self.gateway_name,
+            )
+            self.trades[trade.vt_tradeid] = trade
+            self.strategy.on_trade(trade)
+
+    def send_order(
+        self,
+        strategy: StrategyTemplate,
+        vt_symbol: str,
+        direction: Direction,
+        price: float,
+        volume: float,
+    ) -> str:
+        """"""
+        symbol, exchange = extract_vt_symbol(vt_symbol)
+
+        # Order may be sent in on_init or on_start before the first tick,
+        # then it has no time and is matched from the first tick.
+        time = self.datetime.strftime("%H:%M:%S") if self.datetime else ""
+
+        self.order_count += 1
+        order = OrderData(
+            symbol=symbol,
+            exchange=exchange,
+            orderid=str(self.order_count),
+            type=OrderType.LIMIT,
+            direction=direction,
+            price=price,
+            volume=volume,
+            time=time,
+            status=Status.NOTTRADED,
+            gateway_name=self.gateway_name,
+        )
+
+        self.orders[order.vt_orderid] = order
+        self.active_orders[vt_symbol][order.orderid] = order
+        return order.vt_orderid
+
+    def cancel_order(self, strategy: StrategyTemplate, vt_orderid: str):
+        """"""
+        order = self.orders.get(vt_orderid, None)
+        if not order or not order.is_active():
+            return
+
+        self.active_orders[order.vt_symbol].pop(order.orderid, None)
+        order.status = Status.CANCELLED
+        self.strategy.on_order(order)
+
+    def write_log(self, msg: str, strategy: StrategyTemplate = None):
+        """"""
+        self.logs.append(f"{self.datetime}\t{msg}")
+
+    def calculate_result(self) -> Dict[str, np.ndarray]:
+        """
+        Calculate daily pnl of all symbols with vectorized NumPy operations.
+        """
+        dates = sorted(set(d for prices in self.close_prices.values() for d in prices))
+        day_count = len(dates)
+        date_array = np.array(dates, dtype="datetime64[D]")
+
+        trading_pnl = np.zeros(day_count)
+        holding_pnl = np.zeros(day_count)
+        commission = np.zeros(day_count)
+        slippage = np.zeros(day_count)
+        trade_count = np.zeros(day_count, dtype=int)
+
+        trades_by_symbol = defaultdict(list)
+        for trade in self.trades.values():
+            trades_by_symbol[trade.vt_symbol].append(trade)
+
+        for vt_symbol, prices in self.close_prices.items():
+            # Close price of days without tick is carried from previous day.
+            close = np.full(day_count, np.nan)
+            ix = np.searchsorted(date_array, np.array(list(prices.keys()), dtype="datetime64[D]"))
+            close[ix] = list(prices.values())
+            valid = np.where(np.isnan(close), 0, np.arange(day_count))
+            close = close[np.maximum.accumulate(valid)]
+
+            trades = trades_by_symbol[vt_symbol]
+            if not trades:
+                continue
+
+            trade_day = np.searchsorted(
+                date_array, np.array([t.datetime.date() for t in trades], dtype="datetime64[D]"))
+            trade_price = np.array([t.price for t in trades])
+            trade_volume = np.array([
+                t.volume if t.direction == Direction.LONG else -t.volume for t in trades
+            ])
+
+            # Position at end of each day
+            pos_change = np.bincount(trade_day, weights=trade_volume, minlength=day_count)
+            pos = np.cumsum(pos_change)
+            start_pos = np.concatenate(([0], pos[:-1]))
+            pre_close = np.concatenate(([close[0]], close[:-1]))
+
+            holding_pnl += np.nan_to_num(start_pos * (close - pre_close) * self.size)
+            trading_pnl += np.bincount(
+                trade_day,
+                weights=trade_volume * (close[trade_day] - trade_price) * self.size,
+                minlength=day_count,
+            )
+
+            turnover = np.abs(trade_volume) * trade_price * self.size
+            commission += np.bincount(trade_day, weights=turnover * self.rate, minlength=day_count)
+            slippage += np.bincount(
+                trade_day,
+                weights=np.abs(trade_volume) * self.size * self.slippage,
+                minlength=day_count,
+            )
+            trade_count += np.bincount(trade_day, minlength=day_count)
+
+        net_pnl = trading_pnl + holding_pnl - commission - slippage
+
+        return {
+            "date": date_array,
+            "trade_count": trade_count,
+            "trading_pnl": trading_pnl,
+            "holding_pnl": holding_pnl,
+            "commission": commission,
+            "slippage": slippage,
+            "net_pnl": net_pnl,
+            "balance": self.capital + np.cumsum(net_pnl),
+        }
+
+    def calculate_statistics(self, result: Dict[str, np.ndarray] = None) -> dict:
+        """
+        Calculate performance statistics from daily result.
+        """
+        if result is None:
+            result = self.calculate_result()
+
+        balance = result["balance"]
+        net_pnl = result["net_pnl"]
+        day_count = len(balance)
+
+        if not day_count:
+            return {"total_days": 0, "total_trade_count": 0}
+
+        pre_balance = np.concatenate(([self.capital], balance[:-1]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.where(
+                (balance > 0) & (pre_balance > 0), np.log(balance / pre_balance), 0)
+
+        highlevel = np.maximum.accumulate(np.concatenate(([self.capital], balance)))[1:]
+        drawdown = balance - highlevel
+        ddpercent = drawdown / highlevel * 100
+
+        total_return = (balance[-1] / self.capital - 1) * 100
+        return_std = returns.std()
+        if return_std:
+            sharpe_ratio = returns.mean() / return_std * np.sqrt(self.annual_days)
+        else:
+            sharpe_ratio = 0
+
+        return {
+            "start_date": str(result["date"][0]),
+            "end_date": str(result["date"][-1]),
+            "total_days": day_count,
+            "profit_days": int((net_pnl > 0).sum()),
+            "loss_days": int((net_pnl < 0).sum()),
+            "end_balance": float(balance[-1]),
+            "max_drawdown": float(drawdown.min()),
+            "max_ddpercent": float(ddpercent.min()),
+            "total_net_pnl": float(net_pnl.sum()),
+            "total_commission": float(result["commission"].sum()),
+            "total_slippage": float(result["slippage"].sum()),
+            "total_trade_count": int(result["trade_count"].sum()),
+            "total_return": float(total_return),
+            "annual_return": float(total_return / day_count * self.annual_days),
+            "daily_net_pnl": float(net_pnl.mean()),
+            "sharpe_ratio": float(sharpe_ratio),
+        }
+
+
+def generate_ticks(
+    vt_symbol: str,
+    start: datetime,
+    count: int,
+    interval: timedelta = timedelta(seconds=1),
+    init_price: float = 100,
+    seed: int = 0,
+) -> List[TickData]:
+    """
+    Generate synthetic ticks of a random walk, same seed gives same ticks.
+    """
+    symbol, exchange = extract_vt_symbol(vt_symbol)
+
+    rng = np.random.default_rng(seed)
+    last_prices = np.round(init_price * np.exp(np.cumsum(rng.normal(0, 0.0005, count))), 2)
+    volumes = np.cumsum(rng.integers(1, 10, count) * 100)
+
+    ticks = []
+    dt = start
+    for last_price, volume in zip(last_prices.tolist(), volumes.tolist()):
+        tick = TickData(
+            symbol=symbol,
+            exchange=exchange,
+            datetime=dt,
+            name="stock",
+            volume=volume,
+            last_price=last_price,
+            bid_price_1=round(last_price - 0.01, 2),
+            ask_price_1=round(last_price + 0.01, 2),
+            bid_volume_1=1000,
+            ask_volume_1=1000,
+        )
+        ticks.append(tick)
+        dt += interval
+
+    return ticks
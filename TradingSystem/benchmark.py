@@ -0,0 +1,723 @@
+"""
+Benchmarks of trading system components.
+
+    python benchmark.py ipc --count 100000
+    python benchmark.py event gateway order monitor --output result.json
+
+Results are printed and, if output is given, saved as JSON together with
+time, platform and git commit of the run, so runs can be compared.
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from threading import Event as ThreadingEvent
+from collections import deque
+from time import perf_counter, perf_counter_ns, sleep
+from typing import Sequence
+
+import numpy as np
+
+from constant import Direction, Exchange, OrderType, Status
+from event import Event, EventEngine, EVENT_ORDER, EVENT_TICK
+from object import OrderRequest, SubscribeRequest, TickData
+from setting import SETTINGS
+
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def create_tick(symbol: str = "AAPL", exchange: Exchange = Exchange.NYMEX) -> TickData:
+    """
+    Create a tick with all price fields filled.
+    """
+    return TickData(
+        symbol=symbol,
+        exchange=exchange,
+        datetime=datetime.datetime.now(),
+        name="stock",
+        last_price=100.0,
+        open_price=99.0,
+        high_price=101.0,
+        low_price=98.0,
+        bid_price_1=99.9,
+        ask_price_1=100.1,
+        bid_volume_1=2000,
+        ask_volume_1=1800,
+    )
+
+
+def get_percentiles(samples: Sequence[int], prefix: str = "latency") -> dict:
+    """
+    Get mean and percentiles of nanosecond samples in microseconds.
+    """
+    array = np.asarray(samples, dtype=float) / 1000
+    result = {f"{prefix}_mean_us": float(array.mean())}
+    for percentile, value in zip(PERCENTILES, np.percentile(array, PERCENTILES)):
+        result[f"{prefix}_p{percentile:g}_us"] = float(value)
+    result[f"{prefix}_max_us"] = float(array.max())
+    return result
+
+
+# Sent after all ticks of ipc benchmark, since ticks not read yet by
+# client are conflated by server.
+EVENT_IPC_END = "eIpcEnd"
+IPC_SYMBOLS = 1000
+
+
+def _run_ipc_server(address: str, count: int):
+    """
+    Engine process of ipc benchmark: publish count ticks once
+    a client has registered tick event, then the end event.
+    """
+    from engine import MainEngine
+    from rpc import RpcServer
+
+    event_engine = EventEngine()
+    main_engine = MainEngine(event_engine)
+
+    server = RpcServer(main_engine, event_engine, address)
+    server.start()
+
+    while not server.get_subscriber_count(EVENT_IPC_END):
+        sleep(0.01)
+
+    # Ticks of different symbols, so that few of them are conflated.
+    ticks = [create_tick(f"S{i}") for i in range(IPC_SYMBOLS)]
+    for i in range(count):
+        event_engine.put(Event(EVENT_TICK, ticks[i % IPC_SYMBOLS]))
+    event_engine.put(Event(EVENT_IPC_END))
+
+    # Wait for client to disconnect after receiving all events.
+    while server.get_client_count():
+        sleep(0.1)
+
+    server.close()
+    main_engine.close()
+
+
+def benchmark_ipc(count: int = 100000) -> dict:
+    """
+    Measure tick events per second published from engine process
+    and handled by RemoteEventEngine in this process. Ticks conflated
+    by server are not counted as received.
+    """
+    from codec import encode_message
+    from rpc import RemoteEventEngine
+
+    address = os.path.join(tempfile.mkdtemp(), "benchmark.sock")
+
+    server = Process(target=_run_ipc_server, args=(address, count))
+    server.start()
+
+    while not os.path.exists(address):
+        sleep(0.01)
+
+    done = ThreadingEvent()
+    received = [0]
+    timestamps = []
+
+    def process_tick_event(event: Event):
+        """"""
+        if not received[0]:
+            timestamps.append(perf_counter())
+
+        received[0] += 1
+
+    def process_end_event(event: Event):
+        """"""
+        timestamps.append(perf_counter())
+        done.set()
+
+    event_engine = RemoteEventEngine(address)
+    event_engine.register(EVENT_TICK, process_tick_event)
+    event_engine.register(EVENT_IPC_END, process_end_event)
+    event_engine.start()
+
+    done.wait()
+    event_engine.stop()
+    server.join()
+
+    elapsed = timestamps[1] - timestamps[0]
+    return {
+        "name": "ipc",
+        "count": count,
+        "received": received[0],
+        "seconds": elapsed,
+        "events_per_second": received[0] / elapsed,
+        "message_bytes": len(encode_message(EVENT_TICK, create_tick())),
+    }
+
+
+def _run_stub_exchange(conn: Connection):
+    """
+    Exchange process of tcp benchmark: send listening port, then serve
+    until parent process exits.
+    """
+    from stub_exchange import StubExchange
+
+    exchange = StubExchange(interval=1)
+    exchange.start()
+    conn.send(exchange.port)
+    exchange.thread.join()
+
+
+def benchmark_tcp(count: int = 10000) -> dict:
+    """
+    Measure round trip latency of orders sent one by one through
+    TcpGateway to stub exchange process, and throughput of count
+    pipelined orders until all of them are filled.
+    """
+    from engine import MainEngine
+    from tcp_gateway import TcpGateway
+
+    parent_conn, child_conn = Pipe()
+    server = Process(target=_run_stub_exchange, args=(child_conn,), daemon=True)
+    server.start()
+    port = parent_conn.recv()
+
+    event_engine = EventEngine()
+    main_engine = MainEngine(event_engine)
+
+    filled = [0]
+    done = ThreadingEvent()
+    target = [0]
+
+    def process_order_event(event: Event):
+        """"""
+        if event.data.status == Status.ALLTRADED:
+            filled[0] += 1
+            if filled[0] == target[0]:
+                done.set()
+
+    event_engine.register(EVENT_ORDER, process_order_event)
+
+    gateway = TcpGateway(main_engine, event_engine, f"127.0.0.1:{port}")
+    main_engine.add_gateway(gateway, [Exchange.NYMEX])
+    while not gateway.connected:
+        sleep(0.01)
+
+    req = OrderRequest(
+        symbol="AAPL",
+        exchange=Exchange.NYMEX,
+        direction=Direction.LONG,
+        type=OrderType.LIMIT,
+        volume=100,
+        price=100000,
+    )
+
+    samples = []
+    for _ in range(min(count, 1000)):
+        filled[0] = 0
+        target[0] = 1
+        done.clear()
+
+        start = perf_counter_ns()
+        gateway.send_order(req)
+        done.wait()
+        samples.append(perf_counter_ns() - start)
+
+    filled[0] = 0
+    target[0] = count
+    done.clear()
+
+    start = perf_counter()
+    for i in range(0, count, 100):
+        gateway.send_orders([req] * min(100, count - i))
+    done.wait()
+    elapsed = perf_counter() - start
+
+    main_engine.close()
+    server.terminate()
+    server.join()
+
+    result = {
+        "name": "tcp",
+        "count": count,
+        "seconds": elapsed,
+        "orders_per_second": count / elapsed,
+    }
+    result.update(get_percentiles(samples, "round_trip"))
+    return result
+
+
+def benchmark_backtest(count: int = 1000000) -> dict:
+    """
+    Measure ticks replayed per minute by backtesting engine with
+    MaCrossStrategy.
+    """
+    from backtesting import BacktestingEngine, generate_ticks
+    from strategies.ma_cross_strategy import MaCrossStrategy
+
+    ticks = generate_ticks("AAPL.NYMEX", datetime.datetime(2020, 1, 2, 9, 30), count)
+
+    engine = BacktestingEngine()
+    engine.set_parameters(["AAPL.NYMEX"])
+    engine.add_strategy(MaCrossStrategy)
+    engine.set_ticks(ticks)
+
+    start = perf_counter()
+    engine.run_backtesting()
+    elapsed = perf_counter() - start
+
+    return {
+        "name": "backtest",
+        "count": count,
+        "seconds": elapsed,
+        "ticks_per_minute": count / elapsed * 60,
+        "trade_count": len(engine.trades),
+    }
+
+
+def benchmark_indicator(count: int = 1000, symbol_count: int = 5000) -> dict:
+    """
+    Measure time of updating every indicator of all symbols with one
+    new bar.
+    """
+    from indicator import (
+        AtrIndicator,
+        EmaIndicator,
+        RollingMaxIndicator,
+        RollingMinIndicator,
+        RsiIndicator,
+        SmaIndicator,
+        StdIndicator,
+        VwapIndicator,
+    )
+
+    rng = np.random.default_rng(0)
+    closes = 100 + np.cumsum(rng.normal(size=(count, symbol_count)), axis=0)
+    highs = closes + rng.random((count, symbol_count))
+    lows = closes - rng.random((count, symbol_count))
+    volumes = rng.random((count, symbol_count)) * 100
+
+    indicators = {
+        "ema": (EmaIndicator(symbol_count, 20), (closes,)),
+        "sma": (SmaIndicator(symbol_count, 20), (closes,)),
+        "std": (StdIndicator(symbol_count, 20), (closes,)),
+        "vwap": (VwapIndicator(symbol_count), (closes, volumes)),
+        "atr": (AtrIndicator(symbol_count, 14), (highs, lows, closes)),
+        "rsi": (RsiIndicator(symbol_count, 14), (closes,)),
+        "max": (RollingMaxIndicator(symbol_count, 20), (highs,)),
+        "min": (RollingMinIndicator(symbol_count, 20), (lows,)),
+    }
+
+    runs = []
+    for name, (indicator, arrays) in indicators.items():
+        durations = []
+        for i in range(count):
+            values = [array[i] for array in arrays]
+            t = perf_counter_ns()
+            indicator.update(*values)
+            durations.append(perf_counter_ns() - t)
+
+        run = {"indicator": name}
+        run.update(get_percentiles(durations, "update"))
+        runs.append(run)
+
+    return {
+        "name": "indicator",
+        "count": count,
+        "symbol_count": symbol_count,
+        "runs": runs,
+    }
+
+
+def benchmark_sanitizer(count: int = 1000000, symbol_count: int = 1000) -> dict:
+    """
+    Measure TickSanitizer check per tick, with every tenth tick a
+    duplicate of the previous one.
+    """
+    from sanitizer import TickSanitizer
+
+    now = datetime.datetime.now()
+    ticks = []
+    for i in range(count // symbol_count):
+        dt = now + datetime.timedelta(seconds=i)
+        for j in range(symbol_count):
+            tick = create_tick(f"S{j}")._replace(datetime=dt, volume=i, last_price=100.0 + (i % 10) * 0.01)
+            ticks.append(tick)
+            if not (i * symbol_count + j) % 10:
+                ticks.append(tick)
+
+    sanitizer = TickSanitizer()
+    check = sanitizer.check
+
+    start = perf_counter()
+    for tick in ticks:
+        check(tick)
+    elapsed = perf_counter() - start
+
+    result = {
+        "name": "sanitizer",
+        "count": len(ticks),
+        "symbol_count": symbol_count,
+        "ns_per_tick": elapsed / len(ticks) * 1e9,
+    }
+    result.update(sanitizer.get_counts())
+    return result
+
+
+def _measure_event_engine(count: int, handler_count: int) -> dict:
+    """
+    Put count events into a started EventEngine with handler_count
+    handlers of the event type.
+    """
+    event_engine = EventEngine()
+    done = ThreadingEvent()
+    received = [0]
+    latencies = []
+
+    def process_event(event: Event):
+        """"""
+        pass
+
+    def process_last_event(event: Event):
+        """
+        Last handler records latency from put to the end of handlers.
+        """
+        latencies.append(perf_counter_ns() - event.data)
+        received[0] += 1
+        if received[0] == count:
+            done.set()
+
+    for _ in range(handler_count - 1):
+        # Each lambda is a new object, so all of them are registered.
+        event_engine.register(EVENT_TICK, lambda event: process_event(event))
+    event_engine.register(EVENT_TICK, process_last_event)
+    event_engine.start()
+
+    # Throughput is measured with events put as fast as possible.
+    start = perf_counter()
+    for _ in range(count):
+        event_engine.put(Event(EVENT_TICK, perf_counter_ns()))
+    done.wait()
+    elapsed = perf_counter() - start
+    burst_latencies = latencies[:]
+
+    # Latency is measured with one event in queue at a time.
+    latencies.clear()
+    for i in range(min(count, 10000)):
+        event_engine.put(Event(EVENT_TICK, perf_counter_ns()))
+        while len(latencies) <= i:
+            sleep(0)
+
+    event_engine.stop()
+
+    result = {
+        "handlers": handler_count,
+        "events_per_second": count / elapsed,
+    }
+    result.update(get_percentiles(latencies))
+    result.update(get_percentiles(burst_latencies, "burst_latency"))
+    return result
+
+
+def benchmark_event(count: int = 100000, max_handlers: int = 8) -> dict:
+    """
+    Measure EventEngine put-to-handler throughput and latency with
+    1, 2, 4 ... max_handlers handlers.
+    """
+    runs = []
+    handler_count = 1
+    while handler_count <= max_handlers:
+        runs.append(_measure_event_engine(count, handler_count))
+        handler_count *= 2
+
+    return {
+        "name": "event",
+        "count": count,
+        "runs": runs,
+    }
+
+
+def benchmark_gateway(count: int = 100000) -> dict:
+    """
+    Measure ticks generated per second by Gateway.generate_Tick, with
+    events put into a stopped event engine.
+    """
+    from gateway import Gateway
+
+    event_engine = EventEngine()
+    gateway = Gateway(event_engine, "AAPL", Exchange.NYMEX)
+
+    durations = []
+    start = perf_counter()
+    for _ in range(count):
+        t = perf_counter_ns()
+        gateway.generate_Tick()
+        durations.append(perf_counter_ns() - t)
+    elapsed = perf_counter() - start
+
+    result = {
+        "name": "gateway",
+        "count": count,
+        "seconds": elapsed,
+        "ticks_per_second": count / elapsed,
+    }
+    result.update(get_percentiles(durations, "generate"))
+    return result
+
+
+def benchmark_order(count: int = 10000) -> dict:
+    """
+    Measure latency of MainEngine.send_order call, and from the call
+    to the first order event being handled.
+    """
+    from engine import MainEngine
+
+    event_engine = EventEngine()
+    main_engine = MainEngine(event_engine)
+
+    received = ThreadingEvent()
+    handled = [0]
+
+    def process_order_event(event: Event):
+        """"""
+        if not handled[0]:
+            handled[0] = perf_counter_ns()
+            received.set()
+
+    event_engine.register(EVENT_ORDER, process_order_event)
+
+    # Latest tick is generated at subscribing, and orders are filled by it.
+    main_engine.subscribe(SubscribeRequest("AAPL", Exchange.NYMEX))
+    req = OrderRequest(
+        symbol="AAPL",
+        exchange=Exchange.NYMEX,
+        direction=Direction.LONG,
+        type=OrderType.LIMIT,
+        volume=1,
+        price=1_000_000,
+    )
+
+    call_latencies = []
+    event_latencies = []
+    for _ in range(count):
+        handled[0] = 0
+        received.clear()
+
+        start = perf_counter_ns()
+        main_engine.send_order(req)
+        end = perf_counter_ns()
+
+        received.wait()
+        call_latencies.append(end - start)
+        event_latencies.append(handled[0] - start)
+
+    main_engine.close()
+
+    result = {
+        "name": "order",
+        "count": count,
+    }
+    result.update(get_percentiles(call_latencies, "call"))
+    result.update(get_percentiles(event_latencies, "event"))
+    return result
+
+
+def benchmark_monitor(count: int = 10000, symbol_count: int = 10) -> dict:
+    """
+    Measure cost of TickMonitor updating a tick under offscreen Qt platform,
+    and of repainting the table afterwards.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PyQt5 import QtWidgets
+    from engine import MainEngine
+    from widget import TickMonitor
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    event_engine = EventEngine()
+    main_engine = MainEngine(event_engine)
+    monitor = TickMonitor(main_engine, event_engine)
+    monitor.resize(1200, 800)
+    monitor.show()
+
+    ticks = [create_tick(f"S{i}") for i in range(symbol_count)]
+
+    update_durations = []
+    paint_durations = []
+    for i in range(count):
+        tick = ticks[i % symbol_count]._replace(last_price=100 + (i % 100) / 100)
+        event = Event(EVENT_TICK, tick)
+
+        start = perf_counter_ns()
+        monitor.process_event(event)
+        update_durations.append(perf_counter_ns() - start)
+
+        start = perf_counter_ns()
+        app.processEvents()
+        paint_durations.append(perf_counter_ns() - start)
+
+    monitor.close()
+    main_engine.close()
+
+    result = {
+        "name": "monitor",
+        "count": count,
+        "symbol_count": symbol_count,
+        "row_count": monitor.rowCount(),
+    }
+    result.update(get_percentiles(update_durations, "update"))
+    result.update(get_percentiles(paint_durations, "paint"))
+    return result
+
+
+def _measure_gc_mode(count: int, pool: bool, tune: bool) -> dict:
+    """
+    Measure tick latency from put to handler, with handler keeping recent
+    ticks as state, like bar generators and strategies do.
+    """
+    event_engine = EventEngine()
+    if pool:
+        event_engine.set_pool([EVENT_TICK])
+
+    history = deque(maxlen=10000)
+    latencies = []
+
+    def process_tick_event(event: Event):
+        """"""
+        history.append(event.data)
+        latencies.append(perf_counter_ns() - event.data.last_price)
+
+    event_engine.register(EVENT_TICK, process_tick_event)
+
+    # Collection pauses of all generations during the run.
+    pauses = []
+    pause_start = [0]
+
+    def gc_callback(phase: str, info: dict):
+        """"""
+        if phase == "start":
+            pause_start[0] = perf_counter_ns()
+        else:
+            pauses.append(perf_counter_ns() - pause_start[0])
+
+    threshold = gc.get_threshold()
+    if tune:
+        event_engine.tune_gc(threshold=(50000, 50, 100), freeze=True)
+
+    gc.callbacks.append(gc_callback)
+    event_engine.start()
+
+    tick = create_tick()
+    for i in range(count):
+        # New tick snapshot for every event like gateway, with send time
+        # carried in last_price.
+        tick = tick._replace(last_price=perf_counter_ns())
+        event_engine.put(event_engine.create_event(EVENT_TICK, tick))
+        while len(latencies) <= i:
+            sleep(0)
+
+    event_engine.stop()
+    gc.callbacks.remove(gc_callback)
+
+    if tune:
+        gc.unfreeze()
+        gc.set_threshold(*threshold)
+
+    result = {
+        "pool": pool,
+        "gc_tuned": tune,
+        "gc_count": len(pauses),
+        "gc_pause_max_us": max(pauses) / 1000 if pauses else 0,
+    }
+    result.update(get_percentiles(latencies))
+    return result
+
+
+def benchmark_gc(count: int = 100000, heap_size: int = 1000000) -> dict:
+    """
+    Compare tick latency with default event allocation and GC, pooled
+    events, and tuned GC with frozen long-lived objects. A heap of
+    heap_size long-lived objects simulates contracts, orders and widgets.
+    """
+    heap = [{"index": i} for i in range(heap_size)]
+
+    runs = [
+        _measure_gc_mode(count, False, False),
+        _measure_gc_mode(count, True, False),
+        _measure_gc_mode(count, False, True),
+        _measure_gc_mode(count, True, True),
+    ]
+
+    del heap
+    return {
+        "name": "gc",
+        "count": count,
+        "heap_size": heap_size,
+        "runs": runs,
+    }
+
+
+BENCHMARKS = {
+    "event": benchmark_event,
+    "gc": benchmark_gc,
+    "gateway": benchmark_gateway,
+    "order": benchmark_order,
+    "monitor": benchmark_monitor,
+    "ipc": benchmark_ipc,
+    "tcp": benchmark_tcp,
+    "backtest": benchmark_backtest,
+    "indicator": benchmark_indicator,
+    "sanitizer": benchmark_sanitizer,
+}
+
+
+def get_git_commit() -> str:
+    """"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trading system benchmarks")
+    parser.add_argument("names", nargs="*", default=list(BENCHMARKS.keys()))
+    parser.add_argument("--count", type=int, default=None,
+                        help="number of iterations, default of each benchmark if not given")
+    parser.add_argument("--output", default="", help="path of JSON file to save results")
+    args = parser.parse_args()
+
+    # Log file is not written during benchmarks.
+    SETTINGS["log.file"] = ""
+
+    results = []
+    for name in args.names:
+        if args.count:
+            result = BENCHMARKS[name](args.count)
+        else:
+            result = BENCHMARKS[name]()
+        print(json.dumps(result))
+        results.append(result)
+
+    if args.output:
+        data = {
+            "time": datetime.datetime.now().isoformat(),
+            "commit": get_git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
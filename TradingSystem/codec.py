@@ -0,0 +1,234 @@
+"""
+Compact binary serialization of data objects for passing events
+between processes.
+"""
+
+import pickle
+from dataclasses import fields, is_dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from struct import Struct
+from typing import Any, Dict, List, Tuple, get_type_hints
+
+from object import (
+    TickData,
+    BarData,
+    OrderData,
+    TradeData,
+    PositionData,
+    AccountData,
+    LogData,
+    SubscribeRequest,
+    OrderRequest,
+    CancelRequest,
+    AlertData,
+)
+
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+CODE_NONE = 0
+CODE_LIST = 253
+CODE_STR = 254
+CODE_PICKLE = 255
+ENUM_NONE = 255
+DATETIME_NONE = -2 ** 63
+
+HEADER = Struct("<BH")
+
+# Code and length of each item of list.
+ITEM = Struct("<BI")
+
+
+def get_fields(data_class: type) -> List[Tuple[str, type]]:
+    """
+    Get name and type of fields passed to constructor of dataclass or
+    named tuple. Derived fields are not encoded.
+    """
+    if is_dataclass(data_class):
+        return [(field.name, field.type) for field in fields(data_class) if field.init]
+
+    types = get_type_hints(data_class)
+    derived_fields = getattr(data_class, "derived_fields", ())
+    return [(name, types[name]) for name in data_class._fields if name not in derived_fields]
+
+
+class DataCodec:
+    """
+    Encode dataclass or named tuple object into a fixed size struct of
+    numbers followed by utf-8 strings. Struct format is precompiled from
+    field types.
+    """
+
+    def __init__(self, code: int, data_class: type):
+        """"""
+        self.code = code
+        self.data_class = data_class
+
+        self.names = []
+        self.kinds = []
+        self.enums = {}
+        self.enum_indexes = {}
+
+        fmt = "<"
+        for name, field_type in get_fields(data_class):
+            self.names.append(name)
+
+            if field_type is float:
+                fmt += "d"
+                self.kinds.append("f")
+            elif field_type is int:
+                fmt += "q"
+                self.kinds.append("i")
+            elif field_type is datetime:
+                fmt += "q"
+                self.kinds.append("t")
+            elif isinstance(field_type, type) and issubclass(field_type, Enum):
+                fmt += "B"
+                self.kinds.append("e")
+                members = list(field_type)
+                self.enums[name] = members
+                self.enum_indexes[name] = {m: i for i, m in enumerate(members)}
+            else:
+                # Length of utf-8 string, which may exceed 64 KiB.
+                fmt += "I"
+                self.kinds.append("s")
+
+        self.struct = Struct(fmt)
+
+    def encode(self, data: Any) -> bytes:
+        """"""
+        values = []
+        strings = []
+
+        for name, kind in zip(self.names, self.kinds):
+            value = getattr(data, name)
+
+            if kind == "f" or kind == "i":
+                values.append(value)
+            elif kind == "t":
+                if value is None:
+                    values.append(DATETIME_NONE)
+                else:
+                    values.append((value - EPOCH) // MICROSECOND)
+            elif kind == "e":
+                values.append(self.enum_indexes[name].get(value, ENUM_NONE))
+            else:
+                buf = str(value).encode("utf-8")
+                values.append(len(buf))
+                strings.append(buf)
+
+        return self.struct.pack(*values) + b"".join(strings)
+
+    def decode(self, buf: bytes, offset: int = 0) -> Any:
+        """"""
+        values = list(self.struct.unpack_from(buf, offset))
+        offset += self.struct.size
+
+        for i, (name, kind) in enumerate(zip(self.names, self.kinds)):
+            value = values[i]
+
+            if kind == "t":
+                if value == DATETIME_NONE:
+                    values[i] = None
+                else:
+                    values[i] = EPOCH + timedelta(microseconds=value)
+            elif kind == "e":
+                values[i] = self.enums[name][value] if value != ENUM_NONE else ""
+            elif kind == "s":
+                values[i] = buf[offset:offset + value].decode("utf-8")
+                offset += value
+
+        return self.data_class(*values)
+
+
+codecs: Dict[type, DataCodec] = {}
+codes: Dict[int, DataCodec] = {}
+
+
+def register_codec(data_class: type):
+    """
+    Register a dataclass or named tuple for binary serialization.
+    """
+    code = len(codes) + 1
+    codec = DataCodec(code, data_class)
+
+    codecs[data_class] = codec
+    codes[code] = codec
+
+
+register_codec(TickData)
+register_codec(BarData)
+register_codec(OrderData)
+register_codec(TradeData)
+register_codec(PositionData)
+register_codec(LogData)
+register_codec(SubscribeRequest)
+register_codec(OrderRequest)
+register_codec(CancelRequest)
+register_codec(AlertData)
+register_codec(AccountData)
+
+
+def encode_message(type: str, data: Any = None) -> bytes:
+    """
+    Encode event type and data into bytes. String and list of objects
+    with registered codec are encoded without pickle, other objects
+    without a registered codec are pickled.
+    """
+    type_buf = type.encode("utf-8")
+
+    if data is None:
+        return HEADER.pack(CODE_NONE, len(type_buf)) + type_buf
+
+    codec = codecs.get(data.__class__, None)
+    if codec:
+        return HEADER.pack(codec.code, len(type_buf)) + type_buf + codec.encode(data)
+
+    if isinstance(data, str):
+        return HEADER.pack(CODE_STR, len(type_buf)) + type_buf + data.encode("utf-8")
+
+    if isinstance(data, list):
+        item_codecs = [codecs.get(item.__class__, None) for item in data]
+        if all(item_codecs):
+            buf = [HEADER.pack(CODE_LIST, len(type_buf)), type_buf]
+            for codec, item in zip(item_codecs, data):
+                item_buf = codec.encode(item)
+                buf.append(ITEM.pack(codec.code, len(item_buf)))
+                buf.append(item_buf)
+            return b"".join(buf)
+
+    payload = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(CODE_PICKLE, len(type_buf)) + type_buf + payload
+
+
+def decode_message(buf: bytes, allow_pickle: bool = True) -> Tuple[str, Any]:
+    """
+    Decode bytes into event type and data. Message from untrusted peer
+    should be decoded without pickle, which can run any code.
+    """
+    code, type_length = HEADER.unpack_from(buf)
+    offset = HEADER.size + type_length
+    type = buf[HEADER.size:offset].decode("utf-8")
+
+    if code == CODE_NONE:
+        data = None
+    elif code == CODE_STR:
+        data = buf[offset:].decode("utf-8")
+    elif code == CODE_LIST:
+        data = []
+        size = len(buf)
+        while offset < size:
+            item_code, length = ITEM.unpack_from(buf, offset)
+            offset += ITEM.size
+            data.append(codes[item_code].decode(buf[offset:offset + length]))
+            offset += length
+    elif code == CODE_PICKLE:
+        if not allow_pickle:
+            raise ValueError(f"pickled data of {type} not allowed")
+        data = pickle.loads(buf[offset:])
+    else:
+        data = codes[code].decode(buf, offset)
+
+    return type, data
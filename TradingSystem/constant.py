@@ -10,6 +10,29 @@ class Direction(Enum):
 
 
 
+class Status(Enum):
+    """
+    Order status.
+    """
+    SUBMITTING = "SUBMITTING"
+    NOTTRADED = "NOTTRADED"
+    PARTTRADED = "PARTTRADED"
+    ALLTRADED = "ALLTRADED"
+    CANCELLED = "CANCELLED"
+    REJECTED = "REJECTED"
+    # Connection lost after order was sent, status is queried on reconnect.
+    UNKNOWN = "UNKNOWN"
+
+
+class AlertStatus(Enum):
+    """
+    Price alert status.
+    """
+    ACTIVE = "ACTIVE"
+    TRIGGERED = "TRIGGERED"
+    CANCELLED = "CANCELLED"
+
+
 class OrderType(Enum):
     """
     Order type.
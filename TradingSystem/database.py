@@ -0,0 +1,401 @@
+"""
+Historical tick and bar database on SQLite in WAL mode.
+
+Data is keyed by (symbol, exchange, datetime), with datetime stored as
+integer microseconds, so that time range queries use the primary key index
+and datetime is never parsed. Fetched rows are converted into a NumPy
+array once, whose datetime column is then reinterpreted as datetime64.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from queue import SimpleQueue
+from threading import Lock, Thread, local
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from constant import Exchange
+from event import Event, EventEngine, EVENT_TICK
+from engine import BaseEngine, MainEngine
+from object import BarData, TickData
+from setting import SETTINGS
+from utility import (
+    BAR_DTYPE,
+    BAR_FIELDS,
+    TICK_DTYPE,
+    TICK_FIELDS,
+    BarGenerator,
+    array_to_ticks,
+)
+
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+TICK_TABLE = "dbtickdata"
+BAR_TABLE = "dbbardata"
+
+# Columns of each table in order of rows, columns added to an existing
+# table are appended, so inserts name their columns.
+TICK_COLUMNS = ["symbol", "exchange", "datetime"] + TICK_FIELDS + ["name"]
+BAR_COLUMNS = ["symbol", "exchange", "datetime"] + BAR_FIELDS
+TABLE_COLUMNS = {TICK_TABLE: TICK_COLUMNS, BAR_TABLE: BAR_COLUMNS}
+
+# Raw dtypes share memory layout with TICK_DTYPE/BAR_DTYPE, with datetime
+# as integer microseconds. Array built from fetched rows is viewed as
+# TICK_DTYPE/BAR_DTYPE without another copy.
+TICK_RAW_DTYPE = np.dtype([("datetime", "i8")] + [(f, "f8") for f in TICK_FIELDS])
+BAR_RAW_DTYPE = np.dtype([("datetime", "i8")] + [(f, "f8") for f in BAR_FIELDS])
+
+
+def to_timestamp(dt: datetime) -> int:
+    """
+    Convert datetime into microseconds since epoch.
+    """
+    return (dt - EPOCH) // MICROSECOND
+
+
+def tick_to_row(tick: TickData) -> tuple:
+    """"""
+    return (
+        tick.symbol,
+        tick.exchange.value,
+        to_timestamp(tick.datetime),
+        tick.volume,
+        tick.open_interest,
+        tick.last_price,
+        tick.last_volume,
+        tick.limit_up,
+        tick.limit_down,
+        tick.open_price,
+        tick.high_price,
+        tick.low_price,
+        tick.pre_close,
+        tick.bid_price_1,
+        tick.ask_price_1,
+        tick.bid_volume_1,
+        tick.ask_volume_1,
+        tick.name,
+    )
+
+
+def bar_to_row(bar: BarData) -> tuple:
+    """"""
+    return (
+        bar.symbol,
+        bar.exchange.value,
+        to_timestamp(bar.datetime),
+        bar.volume,
+        bar.open_price,
+        bar.high_price,
+        bar.low_price,
+        bar.close_price,
+    )
+
+
+class Database:
+    """
+    SQLite database of tick and bar data. Each thread should use its
+    own Database object.
+    """
+
+    def __init__(self, path: str = "", check_same_thread: bool = True):
+        """"""
+        self.path = path or SETTINGS["database.path"]
+
+        self.connection = sqlite3.connect(self.path, check_same_thread=check_same_thread)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        self.init_table(TICK_TABLE, TICK_FIELDS, ["name"])
+        self.init_table(BAR_TABLE, BAR_FIELDS)
+
+    def init_table(self, table: str, fields: List[str], text_fields: List[str] = ()):
+        """
+        Create table, or add columns missing in table created before.
+        """
+        definitions = [f"{name} REAL DEFAULT 0" for name in fields]
+        definitions.extend(f"{name} TEXT DEFAULT ''" for name in text_fields)
+
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "symbol TEXT NOT NULL, exchange TEXT NOT NULL, datetime INTEGER NOT NULL, "
+            f"{', '.join(definitions)}, PRIMARY KEY (symbol, exchange, datetime)) WITHOUT ROWID"
+        )
+
+        existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+        for name, definition in zip(list(fields) + list(text_fields), definitions):
+            if name not in existing:
+                self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+        self.connection.commit()
+
+    def close(self):
+        """"""
+        self.connection.close()
+
+    def save_rows(self, table: str, rows: Sequence[tuple], batch_size: int = 0):
+        """
+        Insert rows in transactions of batch_size rows.
+        """
+        if not rows:
+            return
+
+        batch_size = batch_size or SETTINGS["database.batch_size"]
+        columns = TABLE_COLUMNS[table]
+        placeholders = ", ".join("?" * len(columns))
+        sql = f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+        for start in range(0, len(rows), batch_size):
+            with self.connection:
+                self.connection.executemany(sql, rows[start:start + batch_size])
+
+    def save_tick_data(self, ticks: Sequence[TickData], batch_size: int = 0):
+        """"""
+        self.save_rows(TICK_TABLE, [tick_to_row(tick) for tick in ticks], batch_size)
+
+    def save_bar_data(self, bars: Sequence[BarData], batch_size: int = 0):
+        """"""
+        self.save_rows(BAR_TABLE, [bar_to_row(bar) for bar in bars], batch_size)
+
+    def load_array(
+        self,
+        table: str,
+        fields: List[str],
+        raw_dtype: np.dtype,
+        dtype: np.dtype,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+    ) -> np.ndarray:
+        """
+        Query rows within [start, end] by primary key index. Rows are
+        copied once into array of raw dtype, which is then viewed as dtype.
+        """
+        columns = ", ".join(["datetime"] + fields)
+        cursor = self.connection.execute(
+            f"SELECT {columns} FROM {table} "
+            "WHERE symbol = ? AND exchange = ? AND datetime >= ? AND datetime <= ? "
+            "ORDER BY datetime",
+            (symbol, exchange.value, to_timestamp(start), to_timestamp(end)),
+        )
+
+        array = np.array(cursor.fetchall(), dtype=raw_dtype)
+        return array.view(dtype)
+
+    def load_tick_array(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+    ) -> np.ndarray:
+        """
+        Load ticks as structured array of TICK_DTYPE.
+        """
+        return self.load_array(
+            TICK_TABLE, TICK_FIELDS, TICK_RAW_DTYPE, TICK_DTYPE,
+            symbol, exchange, start, end
+        )
+
+    def load_bar_array(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+    ) -> np.ndarray:
+        """
+        Load bars as structured array of BAR_DTYPE.
+        """
+        return self.load_array(
+            BAR_TABLE, BAR_FIELDS, BAR_RAW_DTYPE, BAR_DTYPE,
+            symbol, exchange, start, end
+        )
+
+    def load_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+    ) -> List[TickData]:
+        """"""
+        array = self.load_tick_array(symbol, exchange, start, end)
+        name = self.load_tick_name(symbol, exchange, end)
+        return list(array_to_ticks(array, symbol, exchange, name=name))
+
+    def load_tick_name(self, symbol: str, exchange: Exchange, end: datetime) -> str:
+        """
+        Name of the latest tick until end, which is used for all loaded
+        ticks as name of a symbol rarely changes.
+        """
+        row = self.connection.execute(
+            f"SELECT name FROM {TICK_TABLE} "
+            "WHERE symbol = ? AND exchange = ? AND datetime <= ? "
+            "ORDER BY datetime DESC LIMIT 1",
+            (symbol, exchange.value, to_timestamp(end)),
+        ).fetchone()
+        return row[0] if row else ""
+
+    def load_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+    ) -> List[BarData]:
+        """"""
+        array = self.load_bar_array(symbol, exchange, start, end)
+
+        columns = [array["datetime"].tolist()]
+        columns.extend(array[name].tolist() for name in BAR_FIELDS)
+
+        return [
+            BarData(symbol, exchange, dt, volume, open_price, high_price, low_price, close_price)
+            for dt, volume, open_price, high_price, low_price, close_price in zip(*columns)
+        ]
+
+    def delete_tick_data(self, symbol: str, exchange: Exchange) -> int:
+        """"""
+        return self.delete_data(TICK_TABLE, symbol, exchange)
+
+    def delete_bar_data(self, symbol: str, exchange: Exchange) -> int:
+        """"""
+        return self.delete_data(BAR_TABLE, symbol, exchange)
+
+    def delete_data(self, table: str, symbol: str, exchange: Exchange) -> int:
+        """"""
+        with self.connection:
+            cursor = self.connection.execute(
+                f"DELETE FROM {table} WHERE symbol = ? AND exchange = ?",
+                (symbol, exchange.value),
+            )
+        return cursor.rowcount
+
+
+class DatabaseEngine(BaseEngine):
+    """
+    Record ticks and 1 minute bars into database. Event thread only puts
+    rows into a queue, and a writer thread inserts them in batches.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(DatabaseEngine, self).__init__(main_engine, event_engine, "Database")
+
+        self.path = SETTINGS["database.path"]
+        self.batch_size = SETTINGS["database.batch_size"]
+        self.record_tick = SETTINGS["database.record_tick"]
+        self.record_bar = SETTINGS["database.record_bar"]
+
+        # Database for queries of each caller thread, as SQLite connection
+        # should only be used by the thread creating it.
+        self.local = local()
+        self.databases: List[Database] = []
+        self.lock = Lock()
+
+        self.bar_generators: Dict[str, BarGenerator] = {}
+
+        self.queue = SimpleQueue()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+        self.event_engine.register(EVENT_TICK, self.process_tick_event)
+
+    def process_tick_event(self, event: Event):
+        """
+        Row tuple is created here, so it keeps values of the tick
+        at this moment.
+        """
+        tick = event.data
+
+        if self.record_tick:
+            self.queue.put((TICK_TABLE, tick_to_row(tick)))
+
+        if self.record_bar:
+            bar_generator = self.bar_generators.get(tick.vt_symbol, None)
+            if not bar_generator:
+                bar_generator = BarGenerator(self.process_bar)
+                self.bar_generators[tick.vt_symbol] = bar_generator
+            bar_generator.update_tick(tick)
+
+    def process_bar(self, bar: BarData):
+        """"""
+        self.queue.put((BAR_TABLE, bar_to_row(bar)))
+
+    def run(self):
+        """
+        Wait for the first row, then take all rows queued at the moment
+        (up to batch_size) and insert them in one transaction.
+        """
+        database = Database(self.path)
+
+        active = True
+        while active:
+            batches = {TICK_TABLE: [], BAR_TABLE: []}
+
+            item = self.queue.get()
+            count = 0
+            while True:
+                if item is None:
+                    active = False
+                    break
+
+                table, row = item
+                batches[table].append(row)
+                count += 1
+
+                if count >= self.batch_size or self.queue.empty():
+                    break
+                item = self.queue.get()
+
+            for table, rows in batches.items():
+                database.save_rows(table, rows, self.batch_size)
+
+        database.close()
+
+    def get_database(self) -> Database:
+        """
+        Get database of caller thread, which is opened on first query.
+        """
+        database = getattr(self.local, "database", None)
+        if not database:
+            # Connection is only closed by another thread in close().
+            database = Database(self.path, check_same_thread=False)
+            self.local.database = database
+            with self.lock:
+                self.databases.append(database)
+        return database
+
+    def load_tick_array(self, symbol: str, exchange: Exchange, start: datetime, end: datetime):
+        """"""
+        return self.get_database().load_tick_array(symbol, exchange, start, end)
+
+    def load_bar_array(self, symbol: str, exchange: Exchange, start: datetime, end: datetime):
+        """"""
+        return self.get_database().load_bar_array(symbol, exchange, start, end)
+
+    def load_tick_data(self, symbol: str, exchange: Exchange, start: datetime, end: datetime):
+        """"""
+        return self.get_database().load_tick_data(symbol, exchange, start, end)
+
+    def load_bar_data(self, symbol: str, exchange: Exchange, start: datetime, end: datetime):
+        """"""
+        return self.get_database().load_bar_data(symbol, exchange, start, end)
+
+    def close(self):
+        """
+        Write all queued rows before closing.
+        """
+        self.event_engine.unregister(EVENT_TICK, self.process_tick_event)
+
+        self.queue.put(None)
+        self.thread.join()
+
+        with self.lock:
+            for database in self.databases:
+                database.close()
+            self.databases.clear()
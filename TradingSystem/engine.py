@@ -1,16 +1,51 @@
 """
 """
 
+import csv
+import os
+import sys
 from abc import ABC
-from typing import Any, Sequence
+from bisect import bisect_left
+from collections import defaultdict
+from difflib import get_close_matches
+from datetime import datetime
+from logging import DEBUG, INFO, WARNING, ERROR, CRITICAL
+from queue import SimpleQueue
+from itertools import count
+from threading import Thread
+from pathlib import Path
+from time import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from event import Event, EventEngine
+import numpy as np
+
+from constant import Direction, Exchange
+from event import (
+    Event,
+    EventEngine,
+    EVENT_ACCOUNT,
+    EVENT_CONTRACT,
+    EVENT_LOG,
+    EVENT_ORDER,
+    EVENT_ORDER_BATCH,
+    EVENT_POSITION,
+    EVENT_TIMER,
+)
 from gateway import Gateway
 
 from object import (
+    AccountData,
+    ContractData,
+    LogData,
+    OrderBatchData,
+    OrderData,
     OrderRequest,
+    CancelRequest,
+    PositionData,
     SubscribeRequest,
 )
+from setting import SETTINGS
+from utility import set_pricetick
 
 
 
@@ -22,10 +57,43 @@ class MainEngine:
             self.event_engine = event_engine
         else:
             self.event_engine = EventEngine()
+
+        if SETTINGS["event.trace"]:
+            self.event_engine.start_tracing()
+        if SETTINGS["event.pool_types"]:
+            self.event_engine.set_pool(SETTINGS["event.pool_types"])
+        if SETTINGS["gc.threshold"]:
+            self.event_engine.tune_gc(SETTINGS["gc.threshold"])
         self.event_engine.start()
 
         self.engines = {'Event':self.event_engine}
-        self.exchanges = []
+
+        # Gateways added by name, and gateway of each (exchange, account)
+        # computed when a gateway is added, so routing a request is one
+        # dict lookup. Symbols of exchanges without gateway are traded
+        # on simulated gateways created per vt_symbol.
+        self.gateways: Dict[str, Any] = {}
+        self.routes: Dict[Tuple[Exchange, str], Any] = {}
+        self.sim_gateways: Dict[str, Gateway] = {}
+
+        self.log_engine = self.add_engine(LogEngine)
+        self.contract_engine = self.add_engine(ContractEngine)
+
+        # Latest data of orders, updated by order events.
+        self.orders: Dict[str, OrderData] = {}
+        self.active_orders: Dict[str, OrderData] = {}
+        self.batch_count = count(1)
+
+        # Positions and accounts of all gateways, with net position of
+        # each vt_symbol summed over gateways when a position changes.
+        self.positions: Dict[str, PositionData] = {}
+        self.accounts: Dict[str, AccountData] = {}
+        self.net_positions: Dict[str, float] = defaultdict(float)
+
+        self.event_engine.register(EVENT_ORDER, self.process_order_event)
+        self.event_engine.register(EVENT_POSITION, self.process_position_event)
+        self.event_engine.register(EVENT_ACCOUNT, self.process_account_event)
+        self.event_engine.register(EVENT_TIMER, self.process_timer_event)
 
 
     def add_engine(self, engine_class: Any):
@@ -38,25 +106,322 @@ class MainEngine:
         return engine
 
 
+    def write_log(self, msg: str, source: str = "", level: int = INFO):
+        """
+        Put log message into log engine.
+        """
+        self.log_engine.log(msg, level, source)
+
     def subscribe(self, req:OrderRequest ):
         """
         Subscribe tick data update of a specific gateway.
         """
+        gateway = self.get_gateway(req)
+        gateway.subscribe(req)
+
+    def add_gateway(self, gateway: Any, exchanges: Sequence[Exchange], accounts: Sequence[str] = ("",)):
+        """
+        Route requests of exchanges and accounts to gateway, which is then
+        connected. Requests without account go to the first gateway added
+        for their exchange.
+
+        Every gateway does its I/O in its own thread, and its send and
+        cancel functions only queue requests, so a slow or disconnected
+        gateway does not hold up requests of other gateways.
+        """
+        if gateway.gateway_name in self.gateways:
+            self.write_log(f"gateway {gateway.gateway_name} already added", "MainEngine", WARNING)
+            return
+
+        self.gateways[gateway.gateway_name] = gateway
+        for exchange in exchanges:
+            for account in accounts:
+                self.routes.setdefault((exchange, account), gateway)
+            self.routes.setdefault((exchange, ""), gateway)
+
+        gateway.connect()
+
+    def get_gateway(self, req: Any, account: str = "") -> Optional[Any]:
+        """
+        Get gateway of request exchange and account. Simulated gateway of
+        request symbol is created and started if exchange has no gateway,
+        and None is returned for an account without gateway.
+        """
+        gateway = self.routes.get((req.exchange, account), None)
+        if gateway:
+            return gateway
+        elif account:
+            return None
+
+        vt_symbol = f"{req.symbol}.{req.exchange.value}"
+
+        gateway = self.sim_gateways.get(vt_symbol, None)
+        if not gateway:
+            gateway = Gateway(self.event_engine,req.symbol, req.exchange)
+            gateway.connect()
+            self.sim_gateways[vt_symbol] = gateway
+
+        return gateway
+
+    def find_gateway(self, req: CancelRequest) -> Optional[Any]:
+        """
+        Get gateway of existing order, without creating one.
+        """
+        gateway = self.routes.get((req.exchange, req.account), None)
+        if gateway:
+            return gateway
+        return self.sim_gateways.get(req.vt_symbol, None)
 
+    def get_all_gateways(self) -> List[Any]:
+        """"""
+        return list(self.gateways.values()) + list(self.sim_gateways.values())
+
+    def get_route_accounts(self, exchange: Exchange) -> List[str]:
+        """
+        Get accounts which orders of exchange can be sent to.
+        """
+        return sorted(account for e, account in self.routes if e == exchange)
+
+    def get_latency_report(self) -> str:
+        """
+        Get latency report of traced events, empty if tracing is not started.
+        """
+        tracer = self.event_engine.tracer
+        if not tracer:
+            return ""
+        return tracer.format_report()
+
+    def get_contract(self, vt_symbol: str) -> Optional[ContractData]:
+        """"""
+        return self.contract_engine.get_contract(vt_symbol)
+
+    def send_order(self, req: OrderRequest, ) -> str:
+        """
+        Send new order request, vt_orderid is returned.
+        Empty string is returned if request is rejected.
+        """
+        error = self.contract_engine.check_order(req)
+        if error:
+            self.write_log(f"order rejected: {error}", "MainEngine", WARNING)
+            return ""
+
+        gateway = self.get_gateway(req, req.account)
+        if not gateway:
+            self.write_log(
+                f"order rejected: no gateway of account {req.account} on {req.exchange.value}",
+                "MainEngine",
+                WARNING,
+            )
+            return ""
 
-        gateway = Gateway(self.event_engine,req.symbol, req.exchange)
-        gateway.generate_Tick()
+        return gateway.send_order(req)
 
+    def cancel_order(self, req: CancelRequest):
+        """
+        Send cancel order request.
+        """
+        gateway = self.find_gateway(req)
+        if gateway:
+            gateway.cancel_order(req)
 
-    def send_order(self, req: OrderRequest, ):
+    def send_orders(self, reqs: Sequence[OrderRequest]) -> List[str]:
         """
-        Send new order request
+        Send a batch of orders. Risk check is done for the whole batch at
+        once, and requests are grouped by gateway. One batch event is put
+        with results, and list of vt_orderid is returned, which is empty
+        for rejected request.
         """
-        self.subscribe(req)
+        errors = self.contract_engine.check_orders(reqs)
+        vt_orderids = [""] * len(reqs)
+
+        groups = defaultdict(list)
+        for i, req in enumerate(reqs):
+            if errors[i]:
+                continue
+
+            gateway = self.get_gateway(req, req.account)
+            if gateway:
+                groups[gateway].append(i)
+            else:
+                errors[i] = f"no gateway of account {req.account} on {req.exchange.value}"
 
+        # Failure of one gateway only rejects its own requests.
+        for gateway, indexes in groups.items():
+            try:
+                gateway_orderids = gateway.send_orders([reqs[i] for i in indexes])
+            except Exception as e:
+                for i in indexes:
+                    errors[i] = f"gateway {gateway.gateway_name} failed: {e}"
+                continue
 
-        self.event_engine.put(req)
+            for i, vt_orderid in zip(indexes, gateway_orderids):
+                if vt_orderid:
+                    vt_orderids[i] = vt_orderid
+                else:
+                    errors[i] = f"order rejected by gateway {gateway.gateway_name}"
 
+        self.put_batch_event(vt_orderids, errors, False)
+        return vt_orderids
+
+    def cancel_orders(self, reqs: Sequence[CancelRequest]) -> List[str]:
+        """
+        Cancel a batch of orders grouped by gateway. Errors are returned,
+        which is empty for order cancelled.
+        """
+        vt_orderids = [""] * len(reqs)
+        errors = [""] * len(reqs)
+
+        groups = defaultdict(list)
+        for i, req in enumerate(reqs):
+            gateway = self.find_gateway(req)
+            if gateway:
+                groups[gateway].append(i)
+            else:
+                errors[i] = f"gateway of {req.vt_symbol} not found"
+
+        for gateway, indexes in groups.items():
+            try:
+                results = gateway.cancel_orders([reqs[i] for i in indexes])
+            except Exception as e:
+                for i in indexes:
+                    errors[i] = f"gateway {gateway.gateway_name} failed: {e}"
+                continue
+
+            for i, result in zip(indexes, results):
+                vt_orderids[i] = f"{gateway.gateway_name}.{reqs[i].orderid}"
+                if not result:
+                    errors[i] = f"order {vt_orderids[i]} is not active"
+
+        self.put_batch_event(vt_orderids, errors, True)
+        return errors
+
+    def put_batch_event(self, vt_orderids: List[str], errors: List[str], cancel: bool):
+        """"""
+        batch = OrderBatchData(
+            batchid=str(next(self.batch_count)),
+            vt_orderids=vt_orderids,
+            errors=errors,
+            cancel=cancel,
+        )
+        self.event_engine.put(Event(EVENT_ORDER_BATCH, batch))
+
+        error_count = len(errors) - errors.count("")
+        if error_count:
+            action = "cancel" if cancel else "order"
+            self.write_log(
+                f"{error_count} of {len(errors)} {action} requests failed in batch "
+                f"{batch.batchid}, first error: {next(e for e in errors if e)}",
+                "MainEngine",
+                WARNING,
+            )
+
+    def process_order_event(self, event: Event):
+        """"""
+        order = event.data
+        self.orders[order.vt_orderid] = order
+
+        if order.is_active():
+            self.active_orders[order.vt_orderid] = order
+        else:
+            self.active_orders.pop(order.vt_orderid, None)
+
+    def process_position_event(self, event: Event):
+        """"""
+        position = event.data
+
+        old_position = self.positions.get(position.vt_positionid, None)
+        if old_position:
+            self.net_positions[old_position.vt_symbol] -= get_signed_volume(old_position)
+        self.net_positions[position.vt_symbol] += get_signed_volume(position)
+
+        self.positions[position.vt_positionid] = position
+
+    def process_account_event(self, event: Event):
+        """"""
+        account = event.data
+        self.accounts[account.vt_accountid] = account
+
+    def process_timer_event(self, event: Event):
+        """
+        Flag symbols whose tick feed has gone quiet.
+        """
+        for gateway, sanitizer in self.get_sanitizers():
+            for vt_symbol in sanitizer.check_stale():
+                self.write_log(f"no tick of {vt_symbol} from {gateway.gateway_name}", "MainEngine", WARNING)
+
+    def get_sanitizers(self) -> List[Tuple[Any, Any]]:
+        """
+        Get (gateway, tick sanitizer) of gateways which sanitize ticks.
+        """
+        sanitizers = []
+        for gateway in self.get_all_gateways():
+            sanitizer = getattr(gateway, "sanitizer", None)
+            if sanitizer:
+                sanitizers.append((gateway, sanitizer))
+        return sanitizers
+
+    def get_sanitizer_counts(self) -> Dict[str, int]:
+        """
+        Counts of accepted and dropped ticks summed over gateways.
+        """
+        counts = defaultdict(int)
+        for _, sanitizer in self.get_sanitizers():
+            for name, value in sanitizer.get_counts().items():
+                counts[name] += value
+        return dict(counts)
+
+    def get_stale_symbols(self) -> List[str]:
+        """"""
+        vt_symbols = []
+        for _, sanitizer in self.get_sanitizers():
+            vt_symbols.extend(sanitizer.get_stale_symbols())
+        return vt_symbols
+
+    def get_order(self, vt_orderid: str) -> Optional[OrderData]:
+        """"""
+        return self.orders.get(vt_orderid, None)
+
+    def get_all_active_orders(self, vt_symbol: str = "") -> List[OrderData]:
+        """
+        Get all active orders, or those of vt_symbol if given.
+        """
+        orders = list(self.active_orders.values())
+        if vt_symbol:
+            orders = [order for order in orders if order.vt_symbol == vt_symbol]
+        return orders
+
+    def get_position(self, vt_positionid: str) -> Optional[PositionData]:
+        """"""
+        return self.positions.get(vt_positionid, None)
+
+    def get_all_positions(self) -> List[PositionData]:
+        """"""
+        return list(self.positions.values())
+
+    def get_net_position(self, vt_symbol: str) -> float:
+        """
+        Long minus short volume of vt_symbol over all gateways.
+        """
+        return self.net_positions.get(vt_symbol, 0)
+
+    def get_account(self, vt_accountid: str) -> Optional[AccountData]:
+        """"""
+        return self.accounts.get(vt_accountid, None)
+
+    def get_all_accounts(self) -> List[AccountData]:
+        """"""
+        return list(self.accounts.values())
+
+    def get_total_account(self) -> AccountData:
+        """
+        Balance and frozen summed over all accounts.
+        """
+        accounts = list(self.accounts.values())
+        return AccountData(
+            accountid="TOTAL",
+            balance=sum(account.balance for account in accounts),
+            frozen=sum(account.frozen for account in accounts),
+        )
 
     def close(self):
         """
@@ -66,6 +431,23 @@ class MainEngine:
         # Stop event engine first to prevent new timer event.
         self.event_engine.stop()
 
+        for engine in self.engines.values():
+            if engine is not self.event_engine and engine is not self.log_engine:
+                engine.close()
+
+        for gateway in self.get_all_gateways():
+            gateway.close()
+
+        # Close log engine last to write logs of other engines' closing.
+        self.log_engine.close()
+
+
+def get_signed_volume(position: PositionData) -> float:
+    """"""
+    if position.direction == Direction.SHORT:
+        return -position.all_volume
+    return position.all_volume
+
 
 class BaseEngine(ABC):
     """
@@ -87,3 +469,348 @@ class BaseEngine(ABC):
         """"""
         pass
 
+
+class LogEngine(BaseEngine):
+    """
+    Write log records in batches from a background thread.
+
+    Caller thread only puts a tuple into a SimpleQueue, and a record
+    filtered out by level costs one comparison.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(LogEngine, self).__init__(main_engine, event_engine, "Log")
+
+        self.level = SETTINGS["log.level"]
+        self.console = SETTINGS["log.console"]
+        self.path = SETTINGS["log.file"]
+        self.max_bytes = SETTINGS["log.max_bytes"]
+        self.backup_count = SETTINGS["log.backup_count"]
+        self.batch_size = SETTINGS["log.batch_size"]
+
+        self.file = None
+        self.file_size = 0
+
+        self.queue = SimpleQueue()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def debug(self, msg: str, source: str = ""):
+        """"""
+        if DEBUG >= self.level:
+            self.queue.put((time(), DEBUG, source, msg))
+
+    def info(self, msg: str, source: str = ""):
+        """"""
+        if INFO >= self.level:
+            self.queue.put((time(), INFO, source, msg))
+
+    def warning(self, msg: str, source: str = ""):
+        """"""
+        if WARNING >= self.level:
+            self.queue.put((time(), WARNING, source, msg))
+
+    def error(self, msg: str, source: str = ""):
+        """"""
+        if ERROR >= self.level:
+            self.queue.put((time(), ERROR, source, msg))
+
+    def critical(self, msg: str, source: str = ""):
+        """"""
+        if CRITICAL >= self.level:
+            self.queue.put((time(), CRITICAL, source, msg))
+
+    def log(self, msg: str, level: int = INFO, source: str = ""):
+        """"""
+        if level >= self.level:
+            self.queue.put((time(), level, source, msg))
+
+    def set_level(self, level: int):
+        """"""
+        self.level = level
+
+    def run(self):
+        """
+        Wait for the first record, then take all records queued at the
+        moment (up to batch_size) and write them at once.
+        """
+        active = True
+        while active:
+            logs = []
+
+            item = self.queue.get()
+            while True:
+                if item is None:
+                    active = False
+                    break
+
+                timestamp, level, source, msg = item
+                logs.append(LogData(msg, level, source, datetime.fromtimestamp(timestamp)))
+
+                if len(logs) >= self.batch_size or self.queue.empty():
+                    break
+                item = self.queue.get()
+
+            if logs:
+                self.write_logs(logs)
+
+        if self.file:
+            self.file.close()
+
+    def write_logs(self, logs: Sequence[LogData]):
+        """
+        Write a batch of logs into file and console, and push them to
+        log monitor.
+        """
+        text = "".join(
+            f"{log.time:%Y-%m-%d %H:%M:%S.%f} {log.level_name} {log.source}: {log.msg}\n"
+            for log in logs
+        )
+
+        if self.path:
+            self.write_file(text)
+
+        if self.console:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+        for log in logs:
+            self.event_engine.put(Event(EVENT_LOG, log))
+
+    def write_file(self, text: str):
+        """
+        Write text into log file, which is rotated when exceeding max_bytes.
+        """
+        if not self.file:
+            self.file = open(self.path, "a", encoding="utf-8")
+            self.file_size = self.file.tell()
+
+        if self.max_bytes and self.file_size + len(text) > self.max_bytes and self.file_size:
+            self.rotate_file()
+
+        self.file.write(text)
+        self.file.flush()
+        self.file_size += len(text)
+
+    def rotate_file(self):
+        """
+        Rename log files as log.1, log.2 ... and open a new one.
+        """
+        self.file.close()
+
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.file_size = 0
+
+    def close(self):
+        """
+        Write all queued logs before closing.
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+
+class ContractEngine(BaseEngine):
+    """
+    Instrument master loaded from a local csv file, with indexes built
+    once at loading so every lookup is a dict access.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(ContractEngine, self).__init__(main_engine, event_engine, "Contract")
+
+        self.contracts: Dict[str, ContractData] = {}
+        self.symbol_contracts: Dict[str, List[ContractData]] = {}
+        self.exchange_contracts: Dict[Exchange, List[ContractData]] = {}
+
+        # Tick size and lot size by vt_symbol for order validation.
+        self.priceticks: Dict[str, float] = {}
+        self.min_volumes: Dict[str, float] = {}
+
+        # Sorted (upper case symbol, vt_symbol) for prefix search.
+        self.search_keys: List[tuple] = []
+
+        path = SETTINGS["contract.file"]
+        if path:
+            self.load_contracts(path)
+
+    def load_contracts(self, path: str):
+        """
+        Load contracts from csv file with columns of ContractData fields.
+        Relative path is found in the folder of this module.
+        """
+        file_path = Path(__file__).parent.joinpath(path)
+        if not file_path.exists():
+            self.main_engine.write_log(f"contract file not found: {file_path}", "Contract", WARNING)
+            return
+
+        with open(file_path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                contract = ContractData(
+                    symbol=row["symbol"],
+                    exchange=Exchange(row["exchange"]),
+                    name=row.get("name", ""),
+                    size=float(row.get("size") or 1),
+                    pricetick=float(row.get("pricetick") or 0.01),
+                    min_volume=float(row.get("min_volume") or 1),
+                    gateway_name=row.get("gateway_name", ""),
+                )
+                self.add_contract(contract, False)
+
+        self.search_keys.sort()
+        self.main_engine.write_log(f"{len(self.contracts)} contracts loaded", "Contract")
+
+    def add_contract(self, contract: ContractData, sort: bool = True):
+        """
+        Add contract into indexes and push contract event.
+        """
+        vt_symbol = contract.vt_symbol
+
+        if vt_symbol not in self.contracts:
+            self.symbol_contracts.setdefault(contract.symbol, []).append(contract)
+            self.exchange_contracts.setdefault(contract.exchange, []).append(contract)
+            self.search_keys.append((contract.symbol.upper(), vt_symbol))
+            if sort:
+                self.search_keys.sort()
+        else:
+            old_contract = self.contracts[vt_symbol]
+            for contracts in (
+                self.symbol_contracts[contract.symbol],
+                self.exchange_contracts[contract.exchange],
+            ):
+                contracts[contracts.index(old_contract)] = contract
+
+        self.contracts[vt_symbol] = contract
+        self.priceticks[vt_symbol] = contract.pricetick
+        self.min_volumes[vt_symbol] = contract.min_volume
+
+        # Price digits of formatter are also precomputed.
+        set_pricetick(vt_symbol, contract.pricetick)
+
+        self.event_engine.put(Event(EVENT_CONTRACT, contract))
+
+    def get_contract(self, vt_symbol: str) -> Optional[ContractData]:
+        """"""
+        return self.contracts.get(vt_symbol, None)
+
+    def get_contracts_by_symbol(self, symbol: str) -> List[ContractData]:
+        """"""
+        return self.symbol_contracts.get(symbol, [])
+
+    def get_contracts_by_exchange(self, exchange: Exchange) -> List[ContractData]:
+        """"""
+        return self.exchange_contracts.get(exchange, [])
+
+    def get_all_contracts(self) -> List[ContractData]:
+        """"""
+        return list(self.contracts.values())
+
+    def search_contracts(self, text: str, count: int = 20) -> List[ContractData]:
+        """
+        Search contracts by symbol prefix first, then by symbol or name
+        containing text, and finally by close match of symbol.
+        """
+        text = text.strip().upper()
+        if not text:
+            return []
+
+        vt_symbols = []
+
+        # Prefix match with binary search on sorted symbols.
+        ix = bisect_left(self.search_keys, (text,))
+        for key, vt_symbol in self.search_keys[ix:]:
+            if not key.startswith(text) or len(vt_symbols) >= count:
+                break
+            vt_symbols.append(vt_symbol)
+
+        if len(vt_symbols) < count:
+            found = set(vt_symbols)
+            for key, vt_symbol in self.search_keys:
+                if vt_symbol in found:
+                    continue
+
+                if text in key or text in self.contracts[vt_symbol].name.upper():
+                    vt_symbols.append(vt_symbol)
+                    found.add(vt_symbol)
+                    if len(vt_symbols) >= count:
+                        break
+
+        if not vt_symbols:
+            keys = get_close_matches(text, [key for key, _ in self.search_keys], count)
+            keys = set(keys)
+            vt_symbols = [vt_symbol for key, vt_symbol in self.search_keys if key in keys]
+
+        return [self.contracts[vt_symbol] for vt_symbol in vt_symbols[:count]]
+
+    def check_order(self, req: OrderRequest) -> str:
+        """
+        Check price and volume of order against tick size and lot size of
+        contract. Empty string is returned if order is valid or contract is
+        not found.
+        """
+        vt_symbol = f"{req.symbol}.{req.exchange.value}"
+
+        pricetick = self.priceticks.get(vt_symbol, None)
+        if pricetick is None:
+            return ""
+
+        if pricetick and abs(req.price / pricetick - round(req.price / pricetick)) > 1e-6:
+            return f"price {req.price} of {vt_symbol} is not multiple of pricetick {pricetick}"
+
+        min_volume = self.min_volumes[vt_symbol]
+        if req.volume <= 0 or (
+            min_volume and abs(req.volume / min_volume - round(req.volume / min_volume)) > 1e-6
+        ):
+            return f"volume {req.volume} of {vt_symbol} is not multiple of min_volume {min_volume}"
+
+        return ""
+
+    def check_orders(self, reqs: Sequence[OrderRequest]) -> List[str]:
+        """
+        Same as check_order, with the batch checked by array operations.
+        """
+        if not reqs:
+            return []
+
+        vt_symbols = [f"{req.symbol}.{req.exchange.value}" for req in reqs]
+        prices = np.array([req.price for req in reqs], dtype=float)
+        volumes = np.array([req.volume for req in reqs], dtype=float)
+        priceticks = np.array([self.priceticks.get(v, np.nan) for v in vt_symbols])
+        min_volumes = np.array([self.min_volumes.get(v, np.nan) for v in vt_symbols])
+
+        known = ~np.isnan(priceticks)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_ratio = prices / priceticks
+            volume_ratio = volumes / min_volumes
+
+        invalid_price = known & (priceticks > 0) & (
+            np.abs(price_ratio - np.round(price_ratio)) > 1e-6)
+        invalid_volume = known & ~invalid_price & (
+            (volumes <= 0)
+            | ((min_volumes > 0) & (np.abs(volume_ratio - np.round(volume_ratio)) > 1e-6))
+        )
+
+        errors = [""] * len(reqs)
+        for i in np.flatnonzero(invalid_price).tolist():
+            errors[i] = (
+                f"price {reqs[i].price} of {vt_symbols[i]} "
+                f"is not multiple of pricetick {priceticks[i]}"
+            )
+        for i in np.flatnonzero(invalid_volume).tolist():
+            errors[i] = (
+                f"volume {reqs[i].volume} of {vt_symbols[i]} "
+                f"is not multiple of min_volume {min_volumes[i]}"
+            )
+        return errors
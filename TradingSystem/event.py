@@ -2,23 +2,57 @@
 EVENT_TICK = "eTick."
 EVENT_TRADE = "eTrade."
 EVENT_ORDER = "eOrder."
+EVENT_ORDER_BATCH = "eOrderBatch"
 EVENT_POSITION = "ePosition."
 EVENT_ACCOUNT = "eAccount."
 EVENT_CONTRACT = "eContract."
+EVENT_LOG = "eLog"
+EVENT_ALERT = "eAlert"
+EVENT_SCAN = "eScan"
+import gc
 from collections import defaultdict
 from queue import Empty, Queue
 from threading import Thread
-from time import sleep
-from typing import Any, Callable
+from time import perf_counter_ns, sleep
+from typing import Any, Callable, Sequence
+
+from latency import LatencyAggregator
 
 EVENT_TIMER = "eTimer"
 
+# Events are only stamped when tracing is started by an event engine.
+tracing = False
+
+
 class Event:
+    """
+    Timestamps are monotonic nanoseconds of each stage, which are 0 if the
+    event is not traced. Event with recycle set is put back into pool of
+    event engine after all handlers are called.
+    """
+
+    __slots__ = (
+        "type",
+        "data",
+        "recycle",
+        "created",
+        "enqueued",
+        "dequeued",
+        "handler_end",
+        "applied",
+    )
 
     def __init__(self, type: str, data: Any = None):
         """"""
         self.type = type
         self.data = data
+        self.recycle = False
+
+        self.created = perf_counter_ns() if tracing else 0
+        self.enqueued = 0
+        self.dequeued = 0
+        self.handler_end = 0
+        self.applied = 0
 
 HandlerType = Callable[[Event], None]
 
@@ -34,31 +68,119 @@ class EventEngine:
         self._handlers = defaultdict(list)
         self._general_handlers = []
 
+        # Free events of pooled types, list append and pop are atomic.
+        self._pool_types = set()
+        self._pool = []
+        self._pool_size = 0
+
+        # Types whose events are kept by some handler, never pooled.
+        self._kept_types = set()
+
+        self.tracer: LatencyAggregator = None
+
     def _run(self):
 
         while self._active:
             try:
                 event = self._queue.get(block=True, timeout=1)
-                self._process(event)
+                if event.created:
+                    event.dequeued = perf_counter_ns()
+                    self._process_traced(event)
+                else:
+                    self._process(event)
+
+                if event.recycle:
+                    self._release(event)
             except Empty:
                 pass
 
+    def _process_traced(self, event: Event):
+        """
+        Process event with timestamps of each stage recorded. Handlers
+        start right after dequeued is stamped, so it is not stamped again.
+        """
+        self._process(event)
+        event.handler_end = perf_counter_ns()
+
+        tracer = self.tracer
+        if tracer:
+            tracer.record(event)
+
     def _process(self, event: Event):
 
-        if event.type in self._handlers:
-            # print(event.type,self._handlers[event.type])
-            [handler(event) for handler in self._handlers[event.type]]
+        handlers = self._handlers.get(event.type, None)
+        if handlers:
+            for handler in handlers:
+                handler(event)
 
         if self._general_handlers:
-            [handler(event) for handler in self._general_handlers]
+            for handler in self._general_handlers:
+                handler(event)
 
     def _run_timer(self):
 
         while self._active:
             sleep(self._interval)
-            event = Event(EVENT_TIMER)
+            event = self.create_event(EVENT_TIMER)
             self.put(event)
 
+    def create_event(self, type: str, data: Any = None) -> Event:
+        """
+        Create event, which is taken from pool if its type is pooled.
+        """
+        if type not in self._pool_types:
+            return Event(type, data)
+
+        try:
+            event = self._pool.pop()
+        except IndexError:
+            event = Event(type, data)
+            event.recycle = True
+            return event
+
+        event.type = type
+        event.data = data
+        if tracing:
+            event.created = perf_counter_ns()
+        return event
+
+    def _release(self, event: Event):
+        """
+        Put processed event back into pool. Event created before its
+        type was kept is not put back either.
+        """
+        if len(self._pool) >= self._pool_size or event.type in self._kept_types:
+            return
+
+        event.data = None
+        if event.created:
+            event.created = 0
+            event.enqueued = 0
+            event.dequeued = 0
+            event.handler_end = 0
+            event.applied = 0
+        self._pool.append(event)
+
+    def set_pool(self, types: Sequence[str], size: int = 1024):
+        """
+        Recycle events of types created by create_event. Handlers of these
+        types must not keep the event object after returning, e.g. emit it
+        to Qt signal, but can keep its data. Types passed to keep_events
+        are not pooled.
+        """
+        self._pool_types = set(types) - self._kept_types
+        self._pool_size = size if self._pool_types else 0
+        self._pool.clear()
+
+    def keep_events(self, type: str):
+        """
+        Never pool events of type, as a handler keeps the event object
+        after returning, e.g. a widget emitting it to Qt signal, which is
+        processed later in GUI thread.
+        """
+        self._kept_types.add(type)
+        self._pool_types.discard(type)
+
     def start(self):
         """
         Start event engine to process events and generate timer events.
@@ -79,8 +201,52 @@ class EventEngine:
         """
         Put an event object into event queue.
         """
+        if event.created:
+            event.enqueued = perf_counter_ns()
         self._queue.put(event)
 
+    def start_tracing(self, tracer: LatencyAggregator = None):
+        """
+        Stamp all new events in this process, and record latencies of
+        events processed by this engine into tracer.
+        """
+        global tracing
+
+        self.tracer = tracer or LatencyAggregator()
+        tracing = True
+
+    def stop_tracing(self):
+        """"""
+        global tracing
+
+        tracing = False
+        self.tracer = None
+
+    def tune_gc(self, threshold: Sequence[int] = (), freeze: bool = False):
+        """
+        Reduce GC pauses in event thread: raise thresholds so that young
+        generation is collected less often, and freeze objects created so
+        far (engines, widgets, contracts) into permanent generation so that
+        full collections do not scan them. Freeze should be called after
+        all engines are started.
+        """
+        if threshold:
+            gc.set_threshold(*threshold)
+
+        if freeze:
+            # Collect first so that garbage is not frozen.
+            gc.collect()
+            gc.freeze()
+
+    def trace_applied(self, event: Event):
+        """
+        Called by widgets after data of event is shown on UI.
+        """
+        tracer = self.tracer
+        if event.created and tracer:
+            event.applied = perf_counter_ns()
+            tracer.record_applied(event)
+
     def register(self, type: str, handler: HandlerType):
         """
         Register a new handler function for a specific event type. Every
@@ -1,8 +1,12 @@
 import  numpy as np
 
-from typing import Any, Sequence
+from copy import copy
+from itertools import count
+from threading import Lock
+from typing import Any, List, Sequence
 import datetime
-from event import Event, EventEngine
+from constant import Direction, Status
+from event import Event, EventEngine, EVENT_TIMER
 from event import (
     EVENT_TICK,
     EVENT_ORDER,
@@ -14,14 +18,24 @@ from event import (
 from object import (
     TickData,
     OrderData,
+    TradeData,
     PositionData,
     AccountData,
     OrderRequest,
+    CancelRequest,
     SubscribeRequest,
 )
+from sanitizer import TickSanitizer
 
 
 class Gateway():
+
+    gateway_name = "SIM"
+
+    # Shared by all gateways so that orderid and tradeid are unique.
+    order_count = count(1)
+    trade_count = count(1)
+
     def __init__(self,event_engine,code,exchange):
         self.event_engine=event_engine
         self.code=code
@@ -31,27 +45,253 @@ class Gateway():
 
         self.tick = TickData(self.code, self.exchange, datetime.datetime.now())
 
+        # Active orders waiting to be matched with tick, accessed from
+        # both event thread and order sending threads.
+        self.active_orders = {}
+        self.lock = Lock()
+
+        self.sanitizer = TickSanitizer()
+
+        # Net position of the symbol, long if positive.
+        self.net_volume = 0
+        self.net_price = 0
+
+    @classmethod
+    def set_next_ids(cls, orderid: int, tradeid: int):
+        """
+        Continue orderid and tradeid from recovered data after restart.
+        """
+        cls.order_count = count(max(orderid, next(cls.order_count)))
+        cls.trade_count = count(max(tradeid, next(cls.trade_count)))
+
+    def connect(self):
+        """
+        Start pushing tick data on every timer event.
+        """
+        self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+
+    def close(self):
+        """
+        Stop pushing tick data.
+        """
+        self.event_engine.unregister(EVENT_TIMER, self.process_timer_event)
+
+    def subscribe(self, req: SubscribeRequest):
+        """
+        Push a tick at once, later ticks are pushed on timer.
+        """
+        self.generate_Tick()
+
+    def process_timer_event(self, event: Event):
+        """"""
+        self.generate_Tick()
+
+    def send_order(self, req: OrderRequest) -> str:
+        """
+        Send a simulated order, which is matched with latest tick
+        immediately and then on every new tick.
+        """
+        orderid = str(next(self.order_count))
+        order = req.create_order_data(orderid, self.gateway_name)
+        order.status = Status.NOTTRADED
+        order.time = datetime.datetime.now().strftime("%H:%M:%S")
+
+        with self.lock:
+            self.active_orders[orderid] = order
+            self.on_order(copy(order))
+            self.cross_order(order)
+
+        return order.vt_orderid
+
+    def send_orders(self, reqs: Sequence[OrderRequest]) -> List[str]:
+        """
+        Send a batch of orders with lock acquired once.
+        """
+        time = datetime.datetime.now().strftime("%H:%M:%S")
+
+        orders = []
+        for req in reqs:
+            orderid = str(next(self.order_count))
+            order = req.create_order_data(orderid, self.gateway_name)
+            order.status = Status.NOTTRADED
+            order.time = time
+            orders.append(order)
+
+        with self.lock:
+            for order in orders:
+                self.active_orders[order.orderid] = order
+                self.on_order(copy(order))
+                self.cross_order(order)
+
+        return [order.vt_orderid for order in orders]
+
+    def cancel_order(self, req: CancelRequest) -> bool:
+        """
+        Return False if order is not active.
+        """
+        with self.lock:
+            return self._cancel_order(req)
+
+    def cancel_orders(self, reqs: Sequence[CancelRequest]) -> List[bool]:
+        """
+        Cancel a batch of orders with lock acquired once.
+        """
+        with self.lock:
+            return [self._cancel_order(req) for req in reqs]
+
+    def _cancel_order(self, req: CancelRequest) -> bool:
+        """"""
+        order = self.active_orders.pop(req.orderid, None)
+        if not order:
+            return False
+
+        order.status = Status.CANCELLED
+        self.on_order(copy(order))
+        return True
+
+    def cross_order(self, order: OrderData):
+        """
+        Fill order fully if its price crosses best price of latest tick.
+        """
+        tick = self.tick
+        if not tick.last_price:
+            return
+
+        if order.direction == Direction.LONG:
+            if order.price < tick.ask_price_1:
+                return
+            price = min(order.price, tick.ask_price_1)
+        else:
+            if order.price > tick.bid_price_1:
+                return
+            price = max(order.price, tick.bid_price_1)
+
+        self.active_orders.pop(order.orderid, None)
+
+        order.traded = order.volume
+        order.status = Status.ALLTRADED
+        self.on_order(copy(order))
+
+        trade = TradeData(
+            symbol=order.symbol,
+            exchange=order.exchange,
+            orderid=order.orderid,
+            tradeid=str(next(self.trade_count)),
+            direction=order.direction,
+            price=price,
+            volume=order.volume,
+            time=tick.datetime.strftime("%H:%M:%S"),
+            datetime=tick.datetime,
+            gateway_name=self.gateway_name,
+        )
+        self.on_trade(trade)
+        self.update_position(trade)
+
+    def update_position(self, trade: TradeData):
+        """
+        Update net position by trade. Position of the other direction is
+        pushed as empty when net position changes sign.
+        """
+        volume = trade.volume if trade.direction == Direction.LONG else -trade.volume
+        old_volume = self.net_volume
+        new_volume = old_volume + volume
+
+        if not new_volume:
+            self.net_price = 0
+        elif old_volume * new_volume < 0 or not old_volume:
+            self.net_price = trade.price
+        elif abs(new_volume) > abs(old_volume):
+            self.net_price = (self.net_price * old_volume + trade.price * volume) / new_volume
+        self.net_volume = new_volume
+
+        old_direction = Direction.SHORT if old_volume < 0 else Direction.LONG
+        if old_volume * new_volume < 0:
+            self.on_position(self.create_position(old_direction, 0, 0))
+
+        if new_volume:
+            direction = Direction.SHORT if new_volume < 0 else Direction.LONG
+        else:
+            direction = old_direction
+        self.on_position(self.create_position(direction, abs(new_volume), self.net_price))
+
+    def create_position(self, direction: Direction, volume: float, price: float) -> PositionData:
+        """"""
+        return PositionData(
+            symbol=self.code,
+            exchange=self.exchange,
+            direction=direction,
+            all_volume=volume,
+            volume=volume,
+            price=price,
+            gateway_name=self.gateway_name,
+        )
+
     def on_event(self, type: str, data: Any = None):
         """
         General event push.
         """
-        event = Event(type, data)
+        event = self.event_engine.create_event(type, data)
         self.event_engine.put(event)
 
+    def on_tick(self, tick: TickData):
+        """
+        Tick event push.
+        Tick event of a specific vt_symbol is also pushed.
+        """
+        self.on_event(EVENT_TICK, tick)
+        self.on_event(EVENT_TICK + tick.vt_symbol, tick)
+
+    def on_order(self, order: OrderData):
+        """
+        Order event push.
+        """
+        self.on_event(EVENT_ORDER, order)
+
+    def on_trade(self, trade: TradeData):
+        """
+        Trade event push.
+        """
+        self.on_event(EVENT_TRADE, trade)
+
+    def on_position(self, position: PositionData):
+        """
+        Position event push.
+        """
+        self.on_event(EVENT_POSITION, position)
+
     def generate_Tick(self):
+        """
+        Publish a new tick snapshot, published ticks are never changed.
+        Tick dropped by sanitizer is neither kept as latest tick nor used
+        to match orders.
+        """
+        last_price = self.init_price + round(np.random.normal(0, 1, size=1)[0], 2)
+        volumes = ((np.round(np.random.normal(2000, 500, 2), 0) // 100) * 100).tolist()
+
+        tick = TickData(
+            symbol=self.code,
+            exchange=self.exchange,
+            datetime=datetime.datetime.now(),
+            name="stock",
+            last_price=last_price,
+            open_price=self.init_price,
+            high_price=self.init_price + 3,
+            low_price=self.init_price - 3,
+            bid_price_1=last_price + 0.1,
+            ask_price_1=last_price - 1,
+            bid_volume_1=volumes[0],
+            ask_volume_1=volumes[1],
+        )
+        if not self.sanitizer.check(tick):
+            return
+
+        self.tick = tick
+        self.on_tick(tick)
 
-        self.tick.name='stock'
-        self.tick.open_price=self.init_price
-        self.tick.high_price=self.init_price+3
-        self.tick.low_price=self.init_price-3
-        self.tick.last_price=self.init_price+round(np.random.normal(0,1,size=1)[0],2)
-        self.tick.bid_price_1=self.tick.last_price+0.1
-        self.tick.ask_price_1=self.tick.last_price-1
-        self.tick.bid_volume_1=(round(np.random.normal(2000,500,1)[0],0)//100)*100
-        self.tick.ask_volume_1=(round(np.random.normal(2000,500,1)[0],0)//100)*100
-        self.tick.datetime=datetime.datetime.now()
-
-        self.on_event(EVENT_TICK,self.tick)
+        if self.active_orders:
+            with self.lock:
+                for order in list(self.active_orders.values()):
+                    self.cross_order(order)
 
 if __name__=='__main__':
     gateway=Gateway('0001','123')
@@ -0,0 +1,233 @@
+"""
+Run trading system engines without GUI, e.g. on a server.
+No Qt module is imported here.
+"""
+
+import importlib
+import signal
+import threading
+from typing import Any, Sequence
+
+from event import Event, EventEngine, EVENT_TICK, EVENT_TIMER
+from engine import MainEngine
+from object import SubscribeRequest
+from profiler import ProfilerEngine
+from rpc import RpcServer
+from setting import SETTINGS
+from utility import extract_vt_symbol
+
+
+# Function engines which can be started by name: (module, class)
+ENGINE_CLASSES = {
+    "quote": ("quote", "QuoteEngine"),
+    "strategy": ("strategy", "StrategyEngine"),
+    "database": ("database", "DatabaseEngine"),
+    "algo": ("algo", "AlgoEngine"),
+    "alert": ("alert", "AlertEngine"),
+    "scanner": ("scanner", "ScannerEngine"),
+    "journal": ("journal", "JournalEngine"),
+}
+
+
+def get_engine_class(name: str) -> Any:
+    """
+    Import function engine class by name, so that only engines used
+    are imported.
+    """
+    module_name, class_name = ENGINE_CLASSES[name]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+class HeadlessEngine:
+    """
+    Start event engine, main engine, function engines and gateways,
+    report status by log and shut down cleanly on SIGINT/SIGTERM.
+    """
+
+    def __init__(self, address: str = "", serve: bool = True):
+        """"""
+        self.event_engine = EventEngine()
+        self.main_engine = MainEngine(self.event_engine)
+
+        self.rpc_server = None
+        if serve:
+            self.rpc_server = RpcServer(self.main_engine, self.event_engine, address)
+
+        self.status_interval = SETTINGS["headless.status_interval"]
+        self.timer_count = 0
+        self.tick_count = 0
+
+        self.profiler_engine = self.main_engine.add_engine(ProfilerEngine)
+
+        self._stop = threading.Event()
+
+    def add_engine(self, engine_class: Any):
+        """
+        Add function engine into main engine.
+        """
+        engine = self.main_engine.add_engine(engine_class)
+        self.write_log(f"function engine started: {engine.engine_name}")
+        return engine
+
+    def add_tcp_gateway(self, vt_symbols: Sequence[str], address: str = ""):
+        """
+        Trade exchanges of vt_symbols through exchange server at address
+        instead of simulated gateways.
+        """
+        from tcp_gateway import TcpGateway
+
+        exchanges = {extract_vt_symbol(vt_symbol)[1] for vt_symbol in vt_symbols}
+
+        gateway = TcpGateway(self.main_engine, self.event_engine, address)
+        self.main_engine.add_gateway(gateway, list(exchanges))
+        self.write_log(f"tcp gateway started: {gateway.host}:{gateway.port}")
+
+    def subscribe(self, vt_symbols: Sequence[str]):
+        """
+        Subscribe tick data of vt_symbols, gateways are started accordingly.
+        """
+        for vt_symbol in vt_symbols:
+            symbol, exchange = extract_vt_symbol(vt_symbol)
+            req = SubscribeRequest(symbol=symbol, exchange=exchange)
+            self.main_engine.subscribe(req)
+            self.write_log(f"gateway started: {vt_symbol}")
+
+    def start(self):
+        """"""
+        self.event_engine.register(EVENT_TICK, self.process_tick_event)
+        self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+
+        if self.rpc_server:
+            self.rpc_server.start()
+            self.write_log(f"rpc server listening on {self.rpc_server.address}")
+
+    def run(self):
+        """
+        Block until SIGINT or SIGTERM is received, then close all engines.
+        Must be called from main thread.
+        """
+        signal.signal(signal.SIGINT, self.handle_signal)
+        signal.signal(signal.SIGTERM, self.handle_signal)
+
+        # Profiling is toggled by SIGUSR1 and memory snapshot by SIGUSR2,
+        # e.g. kill -USR1 <pid>, as no tool can be attached in production.
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self.handle_profile_signal)
+            signal.signal(signal.SIGUSR2, self.handle_profile_signal)
+
+        while not self._stop.wait(1):
+            pass
+
+        self.close()
+
+    def stop(self):
+        """
+        Ask run to return.
+        """
+        self._stop.set()
+
+    def close(self):
+        """"""
+        report = self.main_engine.get_latency_report()
+        if report:
+            self.write_log(f"event latency:\n{report}")
+
+        self.write_log("closing engines")
+
+        if self.rpc_server:
+            self.rpc_server.close()
+        self.main_engine.close()
+
+    def write_log(self, msg: str):
+        """"""
+        self.main_engine.write_log(msg, "Headless")
+
+    def start_profiling(self, mode: str = "sample"):
+        """"""
+        self.profiler_engine.start_profiling(mode)
+
+    def stop_profiling(self) -> str:
+        """"""
+        return self.profiler_engine.stop_profiling()
+
+    def take_memory_snapshot(self) -> str:
+        """"""
+        return self.profiler_engine.take_memory_snapshot()
+
+    def handle_profile_signal(self, signum: int, frame: Any):
+        """
+        Profiling is started or stopped in a new thread, so that signal
+        handler returns at once.
+        """
+        if signum == signal.SIGUSR1:
+            if self.profiler_engine.is_profiling():
+                func = self.stop_profiling
+            else:
+                func = self.start_profiling
+        else:
+            func = self.take_memory_snapshot
+
+        threading.Thread(target=func, daemon=True).start()
+
+    def handle_signal(self, signum: int, frame: Any):
+        """"""
+        self.write_log(f"signal received: {signal.Signals(signum).name}")
+        self.stop()
+
+    def process_tick_event(self, event: Event):
+        """"""
+        self.tick_count += 1
+
+    def process_timer_event(self, event: Event):
+        """
+        Log status every status_interval timer events.
+        """
+        self.timer_count += 1
+        if self.timer_count < self.status_interval:
+            return
+
+        tick_rate = self.tick_count / (self.timer_count * self.event_engine._interval)
+        clients = self.rpc_server.get_client_count() if self.rpc_server else 0
+
+        counts = self.main_engine.get_sanitizer_counts()
+        dropped = sum(v for k, v in counts.items() if k not in ("accepted", "stale"))
+
+        self.write_log(
+            f"ticks: {self.tick_count} ({tick_rate:.1f}/s), dropped: {dropped}, "
+            f"stale symbols: {len(self.main_engine.get_stale_symbols())}, "
+            f"queue: {self.event_engine._queue.qsize()}, "
+            f"gateways: {len(self.main_engine.get_all_gateways())}, clients: {clients}"
+        )
+
+        self.timer_count = 0
+        self.tick_count = 0
+
+
+def run_headless(
+    vt_symbols: Sequence[str] = (),
+    engine_classes: Sequence[Any] = (),
+    address: str = "",
+    serve: bool = True,
+    tcp_address: str = None,
+):
+    """
+    Run headless engine until terminated by signal.
+    """
+    # Without GUI, logs are also written to console.
+    SETTINGS["log.console"] = True
+
+    headless_engine = HeadlessEngine(address, serve)
+    for engine_class in engine_classes:
+        headless_engine.add_engine(engine_class)
+
+    headless_engine.start()
+    if tcp_address is not None:
+        headless_engine.add_tcp_gateway(vt_symbols, tcp_address)
+    headless_engine.subscribe(vt_symbols)
+
+    # Objects created at startup are frozen after engines are started.
+    if SETTINGS["gc.freeze"]:
+        headless_engine.event_engine.tune_gc(freeze=True)
+
+    headless_engine.run()
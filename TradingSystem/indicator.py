@@ -0,0 +1,411 @@
+"""
+Incremental indicators over tick or bar stream.
+
+State of every indicator is kept in NumPy arrays with one row per symbol,
+so one update costs O(1) per symbol and updating all symbols is one array
+operation. Symbols are mapped to rows by SymbolIndex.
+
+    index = SymbolIndex(vt_symbols)
+    sma = SmaIndicator(len(index), 20)
+    sma.update(close_prices)                        # all symbols
+    sma.update(tick.last_price, index[tick.vt_symbol])  # one symbol
+
+Values are NaN until an indicator has received window updates.
+When index is given, rows in it should not be repeated in one update.
+"""
+
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+
+IndexType = Union[None, int, Sequence[int], np.ndarray]
+
+
+class SymbolIndex:
+    """
+    Map vt_symbol to row of indicator arrays.
+    """
+
+    def __init__(self, vt_symbols: Sequence[str]):
+        """"""
+        self.vt_symbols = list(vt_symbols)
+        self.indexes: Dict[str, int] = {
+            vt_symbol: i for i, vt_symbol in enumerate(self.vt_symbols)
+        }
+
+    def __getitem__(self, vt_symbol: str) -> int:
+        """"""
+        return self.indexes[vt_symbol]
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.vt_symbols)
+
+    def get_indexes(self, vt_symbols: Sequence[str]) -> np.ndarray:
+        """"""
+        return np.array([self.indexes[vt_symbol] for vt_symbol in vt_symbols], dtype=np.intp)
+
+
+class Indicator:
+    """
+    Base class of indicators with a count of updates of each symbol.
+    """
+
+    def __init__(self, size: int, window: int = 1):
+        """"""
+        if window < 1:
+            raise ValueError("window should be at least 1")
+
+        self.size = size
+        self.window = window
+
+        self.count = np.zeros(size, dtype=np.int64)
+        self.values = np.full(size, np.nan)
+
+    def get_index(self, index: IndexType) -> np.ndarray:
+        """
+        Convert index into array of rows, all rows if index is None.
+        """
+        if index is None:
+            return np.arange(self.size)
+        return np.atleast_1d(np.asarray(index, dtype=np.intp))
+
+    def get_value(self, index: int) -> float:
+        """"""
+        return float(self.values[index])
+
+    def is_inited(self) -> np.ndarray:
+        """
+        Mask of symbols with enough updates.
+        """
+        return self.count >= self.window
+
+
+class EmaIndicator(Indicator):
+    """
+    Exponential moving average with alpha of 2 / (window + 1), started
+    from simple average of the first window values.
+    """
+
+    def __init__(self, size: int, window: int):
+        """"""
+        super(EmaIndicator, self).__init__(size, window)
+
+        self.alpha = 2 / (window + 1)
+        self.sum = np.zeros(size)
+
+    def update(self, values, index: IndexType = None) -> np.ndarray:
+        """"""
+        index = self.get_index(index)
+        values = np.broadcast_to(np.asarray(values, dtype=float), index.shape)
+
+        count = self.count[index] + 1
+        self.count[index] = count
+
+        ema = self.values[index]
+        warmup = count <= self.window
+        if warmup.any():
+            self.sum[index[warmup]] += values[warmup]
+            ema[count == self.window] = (self.sum[index] / self.window)[count == self.window]
+
+        running = count > self.window
+        ema[running] += self.alpha * (values[running] - ema[running])
+
+        self.values[index] = ema
+        return ema
+
+
+class SmaIndicator(Indicator):
+    """
+    Simple moving average by running sum over a ring buffer.
+    """
+
+    def __init__(self, size: int, window: int):
+        """"""
+        super(SmaIndicator, self).__init__(size, window)
+
+        self.buffer = np.zeros((size, window))
+        self.sum = np.zeros(size)
+
+    def push(self, values: np.ndarray, index: np.ndarray) -> np.ndarray:
+        """
+        Put values into ring buffer, and return values dropped out of window.
+        """
+        position = self.count[index] % self.window
+        dropped = self.buffer[index, position]
+        self.buffer[index, position] = values
+        self.count[index] += 1
+        return dropped
+
+    def get_resync_index(self, index: np.ndarray) -> np.ndarray:
+        """
+        Rows whose ring buffer has just been filled once more. Running sums
+        of them are recalculated to clear accumulated rounding error, which
+        costs O(window) every window updates.
+        """
+        return index[self.count[index] % self.window == 0]
+
+    def update(self, values, index: IndexType = None) -> np.ndarray:
+        """"""
+        index = self.get_index(index)
+        values = np.broadcast_to(np.asarray(values, dtype=float), index.shape)
+
+        dropped = self.push(values, index)
+        self.sum[index] += values - dropped
+
+        resync_index = self.get_resync_index(index)
+        if resync_index.size:
+            self.sum[resync_index] = self.buffer[resync_index].sum(axis=1)
+
+        result = np.where(self.count[index] >= self.window, self.sum[index] / self.window, np.nan)
+        self.values[index] = result
+        return result
+
+
+class StdIndicator(SmaIndicator):
+    """
+    Rolling population standard deviation by running sum and sum of squares.
+    """
+
+    def __init__(self, size: int, window: int):
+        """"""
+        super(StdIndicator, self).__init__(size, window)
+
+        self.square_sum = np.zeros(size)
+
+    def update(self, values, index: IndexType = None) -> np.ndarray:
+        """"""
+        index = self.get_index(index)
+        values = np.broadcast_to(np.asarray(values, dtype=float), index.shape)
+
+        dropped = self.push(values, index)
+        self.sum[index] += values - dropped
+        self.square_sum[index] += values * values - dropped * dropped
+
+        resync_index = self.get_resync_index(index)
+        if resync_index.size:
+            buffer = self.buffer[resync_index]
+            self.sum[resync_index] = buffer.sum(axis=1)
+            self.square_sum[resync_index] = (buffer * buffer).sum(axis=1)
+
+        mean = self.sum[index] / self.window
+        # Rounding error of running sums may make variance slightly negative.
+        variance = np.maximum(self.square_sum[index] / self.window - mean * mean, 0)
+
+        result = np.where(self.count[index] >= self.window, np.sqrt(variance), np.nan)
+        self.values[index] = result
+        return result
+
+
+class VwapIndicator(Indicator):
+    """
+    Volume weighted average price since start or last reset. Volume of
+    each update is volume traded since previous one, e.g. bar volume.
+    """
+
+    def __init__(self, size: int):
+        """"""
+        super(VwapIndicator, self).__init__(size)
+
+        self.turnover = np.zeros(size)
+        self.volume = np.zeros(size)
+
+    def update(self, prices, volumes, index: IndexType = None) -> np.ndarray:
+        """"""
+        index = self.get_index(index)
+        prices = np.broadcast_to(np.asarray(prices, dtype=float), index.shape)
+        volumes = np.broadcast_to(np.asarray(volumes, dtype=float), index.shape)
+
+        self.count[index] += 1
+        self.turnover[index] += prices * volumes
+        self.volume[index] += volumes
+
+        volume = self.volume[index]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = np.where(volume > 0, self.turnover[index] / volume, np.nan)
+
+        self.values[index] = result
+        return result
+
+    def reset(self, index: IndexType = None):
+        """
+        Reset symbols, e.g. at start of a trading day.
+        """
+        index = self.get_index(index)
+        self.count[index] = 0
+        self.turnover[index] = 0
+        self.volume[index] = 0
+        self.values[index] = np.nan
+
+
+class WilderIndicator(Indicator):
+    """
+    Base class of indicators smoothed by Wilder's moving average, started
+    from simple average of the first window values.
+    """
+
+    def smooth(self, average: np.ndarray, values: np.ndarray, count: np.ndarray) -> np.ndarray:
+        """
+        Update averages with values, where count is number of values
+        including this one.
+        """
+        return np.where(
+            count <= self.window,
+            # Average of the first count values.
+            average + (values - average) / count,
+            average + (values - average) / self.window,
+        )
+
+
+class AtrIndicator(WilderIndicator):
+    """
+    Average true range of bars.
+    """
+
+    def __init__(self, size: int, window: int = 14):
+        """"""
+        super(AtrIndicator, self).__init__(size, window)
+
+        self.pre_close = np.full(size, np.nan)
+        self.average = np.zeros(size)
+
+    def update(self, high, low, close, index: IndexType = None) -> np.ndarray:
+        """"""
+        index = self.get_index(index)
+        high = np.broadcast_to(np.asarray(high, dtype=float), index.shape)
+        low = np.broadcast_to(np.asarray(low, dtype=float), index.shape)
+        close = np.broadcast_to(np.asarray(close, dtype=float), index.shape)
+
+        # Range of the first bar is high - low.
+        pre_close = self.pre_close[index]
+        true_range = np.fmax(
+            high - low,
+            np.fmax(np.abs(high - pre_close), np.abs(low - pre_close)),
+        )
+
+        count = self.count[index] + 1
+        average = self.smooth(self.average[index], true_range, count)
+
+        self.count[index] = count
+        self.average[index] = average
+        self.pre_close[index] = close
+
+        result = np.where(count >= self.window, average, np.nan)
+        self.values[index] = result
+        return result
+
+
+class RsiIndicator(WilderIndicator):
+    """
+    Relative strength index of close prices.
+    """
+
+    def __init__(self, size: int, window: int = 14):
+        """"""
+        super(RsiIndicator, self).__init__(size, window)
+
+        self.pre_close = np.full(size, np.nan)
+        self.gain = np.zeros(size)
+        self.loss = np.zeros(size)
+
+    def update(self, close, index: IndexType = None) -> np.ndarray:
+        """
+        Count is number of changes, so the first value of each symbol is
+        only saved as previous close.
+        """
+        all_index = self.get_index(index)
+        close = np.broadcast_to(np.asarray(close, dtype=float), all_index.shape)
+
+        pre_close = self.pre_close[all_index]
+        self.pre_close[all_index] = close
+
+        index = all_index
+        started = ~np.isnan(pre_close)
+        if not started.all():
+            index = index[started]
+            close = close[started]
+            pre_close = pre_close[started]
+
+        change = close - pre_close
+        count = self.count[index] + 1
+        gain = self.smooth(self.gain[index], np.maximum(change, 0), count)
+        loss = self.smooth(self.loss[index], np.maximum(-change, 0), count)
+
+        self.count[index] = count
+        self.gain[index] = gain
+        self.loss[index] = loss
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(loss > 0, 100 - 100 / (1 + gain / loss), 100.0)
+        self.values[index] = np.where(count >= self.window, rsi, np.nan)
+
+        return self.values[all_index]
+
+
+class RollingMaxIndicator(Indicator):
+    """
+    Rolling maximum by monotonic deque of each symbol, kept in a ring
+    buffer of window slots. Every value is pushed and popped at most once,
+    so the cost is amortized O(1) per update.
+    """
+
+    sign = 1
+
+    def __init__(self, size: int, window: int):
+        """"""
+        super(RollingMaxIndicator, self).__init__(size, window)
+
+        # Deque of each symbol is in slots head, head + 1, ... of its row,
+        # values are decreasing from head to tail.
+        self.deque_values = np.zeros((size, window))
+        self.deque_counts = np.zeros((size, window), dtype=np.int64)
+        self.head = np.zeros(size, dtype=np.int64)
+        self.length = np.zeros(size, dtype=np.int64)
+
+    def update(self, values, index: IndexType = None) -> np.ndarray:
+        """"""
+        index = self.get_index(index)
+        values = self.sign * np.broadcast_to(np.asarray(values, dtype=float), index.shape)
+
+        window = self.window
+        count = self.count[index]
+
+        # Drop head which is out of window, at most one each update.
+        head = self.head[index]
+        length = self.length[index]
+        expired = (length > 0) & (self.deque_counts[index, head] <= count - window)
+        head = np.where(expired, (head + 1) % window, head)
+        length = length - expired
+
+        # Pop tail values not greater than new value.
+        popping = np.flatnonzero(length > 0)
+        while popping.size:
+            rows = index[popping]
+            tail = (head[popping] + length[popping] - 1) % window
+            popped = self.deque_values[rows, tail] <= values[popping]
+            popping = popping[popped]
+            length[popping] -= 1
+            popping = popping[length[popping] > 0]
+
+        tail = (head + length) % window
+        self.deque_values[index, tail] = values
+        self.deque_counts[index, tail] = count
+        length += 1
+
+        count += 1
+        self.head[index] = head
+        self.length[index] = length
+        self.count[index] = count
+
+        result = np.where(count >= window, self.sign * self.deque_values[index, head], np.nan)
+        self.values[index] = result
+        return result
+
+
+class RollingMinIndicator(RollingMaxIndicator):
+    """
+    Rolling minimum, as rolling maximum of negative values.
+    """
+
+    sign = -1
@@ -0,0 +1,374 @@
+"""
+Write-ahead journal of order, trade and position data for crash recovery.
+
+Event thread only encodes data and puts the record into a queue. Writer
+thread appends all queued records to journal file and fsyncs them together
+(group commit), at most once every commit interval, so sending orders does
+not wait for disk.
+
+Every record is the latest state of an order, trade or position under its
+key. Writer thread keeps the latest record of each key, and writes them
+into a snapshot after enough records, so that journal is started again
+and recovery only reads the snapshot and the journal written after it.
+Snapshot is compacted: finished orders and their trades are dropped, and
+only positions, active orders with their trades and the highest orderid
+and tradeid are kept.
+
+Each record is framed as: length of payload, crc32 of key and payload,
+length of key, key, payload (encoded by codec). Records after a torn or
+corrupted frame at the end of journal are dropped.
+"""
+
+import os
+import zlib
+from logging import ERROR, INFO
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from struct import Struct
+from threading import Thread
+from time import perf_counter, sleep
+from typing import Any, Dict, Iterator, Set, Tuple
+
+from codec import decode_message, encode_message
+from event import Event, EventEngine, EVENT_ORDER, EVENT_POSITION, EVENT_TRADE
+from engine import BaseEngine, MainEngine
+from gateway import Gateway
+from object import OrderData, TradeData
+from setting import SETTINGS
+
+
+FRAME = Struct("<IIH")
+
+# Highest orderid and tradeid, kept in snapshot when their records are
+# dropped.
+IDS = Struct("<QQ")
+IDS_KEY = "ids"
+
+JOURNAL_NAME = "journal.bin"
+SNAPSHOT_NAME = "snapshot.bin"
+
+
+def get_key(type: str, data: Any) -> str:
+    """
+    Key of record, later record of the same key replaces earlier one.
+    """
+    if type == EVENT_ORDER:
+        return f"o.{data.vt_orderid}"
+    elif type == EVENT_TRADE:
+        return f"t.{data.vt_tradeid}"
+    else:
+        return f"p.{data.vt_positionid}"
+
+
+def pack_record(key: str, payload: bytes) -> bytes:
+    """"""
+    data = key.encode("utf-8") + payload
+    return FRAME.pack(len(payload), zlib.crc32(data), len(data) - len(payload)) + data
+
+
+def iter_records(buf: bytes) -> Iterator[Tuple[str, bytes, int]]:
+    """
+    Yield (key, payload, end offset) of records until end of buffer or an
+    incomplete or corrupted frame.
+    """
+    offset = 0
+    size = len(buf)
+    while offset + FRAME.size <= size:
+        length, crc, key_length = FRAME.unpack_from(buf, offset)
+
+        start = offset + FRAME.size
+        middle = start + key_length
+        end = middle + length
+        if end > size:
+            return
+
+        if zlib.crc32(buf[start:end]) != crc:
+            return
+
+        yield buf[start:middle].decode("utf-8"), buf[middle:end], end
+        offset = end
+
+
+def fsync_dir(path: Path):
+    """
+    Persist rename of files in directory.
+    """
+    if os.name != "posix":
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JournalEngine(BaseEngine):
+    """
+    Journal order, trade and position events, and recover them when
+    started. Recovered data are put as events, so main engine and
+    monitors are restored by their usual handlers.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(JournalEngine, self).__init__(main_engine, event_engine, "Journal")
+
+        self.path = Path(SETTINGS["journal.path"])
+        self.commit_interval: float = SETTINGS["journal.commit_interval"]
+        self.snapshot_count: int = SETTINGS["journal.snapshot_count"]
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.path.joinpath(JOURNAL_NAME)
+        self.snapshot_path = self.path.joinpath(SNAPSHOT_NAME)
+
+        # Latest record of each key, only accessed by writer thread after
+        # recovery.
+        self.records: Dict[str, bytes] = {}
+        self.journal_count = 0
+        self.commit_count = 0
+
+        # Keys of finished orders, and order key of each trade key, used
+        # to compact snapshot, also only accessed by writer thread.
+        self.finished_keys: Set[str] = set()
+        self.trade_order_keys: Dict[str, str] = {}
+
+        # Highest ids, updated by event thread.
+        self.max_orderid = 0
+        self.max_tradeid = 0
+
+        # Set by writer thread when journal cannot be written.
+        self.failed = False
+
+        self.recover()
+
+        self.queue = SimpleQueue()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+        self.event_engine.register(EVENT_ORDER, self.process_event)
+        self.event_engine.register(EVENT_TRADE, self.process_event)
+        self.event_engine.register(EVENT_POSITION, self.process_event)
+
+    def process_event(self, event: Event):
+        """
+        Record is encoded here, so it keeps data at this moment.
+        """
+        if self.failed:
+            return
+
+        type = event.type
+        data = event.data
+
+        order_key = ""
+        finished = False
+        if type == EVENT_ORDER:
+            finished = not data.is_active()
+            self.update_ids(data)
+        elif type == EVENT_TRADE:
+            order_key = f"o.{data.vt_orderid}"
+            self.update_ids(data)
+
+        self.queue.put((get_key(type, data), encode_message(type, data), order_key, finished))
+
+    def update_ids(self, data: Any):
+        """"""
+        if isinstance(data, OrderData):
+            if data.orderid.isdigit():
+                self.max_orderid = max(self.max_orderid, int(data.orderid))
+        elif data.tradeid.isdigit():
+            self.max_tradeid = max(self.max_tradeid, int(data.tradeid))
+
+    def track_record(self, key: str, order_key: str, finished: bool):
+        """
+        Remember finished orders and order of trades for compaction.
+        """
+        if finished:
+            self.finished_keys.add(key)
+        elif order_key:
+            self.trade_order_keys[key] = order_key
+
+    def recover(self):
+        """
+        Load snapshot and journal, then put recovered data as events.
+        """
+        start = perf_counter()
+
+        if self.snapshot_path.exists():
+            buf = self.snapshot_path.read_bytes()
+            for key, payload, _ in iter_records(buf):
+                if key == IDS_KEY:
+                    self.max_orderid, self.max_tradeid = IDS.unpack(payload)
+                else:
+                    self.records[key] = payload
+
+        valid_size = 0
+        if self.journal_path.exists():
+            buf = self.journal_path.read_bytes()
+            for key, payload, valid_size in iter_records(buf):
+                self.records[key] = payload
+                self.journal_count += 1
+
+            # Drop torn record at the end, so new records are appended
+            # after valid ones.
+            if valid_size < len(buf):
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(valid_size)
+                self.write_log(f"dropped {len(buf) - valid_size} bytes at end of journal")
+
+        if not self.records:
+            Gateway.set_next_ids(self.max_orderid + 1, self.max_tradeid + 1)
+            return
+
+        order_count = 0
+        trade_count = 0
+
+        for key, payload in self.records.items():
+            type, data = decode_message(payload)
+
+            if isinstance(data, OrderData):
+                order_count += 1
+                self.update_ids(data)
+                self.track_record(key, "", not data.is_active())
+            elif isinstance(data, TradeData):
+                trade_count += 1
+                self.update_ids(data)
+                self.track_record(key, f"o.{data.vt_orderid}", False)
+
+            self.event_engine.put(Event(type, data))
+
+        # New orders and trades should not reuse ids of recovered ones.
+        Gateway.set_next_ids(self.max_orderid + 1, self.max_tradeid + 1)
+
+        self.write_log(
+            f"recovered {order_count} orders, {trade_count} trades, "
+            f"{len(self.records) - order_count - trade_count} positions "
+            f"from {self.journal_count} journal records "
+            f"in {(perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    def run(self):
+        """
+        Take all queued records, append and fsync them together, then
+        wait until commit interval has passed since previous commit.
+        Journal is stopped if it cannot be written, as records after a
+        lost one would not recover a consistent state.
+        """
+        try:
+            self.write_records()
+        except OSError as e:
+            self.failed = True
+            self.write_log(f"journal stopped, failed to write: {e}", ERROR)
+
+    def write_records(self):
+        """"""
+        f = open(self.journal_path, "ab")
+
+        active = True
+        while active:
+            item = self.queue.get()
+            commit_start = perf_counter()
+
+            buf = []
+            while True:
+                if item is None:
+                    active = False
+                    break
+
+                key, payload, order_key, finished = item
+                # Record same as latest one, e.g. recovered data put as
+                # event, is not written again.
+                if self.records.get(key, None) != payload:
+                    self.records[key] = payload
+                    buf.append(pack_record(key, payload))
+                self.track_record(key, order_key, finished)
+
+                try:
+                    item = self.queue.get_nowait()
+                except Empty:
+                    break
+
+            try:
+                if buf:
+                    f.write(b"".join(buf))
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                    self.journal_count += len(buf)
+                    self.commit_count += 1
+
+                if self.journal_count >= self.snapshot_count:
+                    f.close()
+                    self.save_snapshot()
+                    f = open(self.journal_path, "ab")
+            except OSError:
+                f.close()
+                raise
+
+            if active:
+                remaining = self.commit_interval - (perf_counter() - commit_start)
+                if remaining > 0:
+                    sleep(remaining)
+
+        f.close()
+
+    def save_snapshot(self):
+        """
+        Write latest records into snapshot and start a new journal. If
+        process dies before journal is cleared, records in journal are
+        loaded again over snapshot, which gives the same result.
+        """
+        self.compact_records()
+
+        buf = [pack_record(key, payload) for key, payload in self.records.items()]
+        buf.append(pack_record(IDS_KEY, IDS.pack(self.max_orderid, self.max_tradeid)))
+
+        temp_path = self.path.joinpath(SNAPSHOT_NAME + ".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(b"".join(buf))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, self.snapshot_path)
+        fsync_dir(self.path)
+
+        with open(self.journal_path, "wb") as f:
+            os.fsync(f.fileno())
+
+        self.journal_count = 0
+
+    def compact_records(self):
+        """
+        Drop records of finished orders and their trades.
+        """
+        finished_keys = self.finished_keys
+        trade_order_keys = self.trade_order_keys
+
+        self.records = {
+            key: payload for key, payload in self.records.items()
+            if key not in finished_keys and trade_order_keys.get(key, None) not in finished_keys
+        }
+
+        self.finished_keys = set()
+        self.trade_order_keys = {
+            key: order_key for key, order_key in trade_order_keys.items() if key in self.records
+        }
+
+    def write_log(self, msg: str, level: int = INFO):
+        """"""
+        self.main_engine.write_log(msg, "Journal", level)
+
+    def close(self):
+        """
+        Write all queued records, and save snapshot so next start only
+        loads the snapshot.
+        """
+        self.event_engine.unregister(EVENT_ORDER, self.process_event)
+        self.event_engine.unregister(EVENT_TRADE, self.process_event)
+        self.event_engine.unregister(EVENT_POSITION, self.process_event)
+
+        self.queue.put(None)
+        self.thread.join()
+
+        if self.journal_count and not self.failed:
+            self.save_snapshot()
@@ -0,0 +1,193 @@
+"""
+Latency histograms of events traced through event engine.
+
+Traced events carry monotonic nanosecond timestamps of each stage, and
+intervals between stages are recorded into histograms of each event type.
+"""
+
+from threading import Lock
+from typing import Dict, List, Tuple
+
+
+# Stage name: (start timestamp, end timestamp) of Event.
+STAGES: Dict[str, Tuple[str, str]] = {
+    "put": ("created", "enqueued"),
+    "queue": ("enqueued", "dequeued"),
+    "handler": ("dequeued", "handler_end"),
+    "total": ("created", "handler_end"),
+}
+
+# Stages ending when event is applied on UI by GUI thread.
+UI_STAGES: Dict[str, Tuple[str, str]] = {
+    "ui": ("handler_end", "applied"),
+    "total_ui": ("created", "applied"),
+}
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Every power of 2 is divided into 4 sub-buckets, so value of a bucket
+# is accurate within 25%.
+SUB_BUCKET_BITS = 2
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+BUCKET_COUNT = 64 * SUB_BUCKET_COUNT
+
+
+def get_bucket(value: int) -> int:
+    """
+    Get index of histogram bucket of a non-negative nanosecond value.
+    """
+    if value < SUB_BUCKET_COUNT:
+        return max(value, 0)
+
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - SUB_BUCKET_COUNT
+
+
+def get_bucket_value(bucket: int) -> int:
+    """
+    Get lower bound of values in histogram bucket.
+    """
+    if bucket < SUB_BUCKET_COUNT:
+        return bucket
+
+    shift = (bucket >> SUB_BUCKET_BITS) - 1
+    return (SUB_BUCKET_COUNT + (bucket & (SUB_BUCKET_COUNT - 1))) << shift
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of nanosecond latencies with constant recording
+    cost and memory.
+    """
+
+    def __init__(self):
+        """"""
+        self.buckets: List[int] = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value: int):
+        """"""
+        self.buckets[get_bucket(value)] += 1
+
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        self.count += 1
+        self.total += value
+
+    def get_percentile(self, percentile: float) -> int:
+        """
+        Get lower bound of bucket where percentile falls in.
+        """
+        if not self.count:
+            return 0
+
+        target = self.count * percentile / 100
+        accumulated = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            accumulated += bucket_count
+            if bucket_count and accumulated >= target:
+                return max(get_bucket_value(bucket), self.min)
+        return self.max
+
+    def get_buckets(self) -> List[Tuple[int, int]]:
+        """
+        Get (lower bound in ns, count) of non-empty buckets.
+        """
+        return [
+            (get_bucket_value(bucket), bucket_count)
+            for bucket, bucket_count in enumerate(self.buckets)
+            if bucket_count
+        ]
+
+    def to_dict(self) -> dict:
+        """
+        Summary of histogram in microseconds.
+        """
+        data = {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000 if self.count else 0,
+            "min_us": self.min / 1000,
+        }
+        for percentile in PERCENTILES:
+            data[f"p{percentile:g}_us"] = self.get_percentile(percentile) / 1000
+        data["max_us"] = self.max / 1000
+        return data
+
+
+class LatencyAggregator:
+    """
+    Histograms of each event type and stage, fed by event engine after
+    handlers of a traced event are done, and by widgets after the event
+    is applied on UI.
+    """
+
+    def __init__(self):
+        """"""
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.lock = Lock()
+
+    def record(self, event):
+        """
+        Record stages of event processed by event engine.
+        """
+        self.record_stages(event, STAGES)
+
+    def record_applied(self, event):
+        """
+        Record stages of event applied on UI.
+        """
+        self.record_stages(event, UI_STAGES)
+
+    def record_stages(self, event, stages: Dict[str, Tuple[str, str]]):
+        """"""
+        with self.lock:
+            for stage, (start_name, end_name) in stages.items():
+                start = getattr(event, start_name)
+                end = getattr(event, end_name)
+                if not start or not end:
+                    continue
+
+                key = (event.type, stage)
+                histogram = self.histograms.get(key, None)
+                if not histogram:
+                    histogram = LatencyHistogram()
+                    self.histograms[key] = histogram
+                histogram.record(end - start)
+
+    def clear(self):
+        """"""
+        with self.lock:
+            self.histograms.clear()
+
+    def get_report(self) -> Dict[str, Dict[str, dict]]:
+        """
+        Get summary of histograms as {event type: {stage: summary}}.
+        """
+        report = {}
+        with self.lock:
+            for (type, stage), histogram in sorted(self.histograms.items()):
+                report.setdefault(type, {})[stage] = histogram.to_dict()
+        return report
+
+    def format_report(self) -> str:
+        """
+        Get report as text table.
+        """
+        columns = ["count", "mean_us"] + [f"p{p:g}_us" for p in PERCENTILES] + ["max_us"]
+        lines = [f"{'type':<24}{'stage':<10}" + "".join(f"{c:>12}" for c in columns)]
+
+        for type, stages in self.get_report().items():
+            for stage, data in stages.items():
+                values = "".join(
+                    f"{data[c]:>12}" if c == "count" else f"{data[c]:>12.1f}"
+                    for c in columns
+                )
+                lines.append(f"{type:<24}{stage:<10}{values}")
+
+        return "\n".join(lines)
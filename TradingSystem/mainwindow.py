@@ -7,7 +7,6 @@ import ctypes
 import platform
 import sys
 import traceback
-from gateway import Gateway
 import qdarkstyle
 from PyQt5 import QtGui, QtWidgets, QtCore
 from constant import Direction, Exchange,  OrderType
@@ -16,9 +15,20 @@ from widget import (
     TickMonitor,
     TradeMonitor,
     PositionMonitor,
+    AccountMonitor,
+    LogMonitor,
+    AlertMonitor,
+    ScannerWidget,
     TradingWidget
 )
+from alert import AlertEngine
 from engine import MainEngine
+from journal import JournalEngine
+from object import SubscribeRequest
+from profiler import ProfilerEngine
+from rpc import RemoteMainEngine
+from scanner import ScannerEngine
+from setting import SETTINGS
 from utility import get_icon_path
 
 
@@ -36,6 +46,19 @@ class MainWindow(QtWidgets.QMainWindow):
         self.connect_dialogs = {}
         self.widgets = {}
 
+        # Profiler runs in GUI process, also when attached to headless engine.
+        self.profiler_engine = main_engine.add_engine(ProfilerEngine)
+
+        # When attached to headless engine, tick driven engines and journal
+        # run there, so that the full tick stream is not pulled into GUI.
+        # Scan and alert events are still received from headless engine.
+        if not isinstance(main_engine, RemoteMainEngine):
+            main_engine.add_engine(AlertEngine)
+            main_engine.add_engine(ScannerEngine)
+
+            if SETTINGS["journal.enabled"]:
+                main_engine.add_engine(JournalEngine)
+
         self.init_ui()
 
     def init_ui(self):
@@ -63,12 +86,60 @@ class MainWindow(QtWidgets.QMainWindow):
             PositionMonitor, "position", QtCore.Qt.BottomDockWidgetArea
         )
 
+        account_widget, account_dock = self.create_dock(
+            AccountMonitor, "account", QtCore.Qt.BottomDockWidgetArea
+        )
+
+        log_widget, log_dock = self.create_dock(
+            LogMonitor, "log", QtCore.Qt.BottomDockWidgetArea
+        )
+
+        alert_widget, alert_dock = self.create_dock(
+            AlertMonitor, "alert", QtCore.Qt.BottomDockWidgetArea
+        )
+
+        scanner_widget, scanner_dock = self.create_dock(
+            ScannerWidget, "scanner", QtCore.Qt.RightDockWidgetArea
+        )
+
 
     def connect(self):
-        gateway=Gateway(self.event_engine,'AAPL',Exchange.NYMEX)
+        req = SubscribeRequest('AAPL', Exchange.NYMEX)
+        self.main_engine.subscribe(req)
 
-        gateway.generate_Tick()
 
+    def stop_profiling(self):
+        """"""
+        path = self.profiler_engine.stop_profiling()
+        if path:
+            self.show_text("profiling", f"Profile saved to {path}")
+        elif self.profiler_engine.is_profiling():
+            self.show_text("profiling", "Event thread is busy, please stop profiling again later.")
+
+    def take_memory_snapshot(self):
+        """
+        First snapshot starts memory tracing, later ones show growth
+        since previous snapshot.
+        """
+        text = self.profiler_engine.take_memory_snapshot()
+        if not text:
+            text = "Memory tracing started, take another snapshot later to compare."
+        self.show_text("memory snapshot", text)
+
+    def show_text(self, title: str, text: str):
+        """"""
+        dialog = QtWidgets.QMessageBox(self)
+        dialog.setWindowTitle(title)
+        dialog.setText(text)
+        dialog.setFont(QtGui.QFont("Courier"))
+        dialog.exec_()
+
+    def show_latency_report(self):
+        """"""
+        report = self.main_engine.get_latency_report()
+        if not report:
+            report = "Tracing is not started, run with --trace to record latency."
+        self.show_text("latency report", report)
 
     def init_menu(self):
         """"""
@@ -80,6 +151,20 @@ class MainWindow(QtWidgets.QMainWindow):
         # for name in gateway_names:
         #     func = partial(self.connect, name)
         self.add_menu_action(sys_menu, "connect", "connect.ico", self.connect)
+        self.add_menu_action(
+            sys_menu, "latency report", "test.ico", self.show_latency_report)
+
+        sys_menu.addSeparator()
+
+        self.add_menu_action(
+            sys_menu, "start sampling profiler", "test.ico",
+            lambda: self.profiler_engine.start_profiling("sample"))
+        self.add_menu_action(
+            sys_menu, "start cProfile", "test.ico",
+            lambda: self.profiler_engine.start_profiling("cprofile"))
+        self.add_menu_action(sys_menu, "stop profiling", "test.ico", self.stop_profiling)
+        self.add_menu_action(
+            sys_menu, "memory snapshot", "test.ico", self.take_memory_snapshot)
 
         sys_menu.addSeparator()
 
@@ -1,17 +1,17 @@
 
 from dataclasses import dataclass
 from datetime import datetime
-from constant import Direction, Exchange,OrderType
+from logging import INFO, getLevelName
+from typing import List, NamedTuple
+from constant import AlertStatus, Direction, Exchange,OrderType, Status
 
+ACTIVE_STATUSES = set([Status.SUBMITTING, Status.NOTTRADED, Status.PARTTRADED, Status.UNKNOWN])
 
 
-@dataclass
-class TickData():
+
+class _TickData(NamedTuple):
     """
-    Tick data contains information about:
-        * last trade in market
-        * orderbook snapshot
-        * intraday market statistics.
+    Fields of TickData, vt_symbol is derived from symbol and exchange.
     """
 
     symbol: str
@@ -39,6 +39,76 @@ class TickData():
 
     ask_volume_1: float = 0
 
+    vt_symbol: str = ""
+
+
+class TickData(_TickData):
+    """
+    Tick data contains information about:
+        * last trade in market
+        * orderbook snapshot
+        * intraday market statistics.
+
+    Tick is an immutable snapshot, so it can be shared by any number of
+    handlers and threads without copying. Gateway creates a new tick for
+    every update. It is a named tuple, which costs a single allocation
+    to create, unlike a frozen dataclass setting fields one by one.
+    _replace keeps vt_symbol, so symbol and exchange are not replaced.
+    """
+
+    __slots__ = ()
+
+    # Not passed to constructor and not encoded by codec.
+    derived_fields = ("vt_symbol",)
+
+    def __new__(
+        cls,
+        symbol: str,
+        exchange: Exchange,
+        datetime: datetime,
+        name: str = "",
+        volume: float = 0,
+        open_interest: float = 0,
+        last_price: float = 0,
+        last_volume: float = 0,
+        limit_up: float = 0,
+        limit_down: float = 0,
+        open_price: float = 0,
+        high_price: float = 0,
+        low_price: float = 0,
+        pre_close: float = 0,
+        bid_price_1: float = 0,
+        ask_price_1: float = 0,
+        bid_volume_1: float = 0,
+        ask_volume_1: float = 0,
+    ) -> "TickData":
+        """"""
+        return tuple.__new__(cls, (
+            symbol,
+            exchange,
+            datetime,
+            name,
+            volume,
+            open_interest,
+            last_price,
+            last_volume,
+            limit_up,
+            limit_down,
+            open_price,
+            high_price,
+            low_price,
+            pre_close,
+            bid_price_1,
+            ask_price_1,
+            bid_volume_1,
+            ask_volume_1,
+            f"{symbol}.{exchange.value}",
+        ))
+
+    def __getnewargs__(self) -> tuple:
+        """"""
+        return tuple(self)[:-1]
+
 
 @dataclass
 class OrderData():
@@ -58,8 +128,77 @@ class OrderData():
     traded: float = 0
     underlying_type: str=""
     time: str = ""
+    status: Status = Status.SUBMITTING
+    gateway_name: str = ""
+    account: str = ""
 
+    def __post_init__(self):
+        """"""
+        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
+        self.vt_orderid = f"{self.gateway_name}.{self.orderid}"
 
+    def is_active(self) -> bool:
+        """
+        Check if the order is active.
+        """
+        return self.status in ACTIVE_STATUSES
+
+    def create_cancel_request(self) -> "CancelRequest":
+        """
+        Create cancel request object from order.
+        """
+        req = CancelRequest(
+            orderid=self.orderid, symbol=self.symbol, exchange=self.exchange, account=self.account
+        )
+        return req
+
+
+@dataclass
+class TradeData():
+    """
+    Trade data contains information of a fill of an order. One order
+    can have several trade fills.
+    """
+
+    symbol: str
+    exchange: Exchange
+    orderid: str
+    tradeid: str
+
+    direction: Direction = ""
+    price: float = 0
+    volume: float = 0
+    time: str = ""
+    datetime: datetime = None
+    gateway_name: str = ""
+
+    def __post_init__(self):
+        """"""
+        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
+        self.vt_orderid = f"{self.gateway_name}.{self.orderid}"
+        self.vt_tradeid = f"{self.gateway_name}.{self.tradeid}"
+
+
+@dataclass
+class BarData():
+    """
+    Candlestick bar data of a certain trading period.
+    """
+
+    symbol: str
+    exchange: Exchange
+    datetime: datetime
+
+    volume: float = 0
+    open_price: float = 0
+    high_price: float = 0
+    low_price: float = 0
+    close_price: float = 0
+    gateway_name: str = ""
+
+    def __post_init__(self):
+        """"""
+        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
 
 
 @dataclass
@@ -79,6 +218,12 @@ class PositionData():
     pnl: float = 0
     yd_volume: float = 0
     underlying_type: str=""
+    gateway_name: str = ""
+
+    def __post_init__(self):
+        """"""
+        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
+        self.vt_positionid = f"{self.gateway_name}.{self.vt_symbol}.{self.direction.value}"
 
 
 @dataclass
@@ -94,6 +239,7 @@ class AccountData():
     frozen: float = 0
 
     underlying_type: str=""
+    gateway_name: str = ""
 
     def __post_init__(self):
         """"""
@@ -102,6 +248,92 @@ class AccountData():
 
 
 
+@dataclass
+class OrderBatchData():
+    """
+    Results of a batch of order or cancel requests, in the same order as
+    requests. vt_orderid of a rejected request is empty, and reason is
+    given in errors.
+    """
+
+    batchid: str
+    vt_orderids: List[str]
+    errors: List[str]
+    cancel: bool = False
+
+
+@dataclass
+class ContractData():
+    """
+    Contract data contains basic information about each contract traded.
+    """
+
+    symbol: str
+    exchange: Exchange
+    name: str
+
+    size: float = 1
+    pricetick: float = 0.01
+    min_volume: float = 1
+    gateway_name: str = ""
+
+    def __post_init__(self):
+        """"""
+        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
+
+
+@dataclass
+class LogData():
+    """
+    Log data is used for recording log messages on GUI or in log files.
+    """
+
+    msg: str
+    level: int = INFO
+    source: str = ""
+    time: datetime = None
+
+    def __post_init__(self):
+        """"""
+        self.level_name = getLevelName(self.level)
+        if self.time is None:
+            self.time = datetime.now()
+
+
+@dataclass
+class AlertData:
+    """
+    Price alert which is triggered when last price crosses alert price.
+    """
+
+    alertid: str
+    symbol: str
+    exchange: Exchange
+    price: float
+    msg: str = ""
+    status: AlertStatus = AlertStatus.ACTIVE
+    last_price: float = 0
+    time: datetime = None
+
+    def __post_init__(self):
+        """"""
+        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
+        if self.time is None:
+            self.time = datetime.now()
+
+
+@dataclass
+class ScanData:
+    """
+    Top symbols of a scanner ranking in descending order of score.
+    """
+
+    name: str
+    vt_symbols: List[str]
+    scores: List[float]
+    last_prices: List[float]
+
+
 @dataclass
 class SubscribeRequest:
     """
@@ -128,8 +360,7 @@ class OrderRequest:
     type: OrderType
     volume: float
     price: float = 0
-
-
+    account: str = ""
 
     def create_order_data(self, orderid: str, gateway_name: str):
         """
@@ -144,6 +375,7 @@ class OrderRequest:
             price=self.price,
             volume=self.volume,
             gateway_name=gateway_name,
+            account=self.account,
         )
         return order
 
@@ -157,6 +389,7 @@ class CancelRequest:
     orderid: str
     symbol: str
     exchange: Exchange
+    account: str = ""
 
     def __post_init__(self):
         """"""
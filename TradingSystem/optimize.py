@@ -0,0 +1,205 @@
+"""
+Parallel parameter optimization of strategies by backtesting.
+
+Tick data is saved as NumPy files and memory-mapped by every worker
+process, so pages are shared through OS page cache instead of being
+loaded or pickled for each run.
+"""
+
+import heapq
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from backtesting import BacktestingEngine
+from object import TickData
+from utility import array_to_ticks, extract_vt_symbol, ticks_to_array
+
+
+class OptimizationSetting:
+    """
+    Parameter space and target metric of optimization.
+    """
+
+    def __init__(self):
+        """"""
+        self.params: Dict[str, List] = {}
+        self.target_name = ""
+
+    def add_parameter(
+        self,
+        name: str,
+        start: float,
+        end: float = None,
+        step: float = None,
+    ):
+        """
+        Add parameter ranging from start to end (inclusive) by step,
+        or with a fixed value if only start is given.
+        """
+        if end is None or step is None:
+            self.params[name] = [start]
+            return
+
+        if start >= end or step <= 0:
+            raise ValueError(f"invalid range of parameter {name}")
+
+        # Values are computed from start instead of accumulated, and the
+        # tolerance keeps end when float error puts it just out of range.
+        count = int(math.floor((end - start) / step + 1e-9)) + 1
+        self.params[name] = [start + i * step for i in range(count)]
+
+    def set_target(self, target_name: str):
+        """
+        Set statistics key used to rank results.
+        """
+        self.target_name = target_name
+
+    def generate_grid_settings(self) -> List[dict]:
+        """
+        Generate all combinations of parameters.
+        """
+        keys = list(self.params.keys())
+        return [dict(zip(keys, values)) for values in product(*self.params.values())]
+
+    def generate_random_settings(self, count: int, seed: int = 0) -> List[dict]:
+        """
+        Sample combinations of parameters randomly without replacement.
+        Indexes of combinations are sampled and each is split into an
+        index of every parameter, so the full grid is never built.
+        """
+        total = 1
+        for values in self.params.values():
+            total *= len(values)
+
+        count = min(count, total)
+        indexes = random.Random(seed).sample(range(total), count)
+
+        settings = []
+        for index in indexes:
+            setting = {}
+            for name, values in self.params.items():
+                index, i = divmod(index, len(values))
+                setting[name] = values[i]
+            settings.append(setting)
+        return settings
+
+
+def save_tick_file(path: str, ticks: List[TickData]):
+    """
+    Save ticks of one symbol into a NumPy file for memory mapping.
+    """
+    np.save(path, ticks_to_array(ticks))
+
+
+# Memory-mapped tick arrays opened once in each worker process.
+tick_arrays: Dict[str, np.ndarray] = {}
+
+
+def init_worker(tick_files: Dict[str, str]):
+    """
+    Open tick files of every vt_symbol in worker process.
+    """
+    for vt_symbol, path in tick_files.items():
+        tick_arrays[vt_symbol] = np.load(path, mmap_mode="r")
+
+
+def iter_ticks(vt_symbols: List[str]) -> Iterator[TickData]:
+    """
+    Replay ticks of memory-mapped arrays, merged by datetime if more than
+    one symbol is used.
+    """
+    generators = []
+    for vt_symbol in vt_symbols:
+        symbol, exchange = extract_vt_symbol(vt_symbol)
+        generators.append(array_to_ticks(tick_arrays[vt_symbol], symbol, exchange))
+
+    if len(generators) == 1:
+        return generators[0]
+    return heapq.merge(*generators, key=lambda tick: tick.datetime)
+
+
+def run_replay(
+    strategy_class: type,
+    setting: dict,
+    vt_symbols: List[str],
+    engine_parameters: dict,
+) -> Tuple[dict, dict]:
+    """
+    Run one deterministic backtesting and return setting with statistics.
+    """
+    engine = BacktestingEngine()
+    engine.set_parameters(vt_symbols, **engine_parameters)
+    engine.add_strategy(strategy_class, setting)
+    engine.set_ticks(iter_ticks(vt_symbols))
+    engine.run_backtesting()
+
+    return setting, engine.calculate_statistics()
+
+
+def iter_optimization(
+    strategy_class: type,
+    settings: List[dict],
+    tick_files: Dict[str, str],
+    engine_parameters: dict = None,
+    max_workers: int = None,
+) -> Iterator[Tuple[dict, dict]]:
+    """
+    Run backtesting of every setting in a process pool, and yield
+    (setting, statistics) as soon as each run finishes.
+    """
+    vt_symbols = list(tick_files.keys())
+    engine_parameters = engine_parameters or {}
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=init_worker,
+        initargs=(tick_files,),
+    ) as executor:
+        futures = [
+            executor.submit(run_replay, strategy_class, setting, vt_symbols, engine_parameters)
+            for setting in settings
+        ]
+
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_optimization(
+    strategy_class: type,
+    optimization_setting: OptimizationSetting,
+    tick_files: Dict[str, str],
+    engine_parameters: dict = None,
+    max_workers: int = None,
+    random_count: int = 0,
+    callback: Callable[[dict, dict], None] = None,
+) -> List[Tuple[dict, float, dict]]:
+    """
+    Run grid optimization, or random optimization if random_count is given.
+    Results are passed to callback as they finish, and returned ranked by
+    target in descending order.
+    """
+    target_name = optimization_setting.target_name
+    if not target_name:
+        raise ValueError("target of optimization is not set")
+
+    if random_count:
+        settings = optimization_setting.generate_random_settings(random_count)
+    else:
+        settings = optimization_setting.generate_grid_settings()
+
+    results = []
+    for setting, statistics in iter_optimization(
+        strategy_class, settings, tick_files, engine_parameters, max_workers
+    ):
+        results.append((setting, statistics.get(target_name, 0), statistics))
+
+        if callback:
+            callback(setting, statistics)
+
+    results.sort(key=lambda result: result[1], reverse=True)
+    return results
@@ -0,0 +1,290 @@
+"""
+Profiling of the event engine thread in a running process.
+
+Sampling profiler takes stacks of event thread from another thread and
+writes folded stacks, which can be rendered by flamegraph.pl or speedscope.
+cProfile is enabled inside event thread by an event, so other threads
+(e.g. Qt) are not profiled. Memory growth is found by comparing
+tracemalloc snapshots.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from threading import Event as ThreadingEvent
+from threading import Lock, Thread, get_ident
+from time import sleep
+from types import FrameType
+from typing import Tuple
+
+from event import Event, EventEngine
+from engine import BaseEngine, MainEngine
+from setting import SETTINGS
+
+
+EVENT_PROFILE = "eProfile"
+
+
+class SamplingProfiler:
+    """
+    Sample call stacks of one thread at fixed interval.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        """"""
+        self.thread_id = thread_id
+        self.interval = interval
+
+        self.stacks: Counter = Counter()
+        self.sample_count = 0
+
+        self.active = False
+        self.thread = None
+
+    def start(self):
+        """"""
+        self.active = True
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """"""
+        self.active = False
+        self.thread.join()
+
+    def run(self):
+        """"""
+        while self.active:
+            frame = sys._current_frames().get(self.thread_id, None)
+            if frame:
+                self.stacks[self.get_stack(frame)] += 1
+                self.sample_count += 1
+            sleep(self.interval)
+
+    def get_stack(self, frame: FrameType) -> Tuple[str, ...]:
+        """
+        Get stack from outermost to innermost frame.
+        """
+        stack = []
+        while frame:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+
+        stack.reverse()
+        return tuple(stack)
+
+    def dump_folded(self, path: str):
+        """
+        Write stacks in folded format: frames joined by ";" and count.
+        """
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+class ProfilerEngine(BaseEngine):
+    """
+    Start and stop profiling of event engine thread, and take memory
+    snapshots, from GUI menu or headless engine.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(ProfilerEngine, self).__init__(main_engine, event_engine, "Profiler")
+
+        self.path = Path(SETTINGS["profile.path"])
+        self.interval = SETTINGS["profile.interval"]
+        self.top = SETTINGS["profile.top"]
+        self.timeout = SETTINGS["profile.timeout"]
+
+        self.mode = ""
+        self.sampler: SamplingProfiler = None
+        self.profile: cProfile.Profile = None
+        self.profile_done = ThreadingEvent()
+        self.profile_lock = Lock()
+
+        self.snapshot: tracemalloc.Snapshot = None
+
+        self.event_engine.register(EVENT_PROFILE, self.process_profile_event)
+
+    def process_profile_event(self, event: Event):
+        """
+        Enable or disable cProfile in event thread. Profile is carried by
+        event, as it may be replaced before a late event is processed.
+        """
+        profile, enable = event.data
+        with self.profile_lock:
+            # Start given up after timeout is ignored.
+            if enable and profile is not self.profile:
+                return
+
+            if enable:
+                profile.enable()
+            else:
+                profile.disable()
+            self.profile_done.set()
+
+    def start_profiling(self, mode: str = "sample"):
+        """
+        Start profiling event thread by sampling or cProfile.
+        """
+        if self.mode:
+            self.write_log(f"profiling is already started: {self.mode}")
+            return
+
+        if mode == "sample":
+            thread_id = self.event_engine._thread.ident
+            if not thread_id:
+                self.write_log("event engine is not started")
+                return
+
+            self.sampler = SamplingProfiler(thread_id, self.interval)
+            self.sampler.start()
+        elif mode == "cprofile":
+            self.profile = cProfile.Profile()
+            if not self.put_profile_event(True):
+                return
+        else:
+            self.write_log(f"invalid profiling mode: {mode}")
+            return
+
+        self.mode = mode
+        self.write_log(f"profiling started: {mode}")
+
+    def stop_profiling(self) -> str:
+        """
+        Stop profiling and dump result, path of output file is returned.
+        Empty path is returned if cProfile cannot be stopped in time.
+        """
+        if not self.mode:
+            return ""
+
+        # Stats are only read after cProfile is disabled in event thread,
+        # otherwise profile is kept, so that stop can be tried again.
+        if self.mode == "cprofile" and not self.put_profile_event(False):
+            self.write_log("event thread is busy, cProfile is kept running")
+            return ""
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        name = f"{self.mode}_{datetime.now():%Y%m%d_%H%M%S}"
+
+        if self.mode == "sample":
+            self.sampler.stop()
+
+            file_path = self.path.joinpath(f"{name}.folded")
+            self.sampler.dump_folded(file_path)
+            self.write_log(f"{self.sampler.sample_count} samples saved to {file_path}")
+            self.sampler = None
+        else:
+            file_path = self.path.joinpath(f"{name}.prof")
+            self.profile.dump_stats(file_path)
+
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=stream)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            self.path.joinpath(f"{name}.txt").write_text(stream.getvalue())
+
+            self.write_log(f"profile saved to {file_path}")
+            self.profile = None
+
+        self.mode = ""
+        return str(file_path)
+
+    def put_profile_event(self, enable: bool) -> bool:
+        """
+        Wait until cProfile is enabled or disabled by event thread, and
+        return False if it does not respond within timeout. Called in
+        event thread, e.g. by an event handler, cProfile is switched
+        directly, as waiting for the event would block forever.
+        """
+        event = Event(EVENT_PROFILE, (self.profile, enable))
+
+        if get_ident() == self.event_engine._thread.ident:
+            self.process_profile_event(event)
+            return True
+
+        self.profile_done.clear()
+        self.event_engine.put(event)
+        if self.profile_done.wait(self.timeout):
+            return True
+
+        with self.profile_lock:
+            if self.profile_done.is_set():
+                return True
+
+            # Profile of start given up is dropped, so that the late event
+            # does not enable it.
+            if enable:
+                self.profile = None
+
+        action = "start" if enable else "stop"
+        self.write_log(f"failed to {action} cProfile: event thread did not respond in {self.timeout}s")
+        return False
+
+    def is_profiling(self) -> bool:
+        """"""
+        return bool(self.mode)
+
+    def start_memory_tracing(self):
+        """
+        Start tracemalloc and take the first snapshot as baseline.
+        """
+        if tracemalloc.is_tracing():
+            return
+
+        tracemalloc.start(SETTINGS["profile.frames"])
+        self.snapshot = tracemalloc.take_snapshot()
+        self.write_log("memory tracing started")
+
+    def take_memory_snapshot(self) -> str:
+        """
+        Take a snapshot and compare it with previous one. Top differences
+        are saved to file and returned as text.
+        """
+        if not tracemalloc.is_tracing():
+            self.start_memory_tracing()
+            return ""
+
+        snapshot = tracemalloc.take_snapshot()
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+        stats = snapshot.compare_to(self.snapshot, "lineno")
+        self.snapshot = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"current: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB"]
+        lines.extend(str(stat) for stat in stats[:self.top])
+        text = "\n".join(lines)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        file_path = self.path.joinpath(f"memory_{datetime.now():%Y%m%d_%H%M%S}.txt")
+        file_path.write_text(text)
+        self.write_log(f"memory snapshot saved to {file_path}")
+
+        return text
+
+    def stop_memory_tracing(self):
+        """"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self.snapshot = None
+            self.write_log("memory tracing stopped")
+
+    def write_log(self, msg: str):
+        """"""
+        self.main_engine.write_log(msg, "Profiler")
+
+    def close(self):
+        """"""
+        if self.mode == "sample":
+            self.stop_profiling()
+        self.stop_memory_tracing()
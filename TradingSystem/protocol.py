@@ -0,0 +1,106 @@
+"""
+Length-prefixed binary protocol between TcpGateway and exchange server.
+
+Every message is a header of body length and message type, followed by
+a fixed size struct body. Symbols are sent once by subscribe message with
+an id chosen by client, which is used by ticks and orders afterwards.
+All numbers are little-endian, and timestamps are local time in
+microseconds since epoch.
+"""
+
+import datetime
+from struct import Struct
+from typing import List
+
+from constant import Direction, Status
+
+
+HEADER = Struct("<IB")
+
+MSG_HEARTBEAT = 1
+MSG_SUBSCRIBE = 2
+MSG_TICK = 3
+MSG_ORDER = 4
+MSG_CANCEL = 5
+MSG_ORDER_UPDATE = 6
+MSG_TRADE = 7
+MSG_QUERY = 8
+
+# Sender time in nanoseconds since epoch, echoed back by server.
+HEARTBEAT = Struct("<q")
+
+# Symbol id, length of vt_symbol, followed by vt_symbol in utf-8.
+SUBSCRIBE = Struct("<HB")
+
+# Symbol id, timestamp, then TICK_FIELDS.
+TICK = Struct("<Hq11d")
+TICK_FIELDS = [
+    "volume",
+    "last_price",
+    "last_volume",
+    "open_price",
+    "high_price",
+    "low_price",
+    "pre_close",
+    "bid_price_1",
+    "ask_price_1",
+    "bid_volume_1",
+    "ask_volume_1",
+]
+
+# Orderid, symbol id, direction, price, volume.
+ORDER = Struct("<QHBdd")
+
+# Orderid.
+CANCEL = Struct("<Q")
+
+# Orderid, whose trades and latest status are sent again by server.
+QUERY = Struct("<Q")
+
+# Orderid, status, traded volume.
+ORDER_UPDATE = Struct("<QBd")
+
+# Orderid, tradeid, price, volume, timestamp.
+TRADE = Struct("<QQddq")
+
+DIRECTIONS: List[Direction] = list(Direction)
+DIRECTION_CODES = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+STATUSES: List[Status] = list(Status)
+STATUS_CODES = {status: i for i, status in enumerate(STATUSES)}
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def pack_message(type: int, body: bytes = b"") -> bytes:
+    """"""
+    return HEADER.pack(len(body), type) + body
+
+
+def pack_struct(type: int, struct: Struct, *values) -> bytes:
+    """
+    Pack message of a fixed size body.
+    """
+    return HEADER.pack(struct.size, type) + struct.pack(*values)
+
+
+def pack_subscribe(symbol_id: int, vt_symbol: str) -> bytes:
+    """"""
+    buf = vt_symbol.encode("utf-8")
+    return pack_message(MSG_SUBSCRIBE, SUBSCRIBE.pack(symbol_id, len(buf)) + buf)
+
+
+def get_timestamp(dt: datetime.datetime = None) -> int:
+    """
+    Convert local datetime (now if not given) into timestamp.
+    """
+    if dt is None:
+        dt = datetime.datetime.now()
+    return (dt - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def get_datetime(timestamp: int) -> datetime.datetime:
+    """
+    Convert timestamp into local datetime.
+    """
+    return EPOCH + datetime.timedelta(microseconds=timestamp)
@@ -0,0 +1,257 @@
+"""
+Latest quote of every vt_symbol kept in shared memory, so that other
+processes can poll prices without subscribing to event engine.
+
+Memory layout:
+    * header: capacity, symbol count
+    * symbol directory: vt_symbol of each slot
+    * slots: sequence number followed by quote fields
+
+Each slot is protected by a seqlock: writer makes the sequence odd before
+writing and even after, reader retries if sequence is odd or changed
+while reading.
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from struct import Struct
+from time import sleep
+from typing import Dict, List, Optional
+
+from event import Event, EventEngine, EVENT_TICK
+from engine import BaseEngine, MainEngine
+from object import TickData
+from setting import SETTINGS
+
+
+QUOTE_FIELDS = [
+    "datetime",
+    "last_price",
+    "volume",
+    "last_volume",
+    "open_price",
+    "high_price",
+    "low_price",
+    "pre_close",
+    "bid_price_1",
+    "ask_price_1",
+    "bid_volume_1",
+    "ask_volume_1",
+]
+
+Quote = namedtuple("Quote", QUOTE_FIELDS)
+
+HEADER = Struct("<II")
+SYMBOL = Struct("<32s")
+SEQ = Struct("<Q")
+DATA = Struct("<q11d")
+SLOT_SIZE = SEQ.size + DATA.size
+
+# Reads of a slot before it is treated as left mid-write by a dead writer.
+READ_RETRIES = 1000
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class QuoteTable:
+    """
+    Shared memory table of latest quotes. Created by writer in engine
+    process and attached by readers in other processes.
+    """
+
+    def __init__(self, name: str = "", capacity: int = 0, create: bool = False):
+        """"""
+        self.name = name or SETTINGS["quote.name"]
+        self.create = create
+
+        if create:
+            self.capacity = capacity or SETTINGS["quote.capacity"]
+            size = HEADER.size + self.capacity * (SYMBOL.size + SLOT_SIZE)
+
+            # Remove table left by a process not exited properly.
+            try:
+                SharedMemory(self.name).unlink()
+            except FileNotFoundError:
+                pass
+
+            self.shm = SharedMemory(self.name, create=True, size=size)
+            HEADER.pack_into(self.shm.buf, 0, self.capacity, 0)
+        else:
+            self.shm = attach_shared_memory(self.name)
+            self.capacity, _ = HEADER.unpack_from(self.shm.buf, 0)
+
+        self.buf = self.shm.buf
+        self.symbol_offset = HEADER.size
+        self.slot_offset = HEADER.size + self.capacity * SYMBOL.size
+
+        self.indexes: Dict[str, int] = {}
+        self.seqs: List[int] = [0] * self.capacity
+
+    def close(self):
+        """
+        Release shared memory, which is also removed if created here.
+        """
+        self.buf = None
+        self.shm.close()
+
+        if self.create:
+            self.shm.unlink()
+
+    def update_tick(self, tick: TickData):
+        """
+        Write latest quote of tick. Only called from one writer thread.
+        """
+        ix = self.indexes.get(tick.vt_symbol, None)
+        if ix is None:
+            ix = self.add_symbol(tick.vt_symbol)
+            if ix is None:
+                return
+
+        offset = self.slot_offset + ix * SLOT_SIZE
+        seq = self.seqs[ix]
+
+        SEQ.pack_into(self.buf, offset, seq + 1)
+        DATA.pack_into(
+            self.buf,
+            offset + SEQ.size,
+            (tick.datetime - EPOCH) // MICROSECOND,
+            tick.last_price,
+            tick.volume,
+            tick.last_volume,
+            tick.open_price,
+            tick.high_price,
+            tick.low_price,
+            tick.pre_close,
+            tick.bid_price_1,
+            tick.ask_price_1,
+            tick.bid_volume_1,
+            tick.ask_volume_1,
+        )
+        SEQ.pack_into(self.buf, offset, seq + 2)
+
+        self.seqs[ix] = seq + 2
+
+    def add_symbol(self, vt_symbol: str) -> Optional[int]:
+        """
+        Allocate a slot for new vt_symbol. Symbol count is increased after
+        the symbol is written, so readers never see an empty entry.
+        """
+        ix = len(self.indexes)
+        if ix >= self.capacity:
+            return None
+
+        SYMBOL.pack_into(
+            self.buf, self.symbol_offset + ix * SYMBOL.size, vt_symbol.encode("utf-8"))
+        HEADER.pack_into(self.buf, 0, self.capacity, ix + 1)
+
+        self.indexes[vt_symbol] = ix
+        return ix
+
+    def load_symbols(self):
+        """
+        Load symbols added by writer since last load.
+        """
+        _, count = HEADER.unpack_from(self.buf, 0)
+
+        for ix in range(len(self.indexes), count):
+            buf = SYMBOL.unpack_from(self.buf, self.symbol_offset + ix * SYMBOL.size)[0]
+            self.indexes[buf.rstrip(b"\0").decode("utf-8")] = ix
+
+    def get_index(self, vt_symbol: str) -> Optional[int]:
+        """"""
+        ix = self.indexes.get(vt_symbol, None)
+        if ix is None:
+            self.load_symbols()
+            ix = self.indexes.get(vt_symbol, None)
+        return ix
+
+    def get_values(self, vt_symbol: str) -> Optional[tuple]:
+        """
+        Read raw quote values with datetime in microseconds since epoch.
+        None is returned if slot is still being written after retries.
+        """
+        ix = self.get_index(vt_symbol)
+        if ix is None:
+            return None
+
+        offset = self.slot_offset + ix * SLOT_SIZE
+        buf = self.buf
+
+        # Writer may have died in the middle of writing, so slot is given
+        # up as unreadable instead of waiting for it forever.
+        for _ in range(READ_RETRIES):
+            seq = SEQ.unpack_from(buf, offset)[0]
+            if not seq:
+                return None
+
+            if not seq & 1:
+                values = DATA.unpack_from(buf, offset + SEQ.size)
+                if SEQ.unpack_from(buf, offset)[0] == seq:
+                    return values
+
+            # Let writer finish if it is in the same process.
+            sleep(0)
+
+        return None
+
+    def get_quote(self, vt_symbol: str) -> Optional[Quote]:
+        """
+        Get latest quote of vt_symbol.
+        """
+        values = self.get_values(vt_symbol)
+        if values is None:
+            return None
+
+        dt = EPOCH + timedelta(microseconds=values[0])
+        return Quote(dt, *values[1:])
+
+    def get_last_price(self, vt_symbol: str) -> Optional[float]:
+        """"""
+        values = self.get_values(vt_symbol)
+        if values is None:
+            return None
+        return values[1]
+
+    def get_all_symbols(self) -> List[str]:
+        """"""
+        self.load_symbols()
+        return list(self.indexes.keys())
+
+
+def attach_shared_memory(name: str) -> SharedMemory:
+    """
+    Attach existing shared memory without registering it in resource
+    tracker, which would otherwise remove it when reader exits.
+    """
+    try:
+        return SharedMemory(name, track=False)
+    except TypeError:
+        shm = SharedMemory(name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class QuoteEngine(BaseEngine):
+    """
+    Write latest quote of every tick into shared memory table.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(QuoteEngine, self).__init__(main_engine, event_engine, "Quote")
+
+        self.table = QuoteTable(create=True)
+
+        self.event_engine.register(EVENT_TICK, self.process_tick_event)
+
+    def process_tick_event(self, event: Event):
+        """"""
+        self.table.update_tick(event.data)
+
+    def close(self):
+        """"""
+        self.event_engine.unregister(EVENT_TICK, self.process_tick_event)
+        self.table.close()
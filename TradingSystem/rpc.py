@@ -0,0 +1,421 @@
+"""
+Local RPC between an engine process and GUI processes on the same host.
+
+Messages are encoded with codec module and sent over unix domain socket.
+Server only publishes event types registered by each client, through
+a bounded queue of each client, so a slow client never blocks engine.
+
+Messages from clients are decoded without pickle, so a client can only
+send registered data objects, and connection is refused without the
+authkey if one is set.
+"""
+
+import os
+import socket
+from collections import deque
+from logging import ERROR
+from multiprocessing.connection import AuthenticationError, Client, Connection, Listener
+from threading import Condition, Lock, Thread
+from typing import Any, Dict, Set, Tuple
+
+from codec import decode_message, encode_message
+from event import Event, EventEngine, HandlerType, EVENT_TICK, EVENT_TIMER
+from engine import MainEngine
+from setting import SETTINGS
+
+REGISTER = "register"
+UNREGISTER = "unregister"
+REGISTER_GENERAL = "register_general"
+UNREGISTER_GENERAL = "unregister_general"
+
+
+def get_authkey() -> bytes:
+    """"""
+    authkey = SETTINGS["rpc.authkey"]
+    return authkey.encode("utf-8") if authkey else None
+
+
+class ClientSession:
+    """
+    Subscriptions and outbound queue of one client connection.
+
+    Event thread only queues encoded messages, and a sender thread of the
+    session writes them, so a slow client never blocks event thread. A
+    tick waiting in queue is replaced by a newer tick of the same type
+    and symbol, a tick is dropped when queue is full, and client is
+    disconnected if other messages overflow the queue.
+    """
+
+    def __init__(self, connection: Connection, queue_size: int):
+        """"""
+        self.connection = connection
+        self.queue_size = queue_size
+
+        self.types: Set[str] = set()
+        self.general = False
+
+        # Queue of (tick key, msg), msg of tick is kept in ticks.
+        self.queue = deque()
+        self.ticks: Dict[Tuple[str, str], bytes] = {}
+        self.condition = Condition()
+        self.closed = False
+
+        self.conflated_count = 0
+        self.dropped_count = 0
+        self.thread = Thread(target=self.run_sender, daemon=True)
+
+    def is_subscribed(self, type: str) -> bool:
+        """"""
+        return self.general or type in self.types
+
+    def put(self, msg: bytes, key: Tuple[str, str] = None) -> bool:
+        """
+        Queue message, and return False if queue is full of messages
+        other than ticks. Tick is dropped if it cannot be queued.
+        """
+        with self.condition:
+            if self.closed:
+                return True
+
+            if key in self.ticks:
+                self.ticks[key] = msg
+                self.conflated_count += 1
+                return True
+
+            if len(self.queue) >= self.queue_size:
+                if key:
+                    self.dropped_count += 1
+                    return True
+                return False
+
+            if key:
+                self.ticks[key] = msg
+            self.queue.append((key, msg))
+            self.condition.notify()
+            return True
+
+    def run_sender(self):
+        """"""
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+
+                if self.closed:
+                    break
+
+                key, msg = self.queue.popleft()
+                if key:
+                    msg = self.ticks.pop(key)
+
+            try:
+                self.connection.send_bytes(msg)
+            except OSError:
+                break
+
+        self.close()
+
+    def close(self):
+        """
+        Stop sender and shut down socket, so that blocked send and receive
+        of both threads return. Connection is closed by request thread.
+        """
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+
+        try:
+            sock = socket.socket(fileno=os.dup(self.connection.fileno()))
+            sock.shutdown(socket.SHUT_RDWR)
+            sock.close()
+        except OSError:
+            pass
+
+
+class RpcServer:
+    """
+    Publish events of engine process to connected clients and
+    call main engine functions requested by them.
+    """
+
+    functions = ("subscribe", "send_order", "cancel_order", "send_orders", "cancel_orders")
+
+    def __init__(
+        self,
+        main_engine: MainEngine,
+        event_engine: EventEngine,
+        address: str = "",
+    ):
+        """"""
+        self.main_engine = main_engine
+        self.event_engine = event_engine
+        self.address = address or SETTINGS["rpc.address"]
+        self.queue_size: int = SETTINGS["rpc.queue_size"]
+
+        self._active = False
+        self._listener = None
+        self._sessions: Dict[Connection, ClientSession] = {}
+        self._lock = Lock()
+        self._thread = Thread(target=self._run_accept, daemon=True)
+
+    def start(self):
+        """
+        Start listening on unix domain socket.
+        """
+        # Remove socket file left by a process not exited properly.
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=get_authkey())
+        self._active = True
+        self._thread.start()
+
+        self.event_engine.register_general(self.process_event)
+
+    def close(self):
+        """
+        Stop publishing and disconnect all clients.
+        """
+        if not self._active:
+            return
+        self._active = False
+
+        self.event_engine.unregister_general(self.process_event)
+        self._listener.close()
+
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.close()
+
+    def get_client_count(self) -> int:
+        """"""
+        return len(self._sessions)
+
+    def _run_accept(self):
+        """"""
+        while self._active:
+            try:
+                connection = self._listener.accept()
+            except AuthenticationError:
+                self.main_engine.write_log("client refused: wrong authkey", "RpcServer", ERROR)
+                continue
+            except OSError:
+                break
+
+            session = ClientSession(connection, self.queue_size)
+            with self._lock:
+                self._sessions[connection] = session
+            session.thread.start()
+
+            thread = Thread(target=self._run_request, args=(session,), daemon=True)
+            thread.start()
+
+    def _run_request(self, session: ClientSession):
+        """
+        Receive subscription and function call from one client, until
+        disconnected or session is closed.
+        """
+        connection = session.connection
+
+        while self._active and not session.closed:
+            try:
+                name, data = decode_message(connection.recv_bytes(), allow_pickle=False)
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                self.main_engine.write_log(f"client dropped, invalid message: {e}", "RpcServer", ERROR)
+                break
+
+            if name == REGISTER:
+                session.types.add(data)
+            elif name == UNREGISTER:
+                session.types.discard(data)
+            elif name == REGISTER_GENERAL:
+                session.general = True
+            elif name == UNREGISTER_GENERAL:
+                session.general = False
+            elif name in self.functions:
+                func = getattr(self.main_engine, name)
+                try:
+                    func(data)
+                except Exception as e:
+                    self.main_engine.write_log(f"failed to call {name}: {e}", "RpcServer", ERROR)
+
+        with self._lock:
+            self._sessions.pop(connection, None)
+
+        session.close()
+        session.thread.join()
+        connection.close()
+
+    def get_subscriber_count(self, type: str) -> int:
+        """
+        Get number of clients receiving a specific event type.
+        """
+        return len([s for s in list(self._sessions.values()) if s.is_subscribed(type)])
+
+    def process_event(self, event: Event):
+        """
+        Publish event to clients which registered its type. Timer event
+        is generated by client itself. Only queues are accessed here.
+        """
+        if not self._sessions or event.type == EVENT_TIMER:
+            return
+
+        # Event is only encoded once no matter how many clients receive it.
+        msg = None
+        key = None
+        for session in list(self._sessions.values()):
+            if not session.is_subscribed(event.type):
+                continue
+
+            if msg is None:
+                msg = encode_message(event.type, event.data)
+                if event.type.startswith(EVENT_TICK):
+                    key = (event.type, event.data.vt_symbol)
+
+            if not session.put(msg, key):
+                self.main_engine.write_log(
+                    f"client dropped, {self.queue_size} messages not sent", "RpcServer", ERROR
+                )
+                session.close()
+
+
+class RemoteEventEngine(EventEngine):
+    """
+    Event engine fed by events published from RpcServer of another process.
+    Handlers are registered in the same way as a local event engine.
+    """
+
+    def __init__(self, address: str = "", interval: int = 1):
+        """"""
+        super(RemoteEventEngine, self).__init__(interval)
+
+        self.address = address or SETTINGS["rpc.address"]
+        self._connection = None
+        # Requests are sent from GUI thread and handlers of any thread.
+        self._send_lock = Lock()
+        self._receiver = Thread(target=self._run_receive, daemon=True)
+
+    def _run_receive(self):
+        """"""
+        while self._active:
+            try:
+                if not self._connection.poll(1):
+                    continue
+                type, data = decode_message(self._connection.recv_bytes())
+            except (EOFError, OSError):
+                break
+
+            self.put(Event(type, data))
+
+    def start(self):
+        """
+        Connect to server before starting event processing. Handlers
+        registered before start are sent to server now.
+        """
+        self._connection = Client(self.address, family="AF_UNIX", authkey=get_authkey())
+
+        for type in list(self._handlers.keys()):
+            self._send_register(REGISTER, type)
+        if self._general_handlers:
+            self._send(REGISTER_GENERAL)
+
+        super(RemoteEventEngine, self).start()
+        self._receiver.start()
+
+    def stop(self):
+        """"""
+        super(RemoteEventEngine, self).stop()
+        self._receiver.join()
+        self._connection.close()
+
+    def register(self, type: str, handler: HandlerType):
+        """"""
+        new_type = type not in self._handlers
+        super(RemoteEventEngine, self).register(type, handler)
+
+        if new_type:
+            self._send_register(REGISTER, type)
+
+    def unregister(self, type: str, handler: HandlerType):
+        """"""
+        super(RemoteEventEngine, self).unregister(type, handler)
+
+        if type not in self._handlers:
+            self._send_register(UNREGISTER, type)
+
+    def register_general(self, handler: HandlerType):
+        """"""
+        new_general = not self._general_handlers
+        super(RemoteEventEngine, self).register_general(handler)
+
+        if new_general:
+            self._send(REGISTER_GENERAL)
+
+    def unregister_general(self, handler: HandlerType):
+        """"""
+        super(RemoteEventEngine, self).unregister_general(handler)
+
+        if not self._general_handlers:
+            self._send(UNREGISTER_GENERAL)
+
+    def call(self, name: str, req: Any):
+        """
+        Call main engine function in server process.
+        """
+        self._send(name, req)
+
+    def _send_register(self, name: str, type: str):
+        """
+        Timer event is generated locally, so not registered in server.
+        """
+        if type != EVENT_TIMER:
+            self._send(name, type)
+
+    def _send(self, name: str, data: Any = None):
+        """"""
+        if self._connection:
+            msg = encode_message(name, data)
+            with self._send_lock:
+                self._connection.send_bytes(msg)
+
+
+class RemoteMainEngine(MainEngine):
+    """
+    Main engine used by GUI attached to an engine running in another process.
+    """
+
+    def __init__(self, event_engine: RemoteEventEngine):
+        """"""
+        super(RemoteMainEngine, self).__init__(event_engine)
+
+    def subscribe(self, req):
+        """"""
+        self.event_engine.call("subscribe", req)
+
+    def send_order(self, req):
+        """
+        Order is sent asynchronously, so no vt_orderid is returned.
+        """
+        self.event_engine.call("send_order", req)
+        return ""
+
+    def cancel_order(self, req):
+        """"""
+        self.event_engine.call("cancel_order", req)
+
+    def send_orders(self, reqs):
+        """
+        Results are received by order batch event.
+        """
+        self.event_engine.call("send_orders", list(reqs))
+        return [""] * len(reqs)
+
+    def cancel_orders(self, reqs):
+        """"""
+        self.event_engine.call("cancel_orders", list(reqs))
+        return [""] * len(reqs)
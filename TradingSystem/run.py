@@ -1,20 +1,74 @@
+import argparse
+
 from event import EventEngine
 from engine import MainEngine
-from mainwindow import MainWindow,create_qapp
+from setting import SETTINGS
 
 
 
-def main():
+def run_gui(attach: bool = False, address: str = ""):
+    """
+    Run GUI with local engines, or attach it to a headless engine
+    through rpc address.
+    """
+    # Qt is only imported when GUI is needed.
+    from mainwindow import MainWindow,create_qapp
+
     qapp = create_qapp('My Trading System')
 
-    event_engine = EventEngine()
-    # event_engine.start()
-    main_engine = MainEngine(event_engine)
+    if attach:
+        from rpc import RemoteEventEngine, RemoteMainEngine
+
+        event_engine = RemoteEventEngine(address)
+        main_engine = RemoteMainEngine(event_engine)
+    else:
+        event_engine = EventEngine()
+        main_engine = MainEngine(event_engine)
+
     main_window = MainWindow(main_engine, event_engine)
     main_window.showMaximized()
 
+    # Objects created at startup are frozen after main window is created.
+    if SETTINGS["gc.freeze"]:
+        event_engine.tune_gc(freeze=True)
+
     qapp.exec()
 
+
+def main():
+    parser = argparse.ArgumentParser(description="My Trading System")
+    parser.add_argument(
+        "--headless", action="store_true", help="run engines without GUI")
+    parser.add_argument(
+        "--attach", action="store_true",
+        help="attach GUI to a headless engine on the same host")
+    parser.add_argument(
+        "--address", default="", help="rpc address of headless engine")
+    parser.add_argument(
+        "--symbols", nargs="*", default=[], metavar="VT_SYMBOL",
+        help="vt_symbols to subscribe in headless mode, e.g. AAPL.NYMEX")
+    parser.add_argument(
+        "--engines", nargs="*", default=[], metavar="NAME",
+        help="function engines to start in headless mode, e.g. quote")
+    parser.add_argument(
+        "--tcp", nargs="?", const="", default=None, metavar="HOST:PORT",
+        help="trade symbols through exchange server in headless mode, "
+             "address defaults to tcp.address setting")
+    parser.add_argument(
+        "--trace", action="store_true",
+        help="record latency of each event processing stage")
+    args = parser.parse_args()
+
+    if args.trace:
+        SETTINGS["event.trace"] = True
+
+    if args.headless:
+        from headless import get_engine_class, run_headless
+
+        engine_classes = [get_engine_class(name) for name in args.engines]
+        run_headless(args.symbols, engine_classes, address=args.address, tcp_address=args.tcp)
+    else:
+        run_gui(args.attach, args.address)
+
 if __name__ == "__main__":
     main()
-
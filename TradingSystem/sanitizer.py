@@ -0,0 +1,165 @@
+"""
+Tick sanitizer run by each gateway before putting tick events, so that
+bad ticks never take space in event queue.
+
+Each gateway has its own sanitizer, which checks ticks in the thread
+pushing them. Checking a tick costs a few comparisons with the latest
+state of its symbol, and no clock is read per tick: symbols updated
+since previous check are marked, and stale symbols are found from event
+thread on timer.
+
+check and check_stale run in different threads without lock. They only
+share the updated flag of each state and the states dict, which is
+copied before iteration. If a tick is accepted while check_stale clears
+its flag, the symbol is still taken as received at that time, so a race
+can neither flag a live symbol stale nor hide a stale one.
+"""
+
+from datetime import datetime
+from time import monotonic
+from typing import Dict, List
+
+from object import TickData
+from setting import SETTINGS
+
+
+INF = float("inf")
+
+
+class SymbolState:
+    """
+    Latest accepted tick of a symbol.
+    """
+
+    __slots__ = ("datetime", "volume", "last_price", "pending_price", "updated", "received", "stale")
+
+    def __init__(self, tick: TickData):
+        """"""
+        self.datetime: datetime = tick.datetime
+        self.volume: float = tick.volume
+        self.last_price: float = tick.last_price
+        self.pending_price: float = 0
+
+        # Set by every accepted tick, and cleared by check_stale, which
+        # then records the time in received.
+        self.updated: bool = True
+        self.received: float = monotonic()
+        self.stale: bool = False
+
+
+class TickSanitizer:
+    """
+    Drop duplicate, out-of-order and bad price ticks by latest state of
+    each symbol, and flag symbols without tick for stale_seconds.
+
+    A tick older than the latest one is out of order, and a tick of the
+    same time, volume and price is a duplicate. Price is bad if it is not
+    positive, outside limit up and limit down, or moves more than max_jump
+    (ratio) from latest accepted price unless confirmed by next tick.
+    """
+
+    def __init__(self, max_jump: float = None, stale_seconds: float = None):
+        """"""
+        if max_jump is None:
+            max_jump = SETTINGS["sanitizer.max_jump"]
+        if stale_seconds is None:
+            stale_seconds = SETTINGS["sanitizer.stale_seconds"]
+
+        self.max_jump = max_jump
+        self.stale_seconds = stale_seconds
+
+        self.states: Dict[str, SymbolState] = {}
+
+        self.accepted_count = 0
+        self.duplicate_count = 0
+        self.out_of_order_count = 0
+        self.bad_price_count = 0
+        self.stale_count = 0
+
+    def check(self, tick: TickData) -> bool:
+        """
+        Return True if tick should be pushed.
+        """
+        last_price = tick.last_price
+        if not 0 < last_price < INF or (
+            tick.limit_up and last_price > tick.limit_up
+        ) or (
+            tick.limit_down and last_price < tick.limit_down
+        ):
+            self.bad_price_count += 1
+            return False
+
+        state = self.states.get(tick.vt_symbol, None)
+        if not state:
+            self.states[tick.vt_symbol] = SymbolState(tick)
+            self.accepted_count += 1
+            return True
+
+        if tick.datetime < state.datetime:
+            self.out_of_order_count += 1
+            return False
+
+        if (
+            tick.datetime == state.datetime
+            and tick.volume == state.volume
+            and last_price == state.last_price
+        ):
+            self.duplicate_count += 1
+            return False
+
+        if self.max_jump and abs(last_price - state.last_price) > state.last_price * self.max_jump:
+            # Two ticks in a row near the new price are taken as a real
+            # move, so a gap does not block the symbol forever.
+            pending_price = state.pending_price
+            state.pending_price = last_price
+            if not pending_price or abs(last_price - pending_price) > pending_price * self.max_jump:
+                self.bad_price_count += 1
+                return False
+
+        state.datetime = tick.datetime
+        state.volume = tick.volume
+        state.last_price = last_price
+        state.pending_price = 0
+        state.updated = True
+
+        self.accepted_count += 1
+        return True
+
+    def check_stale(self) -> List[str]:
+        """
+        Flag symbols without accepted tick for stale_seconds, and return
+        those newly flagged. Flag is cleared if symbol has been updated.
+        Called on timer, not per tick.
+        """
+        if not self.stale_seconds:
+            return []
+
+        now = monotonic()
+        deadline = now - self.stale_seconds
+
+        vt_symbols = []
+        for vt_symbol, state in list(self.states.items()):
+            if state.updated:
+                state.updated = False
+                state.received = now
+                state.stale = False
+            elif not state.stale and state.received < deadline:
+                state.stale = True
+                vt_symbols.append(vt_symbol)
+
+        self.stale_count += len(vt_symbols)
+        return vt_symbols
+
+    def get_stale_symbols(self) -> List[str]:
+        """"""
+        return [vt_symbol for vt_symbol, state in list(self.states.items()) if state.stale]
+
+    def get_counts(self) -> Dict[str, int]:
+        """"""
+        return {
+            "accepted": self.accepted_count,
+            "duplicate": self.duplicate_count,
+            "out_of_order": self.out_of_order_count,
+            "bad_price": self.bad_price_count,
+            "stale": self.stale_count,
+        }
@@ -0,0 +1,210 @@
+"""
+Cross-sectional market scanner over all symbols with ticks.
+
+Tick handler only saves latest tick of each symbol. At every scan interval
+ticks updated since last scan are written into NumPy columns, and rankings
+are calculated over all symbols at once, so work is bounded by number of
+symbols and scan interval instead of tick rate.
+"""
+
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from event import Event, EventEngine, EVENT_SCAN, EVENT_TICK, EVENT_TIMER
+from engine import BaseEngine, MainEngine
+from object import ScanData, TickData
+from setting import SETTINGS
+
+
+# Tick fields saved in columns.
+SCAN_FIELDS = [
+    "last_price",
+    "pre_close",
+    "open_price",
+    "bid_price_1",
+    "ask_price_1",
+    "volume",
+]
+
+
+class ScannerEngine(BaseEngine):
+    """
+    Rank symbols by change, spread and volume spike at fixed interval,
+    and put top rows of each ranking as scan event.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(ScannerEngine, self).__init__(main_engine, event_engine, "Scanner")
+
+        self.interval: int = SETTINGS["scanner.interval"]
+        self.top: int = SETTINGS["scanner.top"]
+        self.timer_count = 0
+
+        self.ticks: Dict[str, TickData] = {}
+        self.rows: Dict[str, int] = {}
+        self.vt_symbols: List[str] = []
+
+        capacity = 1024
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.full(capacity, np.nan) for name in SCAN_FIELDS
+        }
+        # Volume traded in last interval and its average, for volume spike.
+        self.last_volume = np.full(capacity, np.nan)
+        self.interval_volume = np.full(capacity, np.nan)
+        self.average_volume = np.full(capacity, np.nan)
+        self.volume_spike = np.full(0, np.nan)
+
+        self.rankings: Dict[str, Callable[[], np.ndarray]] = {
+            "gainers": self.calculate_change,
+            "losers": self.calculate_fall,
+            "spread": self.calculate_spread,
+            "volume spike": self.calculate_volume_spike,
+        }
+
+        self.event_engine.register(EVENT_TICK, self.process_tick_event)
+        self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+
+    def process_tick_event(self, event: Event):
+        """"""
+        tick = event.data
+        self.ticks[tick.vt_symbol] = tick
+
+    def process_timer_event(self, event: Event):
+        """"""
+        self.timer_count += 1
+        if self.timer_count < self.interval:
+            return
+        self.timer_count = 0
+
+        self.scan()
+
+    def scan(self):
+        """
+        Update columns with latest ticks and put results of all rankings.
+        """
+        if not self.ticks:
+            return
+
+        self.update_columns()
+
+        for name in self.rankings.keys():
+            self.event_engine.put(Event(EVENT_SCAN, self.get_ranking(name)))
+
+    def update_columns(self):
+        """
+        Write ticks updated since last scan into columns.
+        """
+        ticks = self.ticks
+        self.ticks = {}
+
+        for vt_symbol in ticks.keys():
+            if vt_symbol not in self.rows:
+                self.add_symbol(vt_symbol)
+
+        index = np.fromiter((self.rows[vt_symbol] for vt_symbol in ticks.keys()), np.intp, len(ticks))
+        for name, column in self.columns.items():
+            column[index] = [getattr(tick, name) for tick in ticks.values()]
+
+        # Volume of tick is accumulated, so volume in interval is the change
+        # since last scan. Symbols without ticks have no volume in interval.
+        volume = self.columns["volume"][index]
+        self.interval_volume[:] = 0
+        self.interval_volume[index] = np.maximum(volume - self.last_volume[index], 0)
+        self.last_volume[index] = volume
+
+        # Spike is compared with average before this interval.
+        size = len(self.vt_symbols)
+        interval_volume = self.interval_volume[:size]
+        average_volume = self.average_volume[:size]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.volume_spike = np.where(average_volume > 0, interval_volume / average_volume, np.nan)
+
+        self.average_volume[:size] = np.where(
+            np.isnan(average_volume),
+            interval_volume,
+            average_volume + 0.1 * (interval_volume - average_volume),
+        )
+
+    def add_symbol(self, vt_symbol: str):
+        """
+        Add row of a new symbol, columns are doubled if full.
+        """
+        row = len(self.vt_symbols)
+        self.rows[vt_symbol] = row
+        self.vt_symbols.append(vt_symbol)
+
+        capacity = len(self.last_volume)
+        if row < capacity:
+            return
+
+        for name, column in self.columns.items():
+            self.columns[name] = self.extend_column(column)
+        self.last_volume = self.extend_column(self.last_volume)
+        self.interval_volume = self.extend_column(self.interval_volume)
+        self.average_volume = self.extend_column(self.average_volume)
+
+    def extend_column(self, column: np.ndarray) -> np.ndarray:
+        """"""
+        return np.concatenate((column, np.full(len(column), np.nan)))
+
+    def get_column(self, name: str) -> np.ndarray:
+        """"""
+        return self.columns[name][:len(self.vt_symbols)]
+
+    def calculate_change(self) -> np.ndarray:
+        """
+        Change ratio from previous close, or from open if not given.
+        """
+        last_price = self.get_column("last_price")
+        pre_close = self.get_column("pre_close")
+        base = np.where(pre_close > 0, pre_close, self.get_column("open_price"))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(base > 0, last_price / base - 1, np.nan)
+
+    def calculate_fall(self) -> np.ndarray:
+        """"""
+        return -self.calculate_change()
+
+    def calculate_spread(self) -> np.ndarray:
+        """
+        Spread relative to mid price.
+        """
+        bid_price = self.get_column("bid_price_1")
+        ask_price = self.get_column("ask_price_1")
+        mid_price = (bid_price + ask_price) / 2
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(mid_price > 0, (ask_price - bid_price) / mid_price, np.nan)
+
+    def calculate_volume_spike(self) -> np.ndarray:
+        """
+        Volume in last interval relative to its moving average.
+        """
+        return self.volume_spike
+
+    def get_ranking(self, name: str, top: int = 0) -> ScanData:
+        """
+        Get top symbols of ranking in descending order of score.
+        """
+        top = top or self.top
+
+        scores = self.rankings[name]()
+        valid = np.flatnonzero(~np.isnan(scores))
+        if len(valid) > top:
+            valid = valid[np.argpartition(-scores[valid], top - 1)[:top]]
+        index = valid[np.argsort(-scores[valid], kind="stable")]
+
+        return ScanData(
+            name=name,
+            vt_symbols=[self.vt_symbols[i] for i in index],
+            scores=scores[index].tolist(),
+            last_prices=self.get_column("last_price")[index].tolist(),
+        )
+
+    def close(self):
+        """"""
+        self.event_engine.unregister(EVENT_TICK, self.process_tick_event)
+        self.event_engine.unregister(EVENT_TIMER, self.process_timer_event)
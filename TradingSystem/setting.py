@@ -4,6 +4,64 @@ SETTINGS = {
     "font.family": "Arial",
     "font.size": 12,
 
+    "price.digits": 2,
+    "volume.digits": 0,
+
+    "rpc.address": "/tmp/trading_system.sock",
+    # Shared secret required from clients if set.
+    "rpc.authkey": "",
+    # Messages queued for a client before it is dropped.
+    "rpc.queue_size": 10000,
+    "headless.status_interval": 10,
+
+    "quote.name": "trading_system_quote",
+    "quote.capacity": 10000,
+
+    "database.path": "trading_system.db",
+    "database.batch_size": 1000,
+    "database.record_tick": True,
+    "database.record_bar": True,
+
+    "event.trace": False,
+    "event.pool_types": [],
+    "gc.threshold": [],
+    "gc.freeze": False,
+
+    "profile.path": "profile",
+    "profile.interval": 0.001,
+    "profile.top": 30,
+    "profile.frames": 10,
+    # Seconds to wait for event thread to switch cProfile.
+    "profile.timeout": 5,
+
+    "contract.file": "contracts.csv",
+
+    "algo.wheel_size": 60,
+
+    "scanner.interval": 1,
+    "scanner.top": 20,
+
+    "journal.enabled": False,
+    "journal.path": "journal",
+    "journal.commit_interval": 0.002,
+    "journal.snapshot_count": 100000,
+
+    "tcp.address": "127.0.0.1:9000",
+    "tcp.heartbeat_interval": 1,
+    "tcp.heartbeat_timeout": 5,
+    "tcp.reconnect_min": 0.5,
+    "tcp.reconnect_max": 10,
+
+    "sanitizer.max_jump": 0.5,
+    "sanitizer.stale_seconds": 10,
+
+    "log.level": 20,
+    "log.console": False,
+    "log.file": "trading_system.log",
+    "log.max_bytes": 10 * 1024 * 1024,
+    "log.backup_count": 5,
+    "log.batch_size": 1000,
+
     'remove_num':30
 }
 
@@ -0,0 +1,58 @@
+from collections import deque
+
+from constant import Direction
+from object import BarData, TradeData
+from strategy import StrategyTemplate
+
+
+class MaCrossStrategy(StrategyTemplate):
+    """
+    Buy when fast moving average of bar close crosses above slow one,
+    sell when it crosses below.
+    """
+
+    author = "Oliver He"
+
+    fast_window = 5
+    slow_window = 20
+    fixed_size = 100
+
+    parameters = ["fast_window", "slow_window", "fixed_size"]
+    variables = ["pos"]
+
+    def __init__(self, strategy_engine, strategy_name, vt_symbols, setting):
+        """"""
+        super(MaCrossStrategy, self).__init__(
+            strategy_engine, strategy_name, vt_symbols, setting
+        )
+
+        self.vt_symbol = vt_symbols[0]
+        self.pos = 0
+
+        self.closes = deque(maxlen=self.slow_window)
+        self.last_diff = 0
+
+    def on_bar(self, bar: BarData):
+        """"""
+        self.closes.append(bar.close_price)
+        if len(self.closes) < self.slow_window:
+            return
+
+        closes = list(self.closes)
+        fast_ma = sum(closes[-self.fast_window:]) / self.fast_window
+        slow_ma = sum(closes) / self.slow_window
+        diff = fast_ma - slow_ma
+
+        if diff > 0 and self.last_diff <= 0 and self.pos <= 0:
+            self.buy(self.vt_symbol, bar.close_price * 1.01, self.fixed_size)
+        elif diff < 0 and self.last_diff >= 0 and self.pos > 0:
+            self.sell(self.vt_symbol, bar.close_price * 0.99, self.pos)
+
+        self.last_diff = diff
+
+    def on_trade(self, trade: TradeData):
+        """"""
+        if trade.direction == Direction.LONG:
+            self.pos += trade.volume
+        else:
+            self.pos -= trade.volume
@@ -0,0 +1,728 @@
+"""
+Strategy engine running strategies on tick, bar, order and trade events.
+
+Each strategy is run by a worker in one of the modes:
+    * inline: callbacks run directly in event engine thread
+    * thread: callbacks run in a thread owned by the strategy
+    * process: strategy lives in its own process, events are sent by pipe
+"""
+
+import importlib
+import traceback
+from abc import ABC
+from collections import defaultdict, deque
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from pathlib import Path
+from queue import SimpleQueue
+from threading import Condition, Lock, Thread
+from time import monotonic, perf_counter_ns
+from typing import Any, Dict, List
+
+from codec import decode_message, encode_message
+from constant import Direction, OrderType
+from event import Event, EventEngine, EVENT_TICK, EVENT_ORDER, EVENT_TRADE
+from engine import BaseEngine, MainEngine
+from object import (
+    BarData,
+    OrderData,
+    OrderRequest,
+    SubscribeRequest,
+    TickData,
+    TradeData,
+)
+from utility import BarGenerator, extract_vt_symbol, round_to
+
+
+MODE_INLINE = "inline"
+MODE_THREAD = "thread"
+MODE_PROCESS = "process"
+
+
+class StrategyTemplate(ABC):
+    """
+    Base class of strategies. Parameters listed in parameters are
+    loaded from setting dict.
+    """
+
+    author = ""
+    parameters = []
+    variables = []
+
+    def __init__(
+        self,
+        strategy_engine: Any,
+        strategy_name: str,
+        vt_symbols: List[str],
+        setting: dict,
+    ):
+        """"""
+        self.strategy_engine = strategy_engine
+        self.strategy_name = strategy_name
+        self.vt_symbols = vt_symbols
+
+        self.inited = False
+        self.trading = False
+
+        for name in self.parameters:
+            if name in setting:
+                setattr(self, name, setting[name])
+
+    def init(self):
+        """"""
+        self.on_init()
+        self.inited = True
+
+    def start(self):
+        """"""
+        self.trading = True
+        self.on_start()
+
+    def stop(self):
+        """"""
+        self.trading = False
+        self.on_stop()
+
+    def on_init(self):
+        """
+        Callback when strategy is inited.
+        """
+        pass
+
+    def on_start(self):
+        """
+        Callback when strategy is started.
+        """
+        pass
+
+    def on_stop(self):
+        """
+        Callback when strategy is stopped.
+        """
+        pass
+
+    def on_tick(self, tick: TickData):
+        """
+        Callback of new tick data update.
+        """
+        pass
+
+    def on_bar(self, bar: BarData):
+        """
+        Callback of new bar data update.
+        """
+        pass
+
+    def on_trade(self, trade: TradeData):
+        """
+        Callback of new trade data update.
+        """
+        pass
+
+    def on_order(self, order: OrderData):
+        """
+        Callback of new order data update.
+        """
+        pass
+
+    def buy(self, vt_symbol: str, price: float, volume: float) -> str:
+        """"""
+        return self.send_order(vt_symbol, Direction.LONG, price, volume)
+
+    def sell(self, vt_symbol: str, price: float, volume: float) -> str:
+        """"""
+        return self.send_order(vt_symbol, Direction.SHORT, price, volume)
+
+    def send_order(
+        self,
+        vt_symbol: str,
+        direction: Direction,
+        price: float,
+        volume: float,
+    ) -> str:
+        """
+        Send a limit order, vt_orderid is returned except in process mode.
+        """
+        if not self.trading:
+            return ""
+
+        return self.strategy_engine.send_order(
+            self, vt_symbol, direction, price, volume)
+
+    def cancel_order(self, vt_orderid: str):
+        """"""
+        if self.trading:
+            self.strategy_engine.cancel_order(self, vt_orderid)
+
+    def write_log(self, msg: str):
+        """"""
+        self.strategy_engine.write_log(msg, self)
+
+
+class LatencyStats:
+    """
+    Callback latency of a strategy in nanoseconds. Percentiles are
+    calculated from most recent samples.
+    """
+
+    def __init__(self, size: int = 1000):
+        """"""
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.samples = deque(maxlen=size)
+
+    def add(self, latency: int):
+        """"""
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+        self.samples.append(latency)
+
+    def get_result(self) -> dict:
+        """
+        Get latency statistics in microseconds.
+        """
+        if not self.count:
+            return {"count": 0}
+
+        samples = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000,
+            "p50_us": samples[len(samples) // 2] / 1000,
+            "p99_us": samples[int(len(samples) * 0.99)] / 1000,
+            "max_us": self.max / 1000,
+        }
+
+
+class InlineWorker:
+    """
+    Call strategy callbacks directly in the thread putting events.
+    """
+
+    mode = MODE_INLINE
+
+    def __init__(self, strategy_engine: Any, strategy: StrategyTemplate):
+        """"""
+        self.strategy_engine = strategy_engine
+        self.strategy = strategy
+        self.strategy_name = strategy.strategy_name
+        self.vt_symbols = strategy.vt_symbols
+
+        self.stats = LatencyStats()
+
+    def start(self):
+        """"""
+        pass
+
+    def stop(self):
+        """"""
+        pass
+
+    def put(self, name: str, data: Any = None):
+        """"""
+        self.call(name, data)
+
+    def call(self, name: str, data: Any = None):
+        """
+        Call strategy function by name and record its latency. Exception
+        is logged, so that other strategies are not affected.
+        """
+        func = getattr(self.strategy, name)
+
+        start = perf_counter_ns()
+        try:
+            if data is None:
+                func()
+            else:
+                func(data)
+        except Exception:
+            msg = f"exception raised in {name}:\n{traceback.format_exc()}"
+            self.strategy_engine.write_log(msg, self.strategy)
+        self.stats.add(perf_counter_ns() - start)
+
+    def get_latency(self) -> dict:
+        """"""
+        return self.stats.get_result()
+
+
+class ThreadWorker(InlineWorker):
+    """
+    Call strategy callbacks in a dedicated thread.
+    """
+
+    mode = MODE_THREAD
+
+    def __init__(self, strategy_engine: Any, strategy: StrategyTemplate):
+        """"""
+        super(ThreadWorker, self).__init__(strategy_engine, strategy)
+
+        self.queue = SimpleQueue()
+        self.thread = Thread(target=self.run, daemon=True)
+
+    def start(self):
+        """"""
+        self.thread.start()
+
+    def stop(self):
+        """"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def put(self, name: str, data: Any = None):
+        """
+        Tick is an immutable snapshot, so it is queued without copying.
+        """
+        self.queue.put((name, data))
+
+    def run(self):
+        """"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self.call(*item)
+
+
+class ProcessWorker:
+    """
+    Run strategy in a child process. Events are encoded by codec and sent
+    through pipe, orders sent by strategy come back the same way.
+
+    Events are queued and sent by a sender thread, so that a slow strategy
+    process never blocks event engine thread. While a tick of a symbol is
+    still waiting in queue, a newer tick of it replaces the waiting one.
+    """
+
+    mode = MODE_PROCESS
+
+    def __init__(
+        self,
+        strategy_engine: Any,
+        strategy_class: type,
+        strategy_name: str,
+        vt_symbols: List[str],
+        setting: dict,
+    ):
+        """"""
+        self.strategy_engine = strategy_engine
+        self.strategy_name = strategy_name
+        self.vt_symbols = vt_symbols
+
+        self.latency = {"count": 0}
+
+        # Queue of (name, data), and for tick only (name, vt_symbol) with
+        # the latest tick kept in ticks.
+        self.queue = deque()
+        self.ticks: Dict[str, TickData] = {}
+        self.condition = Condition()
+        self.conflated_count = 0
+
+        self.connection, child_connection = Pipe()
+        self.process = Process(
+            target=run_strategy_process,
+            args=(strategy_class, strategy_name, vt_symbols, setting, child_connection),
+            daemon=True,
+        )
+        self.thread = Thread(target=self.run, daemon=True)
+        self.sender_thread = Thread(target=self.run_sender, daemon=True)
+
+    def start(self):
+        """"""
+        self.process.start()
+        self.thread.start()
+        self.sender_thread.start()
+
+    def stop(self):
+        """"""
+        self.put("exit")
+        self.sender_thread.join()
+        self.process.join()
+        self.thread.join()
+        self.connection.close()
+
+    def put(self, name: str, data: Any = None):
+        """
+        Queue event for sender thread. Tick is conflated with the one of
+        the same symbol still waiting, other events are never dropped.
+        """
+        with self.condition:
+            if name == "on_tick":
+                vt_symbol = data.vt_symbol
+                if vt_symbol in self.ticks:
+                    self.ticks[vt_symbol] = data
+                    self.conflated_count += 1
+                    return
+
+                self.ticks[vt_symbol] = data
+                self.queue.append((name, vt_symbol))
+            else:
+                self.queue.append((name, data))
+
+            self.condition.notify()
+
+    def run_sender(self):
+        """
+        Send queued events to strategy process until exit is sent.
+        """
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+
+                name, data = self.queue.popleft()
+                if name == "on_tick":
+                    data = self.ticks.pop(data)
+
+            try:
+                self.connection.send_bytes(encode_message(name, data))
+            except OSError:
+                break
+
+            if name == "exit":
+                break
+
+    def run(self):
+        """
+        Receive requests from strategy process.
+        """
+        while True:
+            try:
+                name, data = decode_message(self.connection.recv_bytes())
+            except (EOFError, OSError):
+                break
+
+            if name == "send_order":
+                self.strategy_engine.send_request(self.strategy_name, data)
+            elif name == "cancel_order":
+                self.strategy_engine.cancel_request(data)
+            elif name == "write_log":
+                self.strategy_engine.write_log(data, self)
+            elif name == "latency":
+                self.latency = data
+            elif name == "exit":
+                break
+
+    def get_latency(self) -> dict:
+        """
+        Latency is reported by strategy process every second.
+        """
+        return {**self.latency, "conflated": self.conflated_count}
+
+
+class StrategyEngineProxy:
+    """
+    Strategy engine seen by strategy running in a child process.
+    """
+
+    def __init__(self, connection: Connection):
+        """"""
+        self.connection = connection
+
+    def send_order(
+        self,
+        strategy: StrategyTemplate,
+        vt_symbol: str,
+        direction: Direction,
+        price: float,
+        volume: float,
+    ) -> str:
+        """"""
+        req = create_order_request(vt_symbol, direction, price, volume)
+        self.connection.send_bytes(encode_message("send_order", req))
+        return ""
+
+    def cancel_order(self, strategy: StrategyTemplate, vt_orderid: str):
+        """"""
+        self.connection.send_bytes(encode_message("cancel_order", vt_orderid))
+
+    def write_log(self, msg: str, strategy: StrategyTemplate = None):
+        """"""
+        self.connection.send_bytes(encode_message("write_log", msg))
+
+
+def run_strategy_process(
+    strategy_class: type,
+    strategy_name: str,
+    vt_symbols: List[str],
+    setting: dict,
+    connection: Connection,
+):
+    """
+    Main loop of strategy process.
+    """
+    proxy = StrategyEngineProxy(connection)
+    strategy = strategy_class(proxy, strategy_name, vt_symbols, setting)
+    worker = InlineWorker(proxy, strategy)
+
+    last_report = monotonic()
+
+    while True:
+        name, data = decode_message(connection.recv_bytes())
+        if name == "exit":
+            break
+
+        worker.call(name, data)
+
+        now = monotonic()
+        if now - last_report >= 1:
+            last_report = now
+            connection.send_bytes(encode_message("latency", worker.get_latency()))
+
+    connection.send_bytes(encode_message("latency", worker.get_latency()))
+    connection.send_bytes(encode_message("exit"))
+
+
+def create_order_request(
+    vt_symbol: str,
+    direction: Direction,
+    price: float,
+    volume: float,
+) -> OrderRequest:
+    """"""
+    symbol, exchange = extract_vt_symbol(vt_symbol)
+    return OrderRequest(
+        symbol=symbol,
+        exchange=exchange,
+        direction=direction,
+        type=OrderType.LIMIT,
+        volume=volume,
+        price=price,
+    )
+
+
+class StrategyEngine(BaseEngine):
+    """
+    Route events to strategies by vt_symbol and vt_orderid, instead of
+    broadcasting every event to every strategy.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(StrategyEngine, self).__init__(main_engine, event_engine, "Strategy")
+
+        self.classes: Dict[str, type] = {}
+        self.workers: Dict[str, Any] = {}
+
+        self.symbol_workers_map: Dict[str, List[Any]] = defaultdict(list)
+        self.orderid_worker_map: Dict[str, Any] = {}
+        self.bar_generators: Dict[str, BarGenerator] = {}
+        self.orders: Dict[str, OrderData] = {}
+
+        # Held while an order is sent, so that its order event is not
+        # processed before vt_orderid is mapped to strategy.
+        self.order_lock = Lock()
+
+        self.load_strategy_class()
+        self.register_event()
+
+    def register_event(self):
+        """"""
+        self.event_engine.register(EVENT_ORDER, self.process_order_event)
+        self.event_engine.register(EVENT_TRADE, self.process_trade_event)
+
+    def load_strategy_class(self):
+        """
+        Load strategy classes from strategies folder.
+        """
+        path = Path(__file__).parent.joinpath("strategies")
+
+        for filepath in path.glob("*.py"):
+            if filepath.stem != "__init__":
+                self.load_strategy_class_from_module(f"strategies.{filepath.stem}")
+
+    def load_strategy_class_from_module(self, module_name: str):
+        """
+        Load strategy classes defined in a module.
+        """
+        try:
+            module = importlib.import_module(module_name)
+        except Exception:
+            msg = f"failed to load strategy module {module_name}:\n{traceback.format_exc()}"
+            self.write_log(msg)
+            return
+
+        for name in dir(module):
+            value = getattr(module, name)
+            if (
+                isinstance(value, type)
+                and issubclass(value, StrategyTemplate)
+                and value is not StrategyTemplate
+            ):
+                self.classes[value.__name__] = value
+
+    def get_all_strategy_class_names(self) -> List[str]:
+        """"""
+        return list(self.classes.keys())
+
+    def add_strategy(
+        self,
+        class_name: str,
+        strategy_name: str,
+        vt_symbols: List[str],
+        setting: dict = None,
+        mode: str = MODE_INLINE,
+    ):
+        """
+        Add a new strategy, which is inited immediately.
+        """
+        if strategy_name in self.workers:
+            self.write_log(f"strategy {strategy_name} already exists")
+            return
+
+        strategy_class = self.classes[class_name]
+        setting = setting or {}
+
+        if mode == MODE_PROCESS:
+            worker = ProcessWorker(self, strategy_class, strategy_name, vt_symbols, setting)
+        else:
+            strategy = strategy_class(self, strategy_name, vt_symbols, setting)
+            if mode == MODE_THREAD:
+                worker = ThreadWorker(self, strategy)
+            else:
+                worker = InlineWorker(self, strategy)
+
+        worker.start()
+        self.workers[strategy_name] = worker
+
+        for vt_symbol in vt_symbols:
+            self.subscribe(vt_symbol, worker)
+
+        worker.put("init")
+
+    def subscribe(self, vt_symbol: str, worker: Any):
+        """
+        Add worker into symbol routing map. Tick event of vt_symbol is
+        registered when the first strategy subscribes it.
+        """
+        workers = self.symbol_workers_map[vt_symbol]
+        if not workers:
+            self.bar_generators[vt_symbol] = BarGenerator(self.process_bar)
+            self.event_engine.register(EVENT_TICK + vt_symbol, self.process_tick_event)
+
+            symbol, exchange = extract_vt_symbol(vt_symbol)
+            req = SubscribeRequest(symbol=symbol, exchange=exchange)
+            self.main_engine.subscribe(req)
+
+        workers.append(worker)
+
+    def start_strategy(self, strategy_name: str):
+        """"""
+        self.workers[strategy_name].put("start")
+
+    def stop_strategy(self, strategy_name: str):
+        """"""
+        self.workers[strategy_name].put("stop")
+
+    def start_all_strategies(self):
+        """"""
+        for strategy_name in self.workers.keys():
+            self.start_strategy(strategy_name)
+
+    def stop_all_strategies(self):
+        """"""
+        for strategy_name in self.workers.keys():
+            self.stop_strategy(strategy_name)
+
+    def get_latency(self) -> Dict[str, dict]:
+        """
+        Get callback latency statistics of every strategy.
+        """
+        return {name: worker.get_latency() for name, worker in self.workers.items()}
+
+    def process_tick_event(self, event: Event):
+        """"""
+        tick = event.data
+
+        for worker in self.symbol_workers_map[tick.vt_symbol]:
+            worker.put("on_tick", tick)
+
+        self.bar_generators[tick.vt_symbol].update_tick(tick)
+
+    def process_bar(self, bar: BarData):
+        """"""
+        for worker in self.symbol_workers_map[bar.vt_symbol]:
+            worker.put("on_bar", bar)
+
+    def process_order_event(self, event: Event):
+        """"""
+        order = event.data
+
+        worker = self.orderid_worker_map.get(order.vt_orderid, None)
+        if not worker:
+            with self.order_lock:
+                worker = self.orderid_worker_map.get(order.vt_orderid, None)
+            if not worker:
+                return
+
+        self.orders[order.vt_orderid] = order
+        worker.put("on_order", order)
+
+    def process_trade_event(self, event: Event):
+        """"""
+        trade = event.data
+
+        worker = self.orderid_worker_map.get(trade.vt_orderid, None)
+        if worker:
+            worker.put("on_trade", trade)
+
+    def send_order(
+        self,
+        strategy: StrategyTemplate,
+        vt_symbol: str,
+        direction: Direction,
+        price: float,
+        volume: float,
+    ) -> str:
+        """"""
+        req = create_order_request(vt_symbol, direction, price, volume)
+        return self.send_request(strategy.strategy_name, req)
+
+    def send_request(self, strategy_name: str, req: OrderRequest) -> str:
+        """
+        Send order request of strategy and map vt_orderid to it.
+        Price is rounded to pricetick of contract if it is known.
+        """
+        pricetick = self.main_engine.contract_engine.priceticks.get(
+            f"{req.symbol}.{req.exchange.value}", 0)
+        if pricetick:
+            req.price = round_to(req.price, pricetick)
+
+        with self.order_lock:
+            vt_orderid = self.main_engine.send_order(req)
+            if vt_orderid:
+                self.orderid_worker_map[vt_orderid] = self.workers[strategy_name]
+
+        return vt_orderid
+
+    def cancel_order(self, strategy: StrategyTemplate, vt_orderid: str):
+        """"""
+        self.cancel_request(vt_orderid)
+
+    def cancel_request(self, vt_orderid: str):
+        """"""
+        order = self.orders.get(vt_orderid, None)
+        if not order or not order.is_active():
+            return
+
+        req = order.create_cancel_request()
+        self.main_engine.cancel_order(req)
+
+    def write_log(self, msg: str, strategy: Any = None):
+        """"""
+        source = strategy.strategy_name if strategy else "Strategy"
+        self.main_engine.write_log(msg, source)
+
+    def close(self):
+        """"""
+        self.stop_all_strategies()
+
+        for worker in self.workers.values():
+            worker.stop()
+
+        self.event_engine.unregister(EVENT_ORDER, self.process_order_event)
+        self.event_engine.unregister(EVENT_TRADE, self.process_trade_event)
+        for vt_symbol in self.symbol_workers_map.keys():
+            self.event_engine.unregister(EVENT_TICK + vt_symbol, self.process_tick_event)
@@ -0,0 +1,385 @@
+"""
+Local stub exchange server speaking protocol.py, for tests and benchmarks
+of TcpGateway.
+
+    python stub_exchange.py --port 9000 --interval 0.1
+
+Prices of every subscribed symbol follow a random walk, and a tick is
+sent to subscribers every interval. Limit orders are filled fully at best
+price when they cross it, immediately or on a later tick.
+
+Orders outlive the connection which sent them, and keep resting after it
+is lost. Query of an order by a later connection sends its trades and
+latest status again, and takes over its later updates.
+"""
+
+import argparse
+import asyncio
+import random
+from itertools import count
+from threading import Event as ThreadingEvent
+from threading import Thread
+from typing import Dict, List, Set
+
+from constant import Direction, Status
+from protocol import (
+    CANCEL,
+    DIRECTIONS,
+    HEADER,
+    MSG_CANCEL,
+    MSG_HEARTBEAT,
+    MSG_ORDER,
+    MSG_ORDER_UPDATE,
+    MSG_QUERY,
+    MSG_SUBSCRIBE,
+    MSG_TICK,
+    MSG_TRADE,
+    ORDER,
+    ORDER_UPDATE,
+    QUERY,
+    STATUS_CODES,
+    SUBSCRIBE,
+    TICK,
+    TRADE,
+    get_timestamp,
+    pack_struct,
+)
+
+
+class Market:
+    """
+    Simulated market of one symbol.
+    """
+
+    def __init__(self, vt_symbol: str):
+        """"""
+        self.vt_symbol = vt_symbol
+
+        self.pre_close = round(random.uniform(10, 500), 2)
+        self.last_price = self.pre_close
+        self.open_price = self.pre_close
+        self.high_price = self.pre_close
+        self.low_price = self.pre_close
+        self.volume = 0
+        self.last_volume = 0
+
+    def update(self):
+        """"""
+        self.last_price = max(round(self.last_price + random.gauss(0, 0.05), 2), 0.01)
+        self.high_price = max(self.high_price, self.last_price)
+        self.low_price = min(self.low_price, self.last_price)
+        self.last_volume = random.randint(1, 10) * 100
+        self.volume += self.last_volume
+
+    @property
+    def bid_price(self) -> float:
+        """"""
+        return round(self.last_price - 0.01, 2)
+
+    @property
+    def ask_price(self) -> float:
+        """"""
+        return round(self.last_price + 0.01, 2)
+
+    def pack_tick(self, symbol_id: int, timestamp: int) -> bytes:
+        """"""
+        return pack_struct(
+            MSG_TICK,
+            TICK,
+            symbol_id,
+            timestamp,
+            self.volume,
+            self.last_price,
+            self.last_volume,
+            self.open_price,
+            self.high_price,
+            self.low_price,
+            self.pre_close,
+            self.bid_price,
+            self.ask_price,
+            1000,
+            1000,
+        )
+
+
+class Session:
+    """
+    Subscriptions of one client connection.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        """"""
+        self.writer = writer
+        self.symbol_ids: Dict[str, int] = {}
+        self.vt_symbols: Dict[int, str] = {}
+
+
+class StubOrder:
+    """"""
+
+    def __init__(self, session: Session, vt_symbol: str, direction: Direction, price: float, volume: float):
+        """"""
+        self.session = session
+        self.vt_symbol = vt_symbol
+        self.direction = direction
+        self.price = price
+        self.volume = volume
+
+        self.traded: float = 0
+        self.status = Status.NOTTRADED
+        self.trades: List[bytes] = []
+
+
+class StubExchange:
+    """
+    Exchange server, which can be run in its own thread by start() for
+    tests and benchmarks.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, interval: float = 0.1):
+        """"""
+        self.host = host
+        self.port = port
+        self.interval = interval
+
+        self.markets: Dict[str, Market] = {}
+        self.sessions: Set[Session] = set()
+        self.trade_count = count(1)
+
+        self.orders: Dict[int, StubOrder] = {}
+        self.resting: Dict[int, StubOrder] = {}
+
+        self.loop: asyncio.AbstractEventLoop = None
+        self.task: asyncio.Task = None
+        self.thread: Thread = None
+        self.started = ThreadingEvent()
+
+    def start(self):
+        """
+        Run server in a new thread, and return when it is listening.
+        """
+        self.thread = Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        self.thread.start()
+        self.started.wait()
+
+    def stop(self):
+        """"""
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join()
+
+    def drop_connections(self):
+        """
+        Close all client connections, to test reconnection.
+        """
+        def close():
+            for session in self.sessions:
+                session.writer.close()
+
+        self.loop.call_soon_threadsafe(close)
+
+    async def run(self):
+        """"""
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self.started.set()
+
+        try:
+            async with server:
+                while True:
+                    await asyncio.sleep(self.interval)
+                    self.publish_ticks()
+        except asyncio.CancelledError:
+            pass
+
+    def publish_ticks(self):
+        """
+        Update all markets and send one write of ticks to each session.
+        """
+        for market in self.markets.values():
+            market.update()
+
+        timestamp = get_timestamp()
+        session_frames = {
+            session: [
+                self.markets[vt_symbol].pack_tick(symbol_id, timestamp)
+                for vt_symbol, symbol_id in session.symbol_ids.items()
+            ]
+            for session in self.sessions
+        }
+
+        # Fills of orders whose connection is lost are only kept.
+        for orderid, order in list(self.resting.items()):
+            frames = session_frames.get(order.session, [])
+            self.match_order(orderid, order, frames)
+
+        for session, frames in session_frames.items():
+            if frames:
+                session.writer.write(b"".join(frames))
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """"""
+        session = Session(writer)
+        self.sessions.add(session)
+
+        remaining = b""
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+
+                if remaining:
+                    data = remaining + data
+
+                frames = []
+                offset = self.process_data(session, data, frames)
+                remaining = data[offset:]
+
+                if frames:
+                    writer.write(b"".join(frames))
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    def process_data(self, session: Session, buf: bytes, frames: List[bytes]) -> int:
+        """
+        Process complete messages in buffer, replies are added into frames.
+        """
+        header_size = HEADER.size
+        size = len(buf)
+
+        offset = 0
+        while offset + header_size <= size:
+            length, type = HEADER.unpack_from(buf, offset)
+            body = offset + header_size
+            end = body + length
+            if end > size:
+                break
+
+            if type == MSG_ORDER:
+                self.process_order(session, buf, body, frames)
+            elif type == MSG_CANCEL:
+                self.process_cancel(session, buf, body, frames)
+            elif type == MSG_QUERY:
+                self.process_query(session, buf, body, frames)
+            elif type == MSG_SUBSCRIBE:
+                symbol_id, symbol_length = SUBSCRIBE.unpack_from(buf, body)
+                start = body + SUBSCRIBE.size
+                vt_symbol = buf[start:start + symbol_length].decode("utf-8")
+
+                if vt_symbol not in self.markets:
+                    self.markets[vt_symbol] = Market(vt_symbol)
+                session.symbol_ids[vt_symbol] = symbol_id
+                session.vt_symbols[symbol_id] = vt_symbol
+            elif type == MSG_HEARTBEAT:
+                frames.append(buf[offset:end])
+
+            offset = end
+
+        return offset
+
+    def process_order(self, session: Session, buf: bytes, offset: int, frames: List[bytes]):
+        """"""
+        orderid, symbol_id, direction, price, volume = ORDER.unpack_from(buf, offset)
+
+        vt_symbol = session.vt_symbols.get(symbol_id, None)
+        if not vt_symbol or orderid in self.orders:
+            frames.append(pack_struct(
+                MSG_ORDER_UPDATE, ORDER_UPDATE, orderid, STATUS_CODES[Status.REJECTED], 0
+            ))
+            return
+
+        order = StubOrder(session, vt_symbol, DIRECTIONS[direction], price, volume)
+        self.orders[orderid] = order
+
+        if not self.match_order(orderid, order, frames):
+            self.resting[orderid] = order
+            frames.append(pack_struct(
+                MSG_ORDER_UPDATE, ORDER_UPDATE, orderid, STATUS_CODES[Status.NOTTRADED], 0
+            ))
+
+    def process_cancel(self, session: Session, buf: bytes, offset: int, frames: List[bytes]):
+        """"""
+        orderid = CANCEL.unpack_from(buf, offset)[0]
+
+        order = self.resting.pop(orderid, None)
+        if order:
+            order.status = Status.CANCELLED
+            frames.append(pack_struct(
+                MSG_ORDER_UPDATE, ORDER_UPDATE, orderid, STATUS_CODES[order.status], order.traded
+            ))
+
+    def process_query(self, session: Session, buf: bytes, offset: int, frames: List[bytes]):
+        """
+        Send all trades and latest status of order. Order never received
+        is rejected, so that client does not wait for it.
+        """
+        orderid = QUERY.unpack_from(buf, offset)[0]
+
+        order = self.orders.get(orderid, None)
+        if not order:
+            frames.append(pack_struct(
+                MSG_ORDER_UPDATE, ORDER_UPDATE, orderid, STATUS_CODES[Status.REJECTED], 0
+            ))
+            return
+
+        order.session = session
+        frames.extend(order.trades)
+        frames.append(pack_struct(
+            MSG_ORDER_UPDATE, ORDER_UPDATE, orderid, STATUS_CODES[order.status], order.traded
+        ))
+
+    def match_order(self, orderid: int, order: StubOrder, frames: List[bytes]) -> bool:
+        """
+        Fill order fully if it crosses best price, trade is sent before
+        order update.
+        """
+        market = self.markets[order.vt_symbol]
+
+        if order.direction == Direction.LONG:
+            if order.price < market.ask_price:
+                return False
+            trade_price = market.ask_price
+        else:
+            if order.price > market.bid_price:
+                return False
+            trade_price = market.bid_price
+
+        self.resting.pop(orderid, None)
+
+        trade = pack_struct(
+            MSG_TRADE, TRADE, orderid, next(self.trade_count), trade_price, order.volume, get_timestamp()
+        )
+        order.trades.append(trade)
+        order.traded = order.volume
+        order.status = Status.ALLTRADED
+
+        frames.append(trade)
+        frames.append(pack_struct(
+            MSG_ORDER_UPDATE, ORDER_UPDATE, orderid, STATUS_CODES[order.status], order.traded
+        ))
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub exchange server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between ticks")
+    args = parser.parse_args()
+
+    exchange = StubExchange(args.host, args.port, args.interval)
+    print(f"stub exchange listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(exchange.run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,535 @@
+"""
+Gateway connected to an exchange server by TCP, see protocol.py.
+
+Network I/O runs on an asyncio loop in the gateway's own thread. Each read
+takes all bytes available, and messages are parsed in place by struct
+offsets, so a burst of ticks costs one read and no slicing per message.
+Events are put while the loop thread holds the GIL, so event thread is
+woken once per burst instead of once per message.
+
+Orders are pipelined: send_order only queues the frame and returns, and
+frames queued before the loop writes them are sent in one write. Order
+updates come back asynchronously as order events.
+
+When connection is lost, orders not written yet are rejected, and orders
+already sent become UNKNOWN until they are queried on reconnect.
+"""
+
+import asyncio
+import datetime
+from copy import copy
+from itertools import count
+from threading import Lock, Thread
+from time import time_ns
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+from constant import Exchange, Status
+from event import EventEngine, EVENT_ORDER, EVENT_TICK, EVENT_TRADE
+from object import (
+    ACTIVE_STATUSES,
+    CancelRequest,
+    OrderData,
+    OrderRequest,
+    SubscribeRequest,
+    TickData,
+    TradeData,
+)
+from protocol import (
+    CANCEL,
+    DIRECTION_CODES,
+    HEADER,
+    HEARTBEAT,
+    MSG_CANCEL,
+    MSG_HEARTBEAT,
+    MSG_ORDER,
+    MSG_ORDER_UPDATE,
+    MSG_QUERY,
+    MSG_TICK,
+    MSG_TRADE,
+    ORDER,
+    ORDER_UPDATE,
+    QUERY,
+    STATUSES,
+    TICK,
+    TRADE,
+    get_datetime,
+    pack_struct,
+    pack_subscribe,
+)
+from sanitizer import TickSanitizer
+from setting import SETTINGS
+
+
+READ_SIZE = 1 << 16
+
+
+class TcpGateway:
+    """
+    Receive ticks and order updates from exchange server, reconnecting
+    with exponential backoff when connection is lost or heartbeat times out.
+    """
+
+    def __init__(
+        self,
+        main_engine: Any,
+        event_engine: EventEngine,
+        address: str = "",
+        gateway_name: str = "TCP",
+    ):
+        """"""
+        self.main_engine = main_engine
+        self.event_engine = event_engine
+        self.gateway_name = gateway_name
+
+        address = address or SETTINGS["tcp.address"]
+        host, port = address.rsplit(":", 1)
+        self.host = host
+        self.port = int(port)
+
+        self.heartbeat_interval: float = SETTINGS["tcp.heartbeat_interval"]
+        self.heartbeat_timeout: float = SETTINGS["tcp.heartbeat_timeout"]
+        self.reconnect_min: float = SETTINGS["tcp.reconnect_min"]
+        self.reconnect_max: float = SETTINGS["tcp.reconnect_max"]
+
+        # Orderid starts from current time, so that it is not reused
+        # after restart.
+        self.order_count = count(time_ns() // 1000)
+
+        # Orders not finished yet, and tradeids received of them, so
+        # that trades sent again after reconnect are ignored. Orders are
+        # added by caller threads with lock, and removed by loop thread.
+        self.orders: Dict[int, OrderData] = {}
+        self.tradeids: Dict[int, Set[int]] = {}
+
+        # Symbol id is index of symbol in list.
+        self.symbol_ids: Dict[str, int] = {}
+        self.symbols: List[Tuple[str, Exchange]] = []
+
+        self.sanitizer = TickSanitizer()
+
+        # Frames queued by caller threads and written by loop thread,
+        # with orderids of order frames among them.
+        self.pending: List[bytes] = []
+        self.pending_orderids: List[int] = []
+        self.lock = Lock()
+
+        self.loop: asyncio.AbstractEventLoop = None
+        self.writer: asyncio.StreamWriter = None
+        self.task: asyncio.Task = None
+        self.connected = False
+        self.active = False
+        self.thread: Thread = None
+
+        self.last_received = 0
+        self.heartbeat_latency = 0
+        self.connect_count = 0
+
+    def connect(self):
+        """
+        Start loop thread, which connects to server and keeps reconnecting
+        until closed.
+        """
+        if self.active:
+            return
+
+        self.active = True
+        self.thread = Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """"""
+        if not self.active:
+            return
+
+        self.active = False
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join()
+
+    async def run(self):
+        """"""
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+
+        delay = self.reconnect_min
+        try:
+            while self.active:
+                try:
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+                except OSError as e:
+                    self.write_log(f"failed to connect {self.host}:{self.port}, {e}, retry in {delay}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.reconnect_max)
+                    continue
+
+                delay = self.reconnect_min
+                try:
+                    await self.run_connection(reader, writer)
+                except Exception as e:
+                    # Bad message or bug should not stop reconnecting.
+                    self.write_log(f"connection error: {e!r}")
+
+                if self.active:
+                    self.write_log(f"disconnected from {self.host}:{self.port}, reconnect in {delay}s")
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            pass
+
+    async def run_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Subscribe all symbols again and query orders sent before, then
+        read messages until disconnected.
+        """
+        self.connect_count += 1
+        self.write_log(f"connected to {self.host}:{self.port}")
+
+        with self.lock:
+            frames = [pack_subscribe(i, f"{s}.{e.value}") for i, (s, e) in enumerate(self.symbols)]
+            frames.extend(pack_struct(MSG_QUERY, QUERY, orderid) for orderid in self.orders)
+            self.writer = writer
+            self.connected = True
+
+        if frames:
+            writer.write(b"".join(frames))
+
+        self.last_received = self.loop.time()
+        heartbeat_task = asyncio.create_task(self.run_heartbeat(writer))
+
+        try:
+            await self.read_messages(reader)
+        finally:
+            heartbeat_task.cancel()
+            self.process_disconnected()
+
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    def process_disconnected(self):
+        """
+        Reject orders not written yet, and mark others unknown.
+        """
+        with self.lock:
+            self.connected = False
+            self.writer = None
+
+            unsent = set(self.pending_orderids)
+            self.pending = []
+            self.pending_orderids = []
+
+            orders = list(self.orders.items())
+
+        for orderid, order in orders:
+            if orderid in unsent:
+                order.status = Status.REJECTED
+                self.remove_order(orderid)
+            else:
+                order.status = Status.UNKNOWN
+            self.on_order(copy(order))
+
+        if orders:
+            self.write_log(
+                f"connection lost, {len(unsent)} orders rejected, "
+                f"{len(orders) - len(unsent)} orders unknown until reconnected"
+            )
+
+    async def run_heartbeat(self, writer: asyncio.StreamWriter):
+        """
+        Send heartbeat regularly, and close connection if nothing is
+        received within timeout.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+
+            if self.loop.time() - self.last_received > self.heartbeat_timeout:
+                self.write_log("heartbeat timeout")
+                writer.close()
+                return
+
+            writer.write(pack_struct(MSG_HEARTBEAT, HEARTBEAT, time_ns()))
+
+    async def read_messages(self, reader: asyncio.StreamReader):
+        """
+        Read all available bytes and process complete messages in them.
+        Incomplete message at the end is kept for next read.
+        """
+        remaining = b""
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                return
+            self.last_received = self.loop.time()
+
+            if remaining:
+                data = remaining + data
+
+            offset = self.process_data(data)
+            remaining = data[offset:]
+
+    def process_data(self, buf: bytes) -> int:
+        """
+        Process complete messages in buffer, and return offset of the
+        first incomplete one.
+        """
+        header_size = HEADER.size
+        size = len(buf)
+
+        offset = 0
+        while offset + header_size <= size:
+            length, type = HEADER.unpack_from(buf, offset)
+            body = offset + header_size
+            end = body + length
+            if end > size:
+                break
+
+            if type == MSG_TICK:
+                self.process_tick(buf, body)
+            elif type == MSG_ORDER_UPDATE:
+                self.process_order_update(buf, body)
+            elif type == MSG_TRADE:
+                self.process_trade(buf, body)
+            elif type == MSG_HEARTBEAT:
+                self.heartbeat_latency = time_ns() - HEARTBEAT.unpack_from(buf, body)[0]
+
+            offset = end
+
+        return offset
+
+    def process_tick(self, buf: bytes, offset: int):
+        """"""
+        (
+            symbol_id,
+            timestamp,
+            volume,
+            last_price,
+            last_volume,
+            open_price,
+            high_price,
+            low_price,
+            pre_close,
+            bid_price_1,
+            ask_price_1,
+            bid_volume_1,
+            ask_volume_1,
+        ) = TICK.unpack_from(buf, offset)
+
+        if symbol_id >= len(self.symbols):
+            return
+        symbol, exchange = self.symbols[symbol_id]
+
+        tick = TickData(
+            symbol=symbol,
+            exchange=exchange,
+            datetime=get_datetime(timestamp),
+            volume=volume,
+            last_price=last_price,
+            last_volume=last_volume,
+            open_price=open_price,
+            high_price=high_price,
+            low_price=low_price,
+            pre_close=pre_close,
+            bid_price_1=bid_price_1,
+            ask_price_1=ask_price_1,
+            bid_volume_1=bid_volume_1,
+            ask_volume_1=ask_volume_1,
+        )
+        self.on_tick(tick)
+
+    def process_order_update(self, buf: bytes, offset: int):
+        """"""
+        orderid, status, traded = ORDER_UPDATE.unpack_from(buf, offset)
+
+        order = self.orders.get(orderid, None)
+        if not order:
+            return
+
+        order.status = STATUSES[status]
+        order.traded = traded
+        if not order.is_active():
+            self.remove_order(orderid)
+
+        self.on_order(copy(order))
+
+    def remove_order(self, orderid: int):
+        """
+        Finished order is forgotten, as its trades are sent before its
+        last update.
+        """
+        self.orders.pop(orderid, None)
+        self.tradeids.pop(orderid, None)
+
+    def process_trade(self, buf: bytes, offset: int):
+        """"""
+        orderid, tradeid, price, volume, timestamp = TRADE.unpack_from(buf, offset)
+
+        order = self.orders.get(orderid, None)
+        if not order:
+            return
+
+        tradeids = self.tradeids.setdefault(orderid, set())
+        if tradeid in tradeids:
+            return
+        tradeids.add(tradeid)
+
+        dt = get_datetime(timestamp)
+        trade = TradeData(
+            symbol=order.symbol,
+            exchange=order.exchange,
+            orderid=order.orderid,
+            tradeid=str(tradeid),
+            direction=order.direction,
+            price=price,
+            volume=volume,
+            time=dt.strftime("%H:%M:%S"),
+            datetime=dt,
+            gateway_name=self.gateway_name,
+        )
+        self.on_trade(trade)
+
+    def queue_frames(self, frames: List[bytes]):
+        """
+        Queue frames to be written by loop thread. Loop is only woken by
+        the first frame queued after previous write.
+        """
+        with self.lock:
+            if not self.connected:
+                return
+
+            wake = not self.pending
+            self.pending.extend(frames)
+
+        if wake:
+            self.loop.call_soon_threadsafe(self.write_pending)
+
+    def write_pending(self):
+        """"""
+        with self.lock:
+            frames = self.pending
+            self.pending = []
+            self.pending_orderids = []
+            writer = self.writer
+
+        if writer and frames:
+            writer.write(b"".join(frames))
+
+    def get_symbol_id(self, symbol: str, exchange: Exchange) -> int:
+        """
+        Get id of symbol, which is subscribed first if not yet.
+        """
+        vt_symbol = f"{symbol}.{exchange.value}"
+        symbol_id = self.symbol_ids.get(vt_symbol, None)
+        if symbol_id is not None:
+            return symbol_id
+
+        with self.lock:
+            symbol_id = len(self.symbols)
+            self.symbols.append((symbol, exchange))
+            self.symbol_ids[vt_symbol] = symbol_id
+
+        self.queue_frames([pack_subscribe(symbol_id, vt_symbol)])
+        return symbol_id
+
+    def subscribe(self, req: SubscribeRequest):
+        """"""
+        self.get_symbol_id(req.symbol, req.exchange)
+
+    def send_order(self, req: OrderRequest) -> str:
+        """"""
+        return self.send_orders([req])[0]
+
+    def send_orders(self, reqs: Sequence[OrderRequest]) -> List[str]:
+        """
+        Orders are rejected at once with empty vt_orderid if not connected.
+        """
+        time = datetime.datetime.now().strftime("%H:%M:%S")
+
+        orders = []
+        frames = []
+        for req in reqs:
+            orderid = next(self.order_count)
+            order = req.create_order_data(str(orderid), self.gateway_name)
+            order.time = time
+            orders.append(order)
+
+            frames.append(pack_struct(
+                MSG_ORDER,
+                ORDER,
+                orderid,
+                self.get_symbol_id(req.symbol, req.exchange),
+                DIRECTION_CODES[req.direction],
+                req.price,
+                req.volume,
+            ))
+
+        # Order events are put before frames can be written, so that they
+        # come before updates from server.
+        with self.lock:
+            connected = self.connected
+            if connected:
+                wake = not self.pending
+                self.pending.extend(frames)
+
+                for order in orders:
+                    orderid = int(order.orderid)
+                    self.orders[orderid] = order
+                    self.pending_orderids.append(orderid)
+                    self.on_order(copy(order))
+
+        if not connected:
+            self.write_log(f"{len(reqs)} orders rejected: not connected")
+            return [""] * len(reqs)
+
+        if wake:
+            self.loop.call_soon_threadsafe(self.write_pending)
+
+        return [order.vt_orderid for order in orders]
+
+    def cancel_order(self, req: CancelRequest) -> bool:
+        """
+        Return False if order is not active or not connected.
+        """
+        return self.cancel_orders([req])[0]
+
+    def cancel_orders(self, reqs: Sequence[CancelRequest]) -> List[bool]:
+        """"""
+        results = []
+        frames = []
+        for req in reqs:
+            order = self.orders.get(int(req.orderid), None) if req.orderid.isdigit() else None
+            if not order or order.status not in ACTIVE_STATUSES or not self.connected:
+                results.append(False)
+                continue
+
+            frames.append(pack_struct(MSG_CANCEL, CANCEL, int(req.orderid)))
+            results.append(True)
+
+        if frames:
+            self.queue_frames(frames)
+        return results
+
+    def on_event(self, type: str, data: Any = None):
+        """"""
+        event = self.event_engine.create_event(type, data)
+        self.event_engine.put(event)
+
+    def on_tick(self, tick: TickData):
+        """"""
+        if not self.sanitizer.check(tick):
+            return
+
+        self.on_event(EVENT_TICK, tick)
+        self.on_event(EVENT_TICK + tick.vt_symbol, tick)
+
+    def on_order(self, order: OrderData):
+        """"""
+        self.on_event(EVENT_ORDER, order)
+
+    def on_trade(self, trade: TradeData):
+        """"""
+        self.on_event(EVENT_TRADE, trade)
+
+    def write_log(self, msg: str):
+        """"""
+        self.main_engine.write_log(msg, self.gateway_name)
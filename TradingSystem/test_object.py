@@ -0,0 +1,95 @@
+"""
+Tests of data objects shared between threads.
+
+    python -m pytest test_object.py
+"""
+
+import datetime
+import pickle
+from threading import Event as ThreadingEvent
+
+import pytest
+
+from codec import decode_message, encode_message
+from constant import Exchange
+from event import EventEngine, EVENT_TICK
+from object import TickData
+
+
+def create_tick(last_price: float) -> TickData:
+    """"""
+    return TickData(
+        symbol="000001",
+        exchange=Exchange.SMART,
+        datetime=datetime.datetime(2024, 1, 2, 9, 30),
+        last_price=last_price,
+        volume=100,
+    )
+
+
+def test_queued_ticks_keep_values():
+    """
+    Ticks waiting behind a blocked handler keep the values they were put
+    with, whatever the producer does afterwards.
+    """
+    event_engine = EventEngine()
+    blocked = ThreadingEvent()
+    done = ThreadingEvent()
+    count = 100
+    received = []
+
+    def process_tick_event(event):
+        blocked.wait(5)
+        tick = event.data
+        received.append((tick.last_price, tick.volume))
+        if len(received) == count:
+            done.set()
+
+    event_engine.register(EVENT_TICK, process_tick_event)
+    event_engine.start()
+
+    try:
+        tick = create_tick(10)
+        expected = []
+        for i in range(count):
+            event_engine.put(event_engine.create_event(EVENT_TICK, tick))
+            expected.append((tick.last_price, tick.volume))
+
+            # Producer can only make a new snapshot for next update.
+            with pytest.raises(AttributeError):
+                tick.last_price = 0
+            tick = tick._replace(last_price=tick.last_price + 1, volume=tick.volume + 100)
+
+        blocked.set()
+        assert done.wait(5)
+    finally:
+        event_engine.stop()
+
+    assert received == expected
+
+
+def test_tick_vt_symbol():
+    """"""
+    tick = create_tick(10)
+    assert tick.vt_symbol == "000001.SMART"
+    assert tick._replace(last_price=11).vt_symbol == "000001.SMART"
+
+
+def test_tick_serialization():
+    """"""
+    tick = create_tick(10)
+    assert pickle.loads(pickle.dumps(tick)) == tick
+
+    type, data = decode_message(encode_message(EVENT_TICK, tick))
+    assert type == EVENT_TICK
+    assert data == tick
+    assert data.vt_symbol == tick.vt_symbol
+
+
+def test_tick_long_string():
+    """
+    String longer than 64 KiB is not limited by its length prefix.
+    """
+    tick = create_tick(10)._replace(name="x" * 70000)
+    type, data = decode_message(encode_message(EVENT_TICK, tick))
+    assert data.name == tick.name
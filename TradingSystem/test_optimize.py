@@ -0,0 +1,41 @@
+"""
+Tests of optimization parameter space.
+
+    python -m pytest test_optimize.py
+"""
+
+from optimize import OptimizationSetting
+
+
+def test_parameter_range_inclusive_end():
+    """"""
+    setting = OptimizationSetting()
+    setting.add_parameter("a", 0.1, 0.3, 0.1)
+    assert len(setting.params["a"]) == 3
+    assert abs(setting.params["a"][-1] - 0.3) < 1e-9
+
+
+def test_parameter_range_uneven_step():
+    """
+    Step not dividing the range never gives value beyond end.
+    """
+    setting = OptimizationSetting()
+    setting.add_parameter("b", 10, 30, 7)
+    assert setting.params["b"] == [10, 17, 24]
+
+    setting.add_parameter("c", 0, 1, 0.3)
+    assert len(setting.params["c"]) == 4
+    assert max(setting.params["c"]) <= 1
+
+
+def test_random_settings_within_grid():
+    """"""
+    setting = OptimizationSetting()
+    setting.add_parameter("a", 1, 10, 1)
+    setting.add_parameter("b", 10, 30, 7)
+
+    grid = setting.generate_grid_settings()
+    samples = setting.generate_random_settings(100, seed=1)
+
+    assert len(samples) == len(grid)
+    assert sorted(map(str, samples)) == sorted(map(str, grid))
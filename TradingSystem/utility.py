@@ -1,10 +1,55 @@
 
 
 import json
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+import numpy as np
+
 from constant import Exchange
+from object import BarData, TickData
+from setting import SETTINGS
+
+# Price digits of each vt_symbol, derived from its pricetick.
+PRICE_DIGITS: Dict[str, int] = {}
 
+# Numeric fields of tick stored in NumPy arrays.
+TICK_FIELDS = [
+    "volume",
+    "open_interest",
+    "last_price",
+    "last_volume",
+    "limit_up",
+    "limit_down",
+    "open_price",
+    "high_price",
+    "low_price",
+    "pre_close",
+    "bid_price_1",
+    "ask_price_1",
+    "bid_volume_1",
+    "ask_volume_1",
+]
+TICK_DTYPE = np.dtype([("datetime", "datetime64[us]")] + [(f, "f8") for f in TICK_FIELDS])
 
+# Numeric fields of bar stored in NumPy arrays.
+BAR_FIELDS = [
+    "volume",
+    "open_price",
+    "high_price",
+    "low_price",
+    "close_price",
+]
+BAR_DTYPE = np.dtype([("datetime", "datetime64[us]")] + [(f, "f8") for f in BAR_FIELDS])
+
+
+def extract_vt_symbol(vt_symbol: str):
+    """
+    :return: (symbol, exchange)
+    """
+    symbol, exchange_str = vt_symbol.rsplit(".", 1)
+    return symbol, Exchange(exchange_str)
 
 
 def get_icon_path(filepath: str, ico_name: str):
@@ -16,5 +61,182 @@ def get_icon_path(filepath: str, ico_name: str):
     return str(icon_path)
 
 
+def get_digits(value: float) -> int:
+    """
+    Get number of digits after decimal point, e.g. 0.01 -> 2.
+    """
+    value_str = str(value)
+
+    if "e-" in value_str:
+        _, buf = value_str.split("e-")
+        return int(buf)
+    elif "." in value_str:
+        _, buf = value_str.split(".")
+        return len(buf.rstrip("0"))
+    else:
+        return 0
+
+
+def set_pricetick(vt_symbol: str, pricetick: float):
+    """
+    Save price digits of vt_symbol for formatting price.
+    """
+    PRICE_DIGITS[vt_symbol] = get_digits(pricetick)
+
+
+def round_to(value: float, target: float) -> float:
+    """
+    Round price to multiple of pricetick.
+    """
+    if not target:
+        return value
+    return round(round(value / target) * target, get_digits(target))
+
+
+@lru_cache(maxsize=None)
+def get_float_formatter(digits: int) -> Callable[[float], str]:
+    """
+    Get a precompiled formatter with fixed decimal digits.
+    """
+    return f"{{:.{digits}f}}".format
+
+
+def get_formatter(format_type: str, vt_symbol: str = "") -> Callable[[Any], str]:
+    """
+    Get formatter of a table column.
+        * price: fixed digits by pricetick of vt_symbol
+        * volume: fixed digits by volume.digits setting
+        * others: str
+    """
+    if format_type == "price":
+        digits = PRICE_DIGITS.get(vt_symbol, SETTINGS["price.digits"])
+        return get_float_formatter(digits)
+    elif format_type == "volume":
+        return get_float_formatter(SETTINGS["volume.digits"])
+    else:
+        return str
+
+
+@lru_cache(maxsize=86400)
+def get_second_text(hour: int, minute: int, second: int) -> str:
+    """
+    Get cached time string with second granularity.
+    """
+    return f"{hour:02d}:{minute:02d}:{second:02d}"
+
+
+class BarGenerator:
+    """
+    Generate 1 minute bar data from tick data.
+    """
+
+    def __init__(self, on_bar: Callable):
+        """"""
+        self.bar = None
+        self.on_bar = on_bar
+        self.last_volume = None
+
+    def update_tick(self, tick: TickData):
+        """
+        Update new tick data into generator.
+        """
+        # Filter tick data with 0 last price
+        if not tick.last_price:
+            return
+
+        new_minute = False
+        if not self.bar:
+            new_minute = True
+        elif self.bar.datetime.minute != tick.datetime.minute:
+            self.bar.datetime = self.bar.datetime.replace(second=0, microsecond=0)
+            self.on_bar(self.bar)
+            new_minute = True
+
+        if new_minute:
+            self.bar = BarData(
+                symbol=tick.symbol,
+                exchange=tick.exchange,
+                datetime=tick.datetime,
+                open_price=tick.last_price,
+                high_price=tick.last_price,
+                low_price=tick.last_price,
+                close_price=tick.last_price,
+            )
+        else:
+            self.bar.high_price = max(self.bar.high_price, tick.last_price)
+            self.bar.low_price = min(self.bar.low_price, tick.last_price)
+            self.bar.close_price = tick.last_price
+            self.bar.datetime = tick.datetime
+
+        if self.last_volume is not None:
+            volume_change = tick.volume - self.last_volume
+            self.bar.volume += max(volume_change, 0)
+
+        self.last_volume = tick.volume
+
+
+def ticks_to_array(ticks: List[TickData]) -> np.ndarray:
+    """
+    Convert ticks into structured array of TICK_DTYPE.
+    """
+    array = np.empty(len(ticks), dtype=TICK_DTYPE)
+    array["datetime"] = [tick.datetime for tick in ticks]
+    for name in TICK_FIELDS:
+        array[name] = [getattr(tick, name) for tick in ticks]
+    return array
+
+
+def array_to_ticks(
+    array: np.ndarray,
+    symbol: str,
+    exchange: Exchange,
+    chunk_size: int = 10000,
+    name: str = "",
+) -> Iterator[TickData]:
+    """
+    Generate ticks from structured array of TICK_DTYPE. Array is converted
+    in chunks, so that a memory-mapped array is not loaded all at once.
+    """
+    for start in range(0, len(array), chunk_size):
+        chunk = array[start:start + chunk_size]
 
+        columns = [chunk["datetime"].tolist()]
+        columns.extend(chunk[name].tolist() for name in TICK_FIELDS)
 
+        for (
+            dt,
+            volume,
+            open_interest,
+            last_price,
+            last_volume,
+            limit_up,
+            limit_down,
+            open_price,
+            high_price,
+            low_price,
+            pre_close,
+            bid_price_1,
+            ask_price_1,
+            bid_volume_1,
+            ask_volume_1,
+        ) in zip(*columns):
+            yield TickData(
+                symbol=symbol,
+                exchange=exchange,
+                datetime=dt,
+                name=name,
+                volume=volume,
+                open_interest=open_interest,
+                last_price=last_price,
+                last_volume=last_volume,
+                limit_up=limit_up,
+                limit_down=limit_down,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                pre_close=pre_close,
+                bid_price_1=bid_price_1,
+                ask_price_1=ask_price_1,
+                bid_volume_1=bid_volume_1,
+                ask_volume_1=ask_volume_1,
+            )
@@ -1,7 +1,8 @@
 
 import csv
 from enum import Enum
-from typing import Any
+from logging import ERROR
+from typing import Any, Callable
 from copy import copy
 
 from PyQt5 import QtCore, QtGui, QtWidgets
@@ -15,8 +16,12 @@ from event import (
     EVENT_ORDER,
     EVENT_POSITION,
     EVENT_ACCOUNT,
+    EVENT_LOG,
+    EVENT_ALERT,
+    EVENT_SCAN,
 )
 from object import OrderRequest, SubscribeRequest
+from utility import extract_vt_symbol, get_formatter, get_second_text
 
 import time
 
@@ -32,19 +37,40 @@ class BaseCell(QtWidgets.QTableWidgetItem):
     General cell used in tablewidgets.
     """
 
-    def __init__(self, content: Any, data: Any):
+    def __init__(self, content: Any, data: Any, formatter: Callable = str):
         """"""
         super(BaseCell, self).__init__()
         self.setTextAlignment(QtCore.Qt.AlignCenter)
+
+        self.formatter = formatter
+        self._text = None
+        self._color = None
+
         self.set_content(content, data)
 
     def set_content(self, content: Any, data: Any):
         """
         Set text content.
         """
-        self.setText(str(content))
+        self.set_text(self.formatter(content))
         self._data = data
 
+    def set_text(self, text: str):
+        """
+        Set text only if it is different from the one shown.
+        """
+        if text != self._text:
+            self._text = text
+            self.setText(text)
+
+    def set_color(self, color: QtGui.QColor):
+        """
+        Set foreground color only if it is different from the one shown.
+        """
+        if color is not self._color:
+            self._color = color
+            self.setForeground(color)
+
     def get_data(self):
         """
         Get data object.
@@ -57,9 +83,9 @@ class EnumCell(BaseCell):
     Cell used for showing enum data.
     """
 
-    def __init__(self, content: str, data: Any):
+    def __init__(self, content: str, data: Any, formatter: Callable = str):
         """"""
-        super(EnumCell, self).__init__(content, data)
+        super(EnumCell, self).__init__(content, data, formatter)
 
     def set_content(self, content: Any, data: Any):
         """
@@ -75,9 +101,9 @@ class DirectionCell(EnumCell):
     Cell used for showing direction data.
     """
 
-    def __init__(self, content: str, data: Any):
+    def __init__(self, content: str, data: Any, formatter: Callable = str):
         """"""
-        super(DirectionCell, self).__init__(content, data)
+        super(DirectionCell, self).__init__(content, data, formatter)
 
     def set_content(self, content: Any, data: Any):
         """
@@ -86,9 +112,9 @@ class DirectionCell(EnumCell):
         super(DirectionCell, self).set_content(content, data)
 
         if content is Direction.SHORT:
-            self.setForeground(COLOR_SHORT)
+            self.set_color(COLOR_SHORT)
         else:
-            self.setForeground(COLOR_LONG)
+            self.set_color(COLOR_LONG)
 
 
 class BidCell(BaseCell):
@@ -96,12 +122,11 @@ class BidCell(BaseCell):
     Cell used for showing bid price and volume.
     """
 
-    def __init__(self, content: Any, data: Any):
+    def __init__(self, content: Any, data: Any, formatter: Callable = str):
         """"""
-        super(BidCell, self).__init__(content, data)
+        super(BidCell, self).__init__(content, data, formatter)
 
-        self.setForeground(COLOR_BLACK)
-        self.setForeground(COLOR_BID)
+        self.set_color(COLOR_BID)
 
 
 class AskCell(BaseCell):
@@ -109,12 +134,11 @@ class AskCell(BaseCell):
     Cell used for showing ask price and volume.
     """
 
-    def __init__(self, content: Any, data: Any):
+    def __init__(self, content: Any, data: Any, formatter: Callable = str):
         """"""
-        super(AskCell, self).__init__(content, data)
+        super(AskCell, self).__init__(content, data, formatter)
 
-        self.setForeground(COLOR_BLACK)
-        self.setForeground(COLOR_ASK)
+        self.set_color(COLOR_ASK)
 
 
 class PnlCell(BaseCell):
@@ -122,9 +146,9 @@ class PnlCell(BaseCell):
     Cell used for showing pnl data.
     """
 
-    def __init__(self, content: Any, data: Any):
+    def __init__(self, content: Any, data: Any, formatter: Callable = str):
         """"""
-        super(PnlCell, self).__init__(content, data)
+        super(PnlCell, self).__init__(content, data, formatter)
 
     def set_content(self, content: Any, data: Any):
         """
@@ -133,10 +157,10 @@ class PnlCell(BaseCell):
         """
         super(PnlCell, self).set_content(content, data)
 
-        if str(content).startswith("-"):
-            self.setForeground(COLOR_SHORT)
+        if content < 0:
+            self.set_color(COLOR_SHORT)
         else:
-            self.setForeground(COLOR_LONG)
+            self.set_color(COLOR_LONG)
 
 
 class TimeCell(BaseCell):
@@ -144,21 +168,21 @@ class TimeCell(BaseCell):
     Cell used for showing time string from datetime object.
     """
 
-    def __init__(self, content: Any, data: Any):
+    def __init__(self, content: Any, data: Any, formatter: Callable = str):
         """"""
-        super(TimeCell, self).__init__(content, data)
+        super(TimeCell, self).__init__(content, data, formatter)
 
     def set_content(self, content: Any, data: Any):
         """
         Time format is 12:12:12.5
         """
-        timestamp = content.strftime("%H:%M:%S")
+        timestamp = get_second_text(content.hour, content.minute, content.second)
 
-        millisecond = int(content.microsecond / 1000)
+        millisecond = content.microsecond // 1000
         if millisecond:
             timestamp = f"{timestamp}.{millisecond}"
 
-        self.setText(timestamp)
+        self.set_text(timestamp)
         self._data = data
 
 
@@ -167,9 +191,9 @@ class MsgCell(BaseCell):
     Cell used for showing msg data.
     """
 
-    def __init__(self, content: str, data: Any):
+    def __init__(self, content: str, data: Any, formatter: Callable = str):
         """"""
-        super(MsgCell, self).__init__(content, data)
+        super(MsgCell, self).__init__(content, data, formatter)
         self.setTextAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
 
 
@@ -240,6 +264,7 @@ class BaseMonitor(QtWidgets.QTableWidget):
         """
         if self.event_type:
             self.signal.connect(self.process_event)
+            self.event_engine.keep_events(self.event_type)
             self.event_engine.register(self.event_type, self.signal.emit)
 
     def process_event(self, event):
@@ -267,6 +292,8 @@ class BaseMonitor(QtWidgets.QTableWidget):
         if self.sorting:
             self.setSortingEnabled(True)
 
+        self.event_engine.trace_applied(event)
+
 
     def insert_new_row(self, data):
         """
@@ -274,12 +301,16 @@ class BaseMonitor(QtWidgets.QTableWidget):
         """
         self.insertRow(0)
 
+        # Formatter of each column is resolved once for the row's symbol.
+        vt_symbol = getattr(data, "vt_symbol", "")
+
         row_cells = {}
         for column, header in enumerate(self.headers.keys()):
             setting = self.headers[header]
+            formatter = get_formatter(setting.get("format", ""), vt_symbol)
 
             content = data.__getattribute__(header)
-            cell = setting["cell"](content, data)
+            cell = setting["cell"](content, data, formatter)
 
             self.setItem(0, column, cell)
 
@@ -296,13 +327,12 @@ class BaseMonitor(QtWidgets.QTableWidget):
         """
         key = data.__getattribute__(self.data_key)
         row_cells = self.cells[key]
-        # print(row_cells)
         for header, cell in row_cells.items():
             content = data.__getattribute__(header)
             try:
                 cell.set_content(content, data)
             except Exception as e:
-                print('异常:',e)
+                self.main_engine.write_log(f"failed to update {header}: {e}", "Monitor", ERROR)
 
 
 
@@ -357,15 +387,15 @@ class TickMonitor(BaseMonitor):
         "symbol": {"display": "code", "cell": BaseCell, "update": False},
         "exchange": {"display": "exchange", "cell": EnumCell, "update": False},
         "name": {"display": "name", "cell": BaseCell, "update": True},
-        "last_price": {"display": "last_price", "cell": BaseCell, "update": True},
-        "last_volume": {"display": "volume", "cell": BaseCell, "update": True},
-        "open_price": {"display": "open", "cell": BaseCell, "update": True},
-        "high_price": {"display": "high", "cell": BaseCell, "update": True},
-        "low_price": {"display": "low", "cell": BaseCell, "update": True},
-        "bid_price_1": {"display": "bid price", "cell": BidCell, "update": True},
-        "bid_volume_1": {"display": "bid volume", "cell": BidCell, "update": True},
-        "ask_price_1": {"display": "ask price", "cell": AskCell, "update": True},
-        "ask_volume_1": {"display": "ask volume", "cell": AskCell, "update": True},
+        "last_price": {"display": "last_price", "cell": BaseCell, "update": True, "format": "price"},
+        "last_volume": {"display": "volume", "cell": BaseCell, "update": True, "format": "volume"},
+        "open_price": {"display": "open", "cell": BaseCell, "update": True, "format": "price"},
+        "high_price": {"display": "high", "cell": BaseCell, "update": True, "format": "price"},
+        "low_price": {"display": "low", "cell": BaseCell, "update": True, "format": "price"},
+        "bid_price_1": {"display": "bid price", "cell": BidCell, "update": True, "format": "price"},
+        "bid_volume_1": {"display": "bid volume", "cell": BidCell, "update": True, "format": "volume"},
+        "ask_price_1": {"display": "ask price", "cell": AskCell, "update": True, "format": "price"},
+        "ask_volume_1": {"display": "ask volume", "cell": AskCell, "update": True, "format": "volume"},
         "datetime": {"display": "time", "cell": TimeCell, "update": True},
 
     }
@@ -388,8 +418,8 @@ class TradeMonitor(BaseMonitor):
         "symbol": {"display": "Code", "cell": BaseCell, "update": False},
         "exchange": {"display": "Exchange", "cell": EnumCell, "update": False},
         "direction": {"display": "Direction", "cell": DirectionCell, "update": False},
-        "price": {"display": "Price", "cell": BaseCell, "update": False},
-        "volume": {"display": "Volume", "cell": BaseCell, "update": False},
+        "price": {"display": "Price", "cell": BaseCell, "update": False, "format": "price"},
+        "volume": {"display": "Volume", "cell": BaseCell, "update": False, "format": "volume"},
         "time": {"display": "time", "cell": BaseCell, "update": False},
 
     }
@@ -410,13 +440,133 @@ class PositionMonitor(BaseMonitor):
         "symbol": {"display": "Code", "cell": BaseCell, "update": False},
         "exchange": {"display": "Exchange", "cell": EnumCell, "update": False},
         "direction": {"display": "Direction", "cell": DirectionCell, "update": False},
-        "all_volume": {"display": "Position", "cell": BaseCell, "update": True},
+        "all_volume": {"display": "Position", "cell": BaseCell, "update": True, "format": "volume"},
+
+        "price": {"display": "Cost", "cell": BaseCell, "update": False, "format": "price"},
+        "pnl": {"display": "PNL", "cell": PnlCell, "update": True, "format": "price"},
+    }
+
+
+class AccountMonitor(BaseMonitor):
+    """
+    Monitor for account data.
+    """
+
+    event_type = EVENT_ACCOUNT
+    data_key = "vt_accountid"
+    sorting = True
 
-        "price": {"display": "Cost", "cell": BaseCell, "update": False},
-        "pnl": {"display": "PNL", "cell": PnlCell, "update": True},
+    headers = {
+        "accountid": {"display": "Account", "cell": BaseCell, "update": False},
+        "gateway_name": {"display": "Gateway", "cell": BaseCell, "update": False},
+        "balance": {"display": "Balance", "cell": BaseCell, "update": True, "format": "price"},
+        "frozen": {"display": "Frozen", "cell": BaseCell, "update": True, "format": "price"},
+        "available": {"display": "Available", "cell": BaseCell, "update": True, "format": "price"},
     }
 
 
+class LogMonitor(BaseMonitor):
+    """
+    Monitor for log data.
+    """
+
+    event_type = EVENT_LOG
+    data_key = ""
+    sorting = False
+
+    headers = {
+        "time": {"display": "Time", "cell": TimeCell, "update": False},
+        "level_name": {"display": "Level", "cell": BaseCell, "update": False},
+        "source": {"display": "Source", "cell": BaseCell, "update": False},
+        "msg": {"display": "Message", "cell": MsgCell, "update": False},
+    }
+
+
+class AlertMonitor(BaseMonitor):
+    """
+    Monitor for price alerts.
+    """
+
+    event_type = EVENT_ALERT
+    data_key = "alertid"
+    sorting = True
+
+    headers = {
+        "alertid": {"display": "Alert id", "cell": BaseCell, "update": False},
+        "symbol": {"display": "Code", "cell": BaseCell, "update": False},
+        "exchange": {"display": "Exchange", "cell": EnumCell, "update": False},
+        "price": {"display": "Price", "cell": BaseCell, "update": False, "format": "price"},
+        "status": {"display": "Status", "cell": EnumCell, "update": True},
+        "last_price": {"display": "Last price", "cell": BaseCell, "update": True, "format": "price"},
+        "time": {"display": "Time", "cell": TimeCell, "update": True},
+        "msg": {"display": "Message", "cell": MsgCell, "update": False},
+    }
+
+
+class ScannerWidget(QtWidgets.QWidget):
+    """
+    Show top symbols of a scanner ranking. Table has a fixed number of
+    rows whose texts are replaced by each scan, so it is never sorted.
+    """
+
+    signal = QtCore.pyqtSignal(Event)
+
+    headers = ["Rank", "Symbol", "Score", "Last price"]
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
+        """"""
+        super(ScannerWidget, self).__init__()
+
+        self.main_engine = main_engine
+        self.event_engine = event_engine
+
+        self.init_ui()
+        self.register_event()
+
+    def init_ui(self):
+        """"""
+        self.ranking_combo = QtWidgets.QComboBox()
+        self.ranking_combo.addItems(["gainers", "losers", "spread", "volume spike"])
+
+        self.table = QtWidgets.QTableWidget()
+        self.table.setColumnCount(len(self.headers))
+        self.table.setHorizontalHeaderLabels(self.headers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(self.table.NoEditTriggers)
+        self.table.setAlternatingRowColors(True)
+
+        vbox = QtWidgets.QVBoxLayout()
+        vbox.addWidget(self.ranking_combo)
+        vbox.addWidget(self.table)
+        self.setLayout(vbox)
+
+    def register_event(self):
+        """"""
+        self.signal.connect(self.process_scan_event)
+        self.event_engine.keep_events(EVENT_SCAN)
+        self.event_engine.register(EVENT_SCAN, self.signal.emit)
+
+    def process_scan_event(self, event: Event):
+        """"""
+        data = event.data
+        if data.name != self.ranking_combo.currentText():
+            return
+
+        count = len(data.vt_symbols)
+        if self.table.rowCount() != count:
+            self.table.setRowCount(count)
+            for row in range(count):
+                for column in range(len(self.headers)):
+                    self.table.setItem(row, column, QtWidgets.QTableWidgetItem())
+
+        for row, (vt_symbol, score, last_price) in enumerate(
+            zip(data.vt_symbols, data.scores, data.last_prices)
+        ):
+            self.table.item(row, 0).setText(str(row + 1))
+            self.table.item(row, 1).setText(vt_symbol)
+            self.table.item(row, 2).setText(f"{score:.4f}")
+            self.table.item(row, 3).setText(get_formatter("price", vt_symbol)(last_price))
+
 
 class ConnectDialog(QtWidgets.QDialog):
     """
@@ -501,6 +651,8 @@ class TradingWidget(QtWidgets.QWidget):
         self.event_engine = event_engine
 
         self.vt_symbol = ""
+        self.price_formatter = get_formatter("price")
+        self.volume_formatter = get_formatter("volume")
 
         self.init_ui()
         self.register_event()
@@ -517,6 +669,15 @@ class TradingWidget(QtWidgets.QWidget):
         self.symbol_line = QtWidgets.QLineEdit()
         self.symbol_line.returnPressed.connect(self.set_vt_symbol)
 
+        # Completer of symbol line is filled by contract search when editing.
+        self.symbol_model = QtCore.QStringListModel(self)
+        self.symbol_completer = QtWidgets.QCompleter(self.symbol_model, self)
+        self.symbol_completer.setCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self.symbol_completer.setFilterMode(QtCore.Qt.MatchContains)
+        self.symbol_line.setCompleter(self.symbol_completer)
+        self.symbol_completer.activated.connect(self.set_vt_symbol)
+        self.symbol_line.textEdited.connect(self.update_symbol_completer)
+
         self.name_line = QtWidgets.QLineEdit()
         self.name_line.setReadOnly(True)
 
@@ -532,6 +693,11 @@ class TradingWidget(QtWidgets.QWidget):
         self.order_type_combo.addItems(
             [order_type.value for order_type in OrderType])
 
+        # Accounts routed for exchange of current symbol, empty account
+        # is sent to default gateway of the exchange.
+        self.account_combo = QtWidgets.QComboBox()
+        self.account_combo.setEditable(True)
+
         double_validator = QtGui.QDoubleValidator()
         double_validator.setBottom(0)
 
@@ -545,15 +711,23 @@ class TradingWidget(QtWidgets.QWidget):
         send_button = QtWidgets.QPushButton("send order")
         send_button.clicked.connect(self.send_order)
 
+        cancel_button = QtWidgets.QPushButton("cancel all")
+        cancel_button.clicked.connect(self.cancel_all)
+
+        alert_button = QtWidgets.QPushButton("add alert")
+        alert_button.clicked.connect(self.add_alert)
 
         self.form1 = QtWidgets.QFormLayout()
         self.form1.addRow("Code", self.symbol_line)
         self.form1.addRow("Exchange", self.exchange_line)
         self.form1.addRow("Direction", self.direction_combo)
         self.form1.addRow("Order type", self.order_type_combo)
+        self.form1.addRow("Account", self.account_combo)
         self.form1.addRow("price", self.price_line)
         self.form1.addRow("volume", self.volume_line)
         self.form1.addRow(send_button)
+        self.form1.addRow(cancel_button)
+        self.form1.addRow(alert_button)
 
         bid_color = "rgb(255,174,201)"
         ask_color = "rgb(160,255,160)"
@@ -625,25 +799,37 @@ class TradingWidget(QtWidgets.QWidget):
         return label
 
     def register_event(self):
-        """"""
+        """
+        Tick events are registered per vt_symbol in set_vt_symbol,
+        so only the signal connection is made here.
+        """
         self.signal_tick.connect(self.process_tick_event)
-        self.event_engine.register(EVENT_TICK, self.signal_tick.emit)
+
+        # Keep one bound emit so that the same handler can be unregistered.
+        self.tick_handler = self.signal_tick.emit
 
     def process_tick_event(self, event: Event):
         """"""
         tick = event.data
 
+        # Drop ticks of the previous symbol still queued in Qt.
+        if tick.vt_symbol != self.vt_symbol:
+            return
+
+        price_formatter = self.price_formatter
+        volume_formatter = self.volume_formatter
 
-        self.lp_label.setText(str(tick.last_price))
-        self.bp1_label.setText(str(tick.bid_price_1))
-        self.bv1_label.setText(str(tick.bid_volume_1))
-        self.ap1_label.setText(str(tick.ask_price_1))
-        self.av1_label.setText(str(tick.ask_volume_1))
+        self.lp_label.setText(price_formatter(tick.last_price))
+        self.bp1_label.setText(price_formatter(tick.bid_price_1))
+        self.bv1_label.setText(volume_formatter(tick.bid_volume_1))
+        self.ap1_label.setText(price_formatter(tick.ask_price_1))
+        self.av1_label.setText(volume_formatter(tick.ask_volume_1))
 
         if tick.pre_close:
             r = (tick.last_price / tick.pre_close - 1) * 100
             self.return_label.setText(f"{r:.2f}%")
 
+        self.event_engine.trace_applied(event)
 
     def set_vt_symbol(self):
         """
@@ -653,43 +839,60 @@ class TradingWidget(QtWidgets.QWidget):
         if not symbol:
             return
 
+        # Code can be input either as vt_symbol or together with exchange line,
+        # exchange line is not needed if only one contract has the symbol.
+        contracts = self.main_engine.contract_engine.get_contracts_by_symbol(symbol)
+        try:
+            if "." in symbol:
+                symbol, exchange = extract_vt_symbol(symbol)
+            elif not self.exchange_line.text() and len(contracts) == 1:
+                exchange = contracts[0].exchange
+            else:
+                exchange = Exchange(str(self.exchange_line.text()))
+        except ValueError:
+            QtWidgets.QMessageBox.critical(self, "failure", "please input Exchange")
+            return
 
-        exchange_value=vt_symbol.split('.')[1]
-        self.exchange_line.setText(exchange_value)
+        self.symbol_line.setText(symbol)
+        self.exchange_line.setText(exchange.value)
 
         # Generate vt_symbol from symbol and exchange
-        # exchange_value = str(self.exchange_combo.currentText())
-        vt_symbol = f"{symbol}.{exchange_value}"
+        vt_symbol = f"{symbol}.{exchange.value}"
 
         if vt_symbol == self.vt_symbol:
             return
+
+        # Switch tick subscription from old vt_symbol to the new one
+        if self.vt_symbol:
+            self.event_engine.unregister(
+                EVENT_TICK + self.vt_symbol, self.tick_handler)
         self.vt_symbol = vt_symbol
+        self.event_engine.keep_events(EVENT_TICK + self.vt_symbol)
+        self.event_engine.register(
+            EVENT_TICK + self.vt_symbol, self.tick_handler)
+
+        self.price_formatter = get_formatter("price", vt_symbol)
 
-        # Update name line widget and clear all labels
         contract = self.main_engine.get_contract(vt_symbol)
-        if not contract:
-            self.name_line.setText("")
-            gateway_name = self.gateway_combo.currentText()
-        else:
+        if contract:
             self.name_line.setText(contract.name)
-            gateway_name = contract.gateway_name
-
-            # Update gateway combo box.
-            ix = self.gateway_combo.findText(gateway_name)
-            self.gateway_combo.setCurrentIndex(ix)
-
+        else:
+            self.name_line.setText("")
         self.clear_label_text()
 
-        # Subscribe tick data
-        req = SubscribeRequest(
-            symbol=symbol, exchange=Exchange(exchange_value)
-        )
-
-        self.main_engine.subscribe(req, gateway_name)
+        self.account_combo.clear()
+        self.account_combo.addItems(self.main_engine.get_route_accounts(exchange) or [""])
 
-        #Update Direction and offset when contract is subscribed
-        # if exchange_value=='SSE': r_type_combo)
+        # Subscribe tick data
+        req = SubscribeRequest(symbol=symbol, exchange=exchange)
+        self.main_engine.subscribe(req)
 
+    def update_symbol_completer(self, text: str):
+        """
+        Show vt_symbols of contracts found by symbol prefix or name.
+        """
+        contracts = self.main_engine.contract_engine.search_contracts(text)
+        self.symbol_model.setStringList([contract.vt_symbol for contract in contracts])
 
     def clear_label_text(self):
         """
@@ -731,6 +934,9 @@ class TradingWidget(QtWidgets.QWidget):
             QtWidgets.QMessageBox.critical(self, "failure", "please input Code")
             return
 
+        if "." in symbol:
+            symbol, _ = extract_vt_symbol(symbol)
+
         volume_text = str(self.volume_line.text())
         if not volume_text:
             QtWidgets.QMessageBox.critical(self,"failure", "please input Volume")
@@ -750,16 +956,36 @@ class TradingWidget(QtWidgets.QWidget):
             type=OrderType(str(self.order_type_combo.currentText())),
             volume=volume,
             price=price,
+            account=str(self.account_combo.currentText()),
         )
 
         self.main_engine.send_order(req)
 
+    def add_alert(self):
+        """
+        Add price alert of current symbol at price in price line.
+        """
+        alert_engine = self.main_engine.engines.get("Alert", None)
+        if not alert_engine:
+            return
+
+        if not self.vt_symbol:
+            QtWidgets.QMessageBox.critical(self, "failure", "please input Code")
+            return
+
+        price_text = str(self.price_line.text())
+        if not price_text:
+            QtWidgets.QMessageBox.critical(self, "failure", "please input Price")
+            return
+
+        alert_engine.add_alert(self.vt_symbol, float(price_text))
+
     def cancel_all(self):
         """
         Cancel all active orders.
         """
-        order_list = self.main_engine.get_all_active_orders()
-        for order in order_list:
-            req = order.create_cancel_request()
-            self.main_engine.cancel_order(req, order.gateway_name)
+        orders = self.main_engine.get_all_active_orders()
+        if orders:
+            reqs = [order.create_cancel_request() for order in orders]
+            self.main_engine.cancel_orders(reqs)
 